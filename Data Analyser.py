@@ -12,6 +12,7 @@ import ntpath
 import forms
 import sciplot.database
 import sciplot.datafile
+import sciplot.compute
 
 
 class RootFrame(wx.Frame):
@@ -30,10 +31,13 @@ class RootFrame(wx.Frame):
 
         #a dictionary for sharing data between frames
         #in theory, it could be used for any data
-        #however, it is only used for sharing the file object between the frames (so they don't have their own separate connections)
+        #however, it is only used for sharing the file object between the frames (so they don't have their own separate connections), the results of loading it and the worker that loads it
         self.subframe_share = {
             'file': None,
-            'file is temp': True
+            'file is temp': True,
+            'change tracker': None,
+            'change tracker file': None,
+            'compute worker': sciplot.compute.ComputeWorker(wx.CallAfter) #callbacks are run on the UI thread
         }
 
         #make temp datafile
@@ -61,7 +65,7 @@ class RootFrame(wx.Frame):
             self._gbs_main.AddGrowableRow(j)
 
         #make status bar
-        self._sb_main = self.CreateStatusBar(1, wx.STB_SIZEGRIP, wx.ID_ANY)
+        self._sb_main = self.CreateStatusBar(2, wx.STB_SIZEGRIP, wx.ID_ANY) #name of the current frame, progress of the compute worker
         self._sb_main.PushStatusText("")
 
         #make menu bar
@@ -157,6 +161,19 @@ class RootFrame(wx.Frame):
             self._sb_main.PushStatusText(self._subframes[form].styling_name + '  ') #the status bar has strange behaviour when you add a status text that is the same as the last one, this avoids that
             self._current_frame = form
     
+    def show_progress(self, done: int, total: int):
+        """
+        Show the progress of a computation in the status bar
+
+        Args:
+            done (int): number of steps completed
+            total (int): total number of steps. The progress is cleared once all steps have been completed
+        """
+        if done >= total:
+            self._sb_main.SetStatusText("", 1)
+        else:
+            self._sb_main.SetStatusText("Evaluating {}/{}".format(done, total), 1)
+    
     def _toolbar_form_clicked(self, name, event):
         """
         Internal UI method called when a new form is chosen from the toolbar
@@ -183,6 +200,8 @@ class RootFrame(wx.Frame):
                     pass
 
                 else:
+                    self.subframe_share['compute worker'].cancel_all() #results from the old file aren't wanted any more
+
                     if self.subframe_share['file is temp']: #delete the old unnecessary temporary file if it exists
                         if self.subframe_share['file'] is not None:
                             self.subframe_share['file'].close()
@@ -221,6 +240,8 @@ class RootFrame(wx.Frame):
         """
         Internal UI method called when the user closes the window
         """
+        self.subframe_share['compute worker'].close() #wait for the worker to stop using the file
+
         if self.subframe_share['file'] is not None:
             self.subframe_share['file'].commit()
             self.subframe_share['file'].close()
@@ -236,6 +257,7 @@ class RootFrame(wx.Frame):
 
                 else:
                     path = file_dialog.GetPath()
+                    self.subframe_share['compute worker'].cancel_all()
                     self.subframe_share['file'].commit() #close the database so it can be moved safely
                     self.subframe_share['file'].close()
 
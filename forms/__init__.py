@@ -4,6 +4,8 @@ import typing
 
 import sciplot.database
 import sciplot.datafile
+import sciplot.datatable
+import sciplot.compute
 
 
 class SubFrame(wx.Panel):
@@ -78,6 +80,18 @@ class SubFrame(wx.Panel):
     @_datafile.setter
     def _datafile(self, value): #_datafile setter
         self.subframe_share['file'] = value
+    
+    @property
+    def _change_tracker(self) -> sciplot.datatable.ChangeTracker: #stores datatable results between refreshes. frames that change the datafile must report their changes to it
+        if self.subframe_share.get('change tracker file') is not self._datafile: #results from another file can't be reused
+            self.subframe_share['change tracker'] = sciplot.datatable.ChangeTracker()
+            self.subframe_share['change tracker file'] = self._datafile
+
+        return self.subframe_share['change tracker']
+    
+    @property
+    def _compute_worker(self) -> sciplot.compute.ComputeWorker: #runs slow computations (e.g. loading tables) in the background. results are passed back to the UI thread
+        return self.subframe_share['compute worker']
 
 
 #python seems to prefer the imports to be after SubFrame, or SubFrame won't be defined in the imports
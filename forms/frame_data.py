@@ -1,11 +1,93 @@
 import wx
 import wx.dataview
 import typing
+import functools
 
 import forms
+import sciplot
 import sciplot.functions
 import sciplot.database
+import sciplot.datafile
 import sciplot.datatable
+import sciplot.compute
+
+
+class TableModel(wx.dataview.DataViewVirtualListModel):
+    """
+    Model for the table in DataFrame. Values are kept in their columns and only formatted when the table asks for them (when they are shown),
+    so loading a table doesn't format every value and the table doesn't keep its own copy of them. Rows are formatted in blocks, a column at a time
+    """
+    block_size = 100 #number of rows formatted at once
+
+    def __init__(self):
+        super().__init__(0)
+
+        self._columns: typing.List[sciplot.ValueColumn] = []
+        self._format_strings: typing.List[str] = []
+        self._formatted_blocks: typing.Dict[int, typing.List[typing.List[str]]] = {} #blocks of rows that have been shown recently, as a list of formatted values for each column
+    
+    def set_columns(self, columns: typing.List[sciplot.ValueColumn], format_strings: typing.List[str]):
+        """
+        Change the columns shown by the table
+
+        Args:
+            columns (list of ValueColumn): columns of the table, which must all be the same length
+            format_strings (list of str): format string of each column
+        """
+        self._columns = columns
+        self._format_strings = format_strings
+        self._formatted_blocks.clear()
+
+        if len(columns) == 0:
+            self.Reset(0)
+        else:
+            self.Reset(len(columns[0]))
+    
+    def GetColumnCount(self):
+        return len(self._columns)
+    
+    def GetColumnType(self, col):
+        return 'string'
+    
+    def GetValueByRow(self, row, col):
+        block, block_row = divmod(row, self.block_size)
+        if block not in self._formatted_blocks:
+            if len(self._formatted_blocks) >= 10: #only the rows on screen need to be kept
+                self._formatted_blocks.clear()
+
+            start = block * self.block_size
+            self._formatted_blocks[block] = [format_column(self._columns[i][start:start + self.block_size], self._format_strings[i]) for i in range(len(self._columns))]
+        
+        return self._formatted_blocks[block][col][block_row]
+    
+    def SetValueByRow(self, variant, row, col): #the table can't be edited
+        return False
+
+
+def format_column(column: sciplot.ValueColumn, format_string: str) -> typing.List[str]:
+    """
+    Format the values in a column to be shown in the table. Values in exponential form are shown like 1.2E+3
+
+    Args:
+        column (ValueColumn): the values to format. Must have a value for every row (slices of columns always do)
+        format_string (str): format string (see Value.format)
+    
+    Returns:
+        (list of str): the formatted values
+    """
+    formatted = []
+    for value, exponent in sciplot.get_formatter(format_string).format_column(column.value):
+        if exponent is None: #not in exponential form, just display the value
+            formatted.append(value)
+        else: #exponential form, display correctly
+            if int(exponent) < 0:
+                sign = ''
+            else:
+                sign = '+'
+
+            formatted.append('{}E{}{}'.format(value, sign, exponent))
+    
+    return formatted
 
 
 class DataFrame(forms.SubFrame):
@@ -26,9 +108,11 @@ class DataFrame(forms.SubFrame):
         self._gbs_main.SetNonFlexibleGrowMode(wx.FLEX_GROWMODE_SPECIFIED)
 
         #create elements
-        self._dvl_columns = []
-        self._dvl_data = None
-        self._recreate_dvl_data()
+        self._table_model = TableModel() #formats values when they are shown, so the control doesn't need a copy of every formatted value
+        self._dvc_columns = []
+        self._dvc_data = wx.dataview.DataViewCtrl(self, wx.ID_ANY)
+        self._dvc_data.AssociateModel(self._table_model)
+        self._gbs_main.Add(self._dvc_data, wx.GBPosition(0, 0), wx.GBSpan(3, 1), wx.ALL | wx.EXPAND)
 
         self._tables = [] #list of tuples containing the primary key of each table and its title
         self._columns = [] #list of tuples containing the primary key of each variable and its symbol
@@ -124,101 +208,93 @@ class DataFrame(forms.SubFrame):
     #frame methods
     def refresh_table(self):
         """
-        Updates table columns and contents in the UI
+        Updates table columns and contents in the UI. The table is loaded by the compute worker so that the UI doesn't freeze, and its contents are filled in once it has loaded
         """
         selection_index = self._lb_tables.GetSelection()
         if selection_index != -1:
             table_id = self._tables[selection_index][0]
             
-            #remake table ui so that new columns can be added
-            self._recreate_dvl_data()
+            #clear the table so that new columns can be added
+            self._table_model.set_columns([], [])
+            self._dvc_data.ClearColumns()
+            self._dvc_columns = []
 
-            #create datatable object
-            datatable = sciplot.datatable.Datatable(self._datafile)
-
-            #set variable ids for columns
+            #get the variable ids for columns
             variable_ids = []
             variable_symbols = []
             format_strings = []
             for variable_symbol, variable_id, format_string in self._datafile.query(sciplot.database.Query("SELECT Variable.Symbol, Variable.VariableID, TableColumn.FormatPattern FROM Variable INNER JOIN TableColumn ON TableColumn.VariableID = Variable.VariableID WHERE TableColumn.TableID = (?);", [table_id], 1))[0]:
-                self._dvl_columns.append(self._dvl_data.AppendTextColumn(variable_symbol)) #create column header
+                self._dvc_columns.append(self._dvc_data.AppendTextColumn(variable_symbol, len(self._dvc_columns))) #create column header, showing the column of the model with the same index
                 variable_symbols.append(variable_symbol)
                 variable_ids.append(variable_id)
                 format_strings.append(format_string)
             
-            datatable.set_variables(variable_ids)
-
-            #load constants for the datatable
-            constants_table = {}
-            for composite_unit_id, constant_symbol, constant_value in self._datafile.query(sciplot.database.Query("SELECT UnitCompositeID, Symbol, Value FROM Constant;", [], 1))[0]:
-                value = sciplot.functions.Value(constant_value) #make a value object so that the data can be formatted with the format strings
-                if composite_unit_id != None:
-                    value.units = self._datafile.get_unit_by_id(composite_unit_id)[1]
-                constants_table[constant_symbol] = constant_value
+            #load the table in the background. if the table is refreshed again before it has loaded, this load is cancelled
+            #the shared datafile and change tracker are got here, as they can be replaced by the UI thread while the table is loading
+            self._compute_worker.submit('data table', functools.partial(self._load_table, self._datafile, self._change_tracker, variable_ids), functools.partial(self._show_table, variable_symbols, format_strings), self._show_table_error, self.root_frame.show_progress)
         
-            #load all data from the datafile into memory
-            no_exception = True
-            try:
-                datatable.load(constants_table)
-            
-            except Exception as e:
-                wx.MessageBox('Couldn\'t generate table\n{}'.format(str(e)), type(e).__name__, wx.ICON_ERROR | wx.OK) #display error message for the user
-                no_exception = False
+        else:
+            self._compute_worker.cancel('data table')
+    
+    def _load_table(self, datafile: sciplot.datafile.DataFile, change_tracker: sciplot.datatable.ChangeTracker, variable_ids: typing.List[int], task: sciplot.compute.ComputeTask) -> typing.Tuple[typing.List[sciplot.ValueColumn], typing.List[str]]:
+        """
+        Load the contents of the table. Runs on the compute worker thread, so it mustn't use the UI (or the properties shared between frames)
 
-            if no_exception:
-                #load transposed data
-                data_as_rows = datatable.as_rows()
-                
-                #put data into table
-                for row in data_as_rows:
-                    formatted_row = []
-                    for i in range(len(row)):
-                        value, exponent = row[i].format(format_strings[i])
-                        
-                        if exponent is None: #not in exponential form, just display the value
-                            formatted_row.append(value)
-                        else: #exponential form, display correctly
-                            if int(exponent) < 0:
-                                sign = ''
-                            else:
-                                sign = '+'
-
-                            formatted_row.append('{}E{}{}'.format(value, sign, exponent))
-
-                    self._dvl_data.AppendItem(formatted_row) #add row to table
-                
-                #set column titles
-                if len(data_as_rows) > 0:
-                    for index in range(len(data_as_rows[0])):
-                        column_obj = self._dvl_columns[index]
-                        new_col_string = variable_symbols[index]
-                        value_obj = data_as_rows[0][index]
-
-                        unit_string = self._datafile.get_unit_string(value_obj.units)
-                        
-                        if unit_string != '': #add si units to title, if there are any
-                            new_col_string += ': ' + unit_string
-                            column_obj.SetTitle(new_col_string)
-                
-                #set column widths
-                if len(self._dvl_columns) > 0:
-                    col_width = (self._dvl_data.GetSize()[0] - 30) / len(self._dvl_columns)
-                    for col in self._dvl_columns:
-                        col.SetWidth(col_width)
+        Returns:
+            (list of ValueColumn): columns of the table
+            (list of str): unit string of each column
+        """
+        #create datatable object
+        datatable = sciplot.datatable.Datatable(datafile, change_tracker)
+        datatable.set_variables(variable_ids)
+
+        #load constants for the datatable
+        constants_table = {}
+        for composite_unit_id, constant_symbol, constant_value in datafile.query(sciplot.database.Query("SELECT UnitCompositeID, Symbol, Value FROM Constant;", [], 1))[0]:
+            value = sciplot.functions.Value(constant_value) #make a value object so that the data can be formatted with the format strings
+            if composite_unit_id != None:
+                value.units = datafile.get_unit_by_id(composite_unit_id)[1]
+            constants_table[constant_symbol] = constant_value
     
-    def _recreate_dvl_data(self):
+        #load all data from the datafile into memory
+        datatable.load(constants_table, task.report_progress)
+
+        columns = datatable.as_columns()
+        unit_strings = [datafile.get_unit_string(column.units) for column in columns]
+
+        return columns, unit_strings
+    
+    def _show_table(self, variable_symbols: typing.List[str], format_strings: typing.List[str], result: typing.Tuple[typing.List[sciplot.ValueColumn], typing.List[str]]):
         """
-        DataViewListCtrls aren't dynamic and won't allow new columns to be added once data has been added (even if the table is empty).
-        I have got around this by destroying it and recreating it whenever a new column needs to be added. This is not how I'd prefer
-        to implement it, but it is a limitation of this UI control.
+        Put a table loaded by _load_table into the UI. Values are formatted by the model when they are shown
         """
-        if self._dvl_data is not None: #destroy the old control object if it had been created
-            self._dvl_data.Destroy()
-            self._dvl_columns = []
+        columns, unit_strings = result
+
+        #put data into table
+        self._table_model.set_columns(columns, format_strings)
         
-        self._dvl_data = wx.dataview.DataViewListCtrl(self, wx.ID_ANY) #make a new control object
-        self._gbs_main.Add(self._dvl_data, wx.GBPosition(0, 0), wx.GBSpan(3, 1), wx.ALL | wx.EXPAND) #add the new control to the sizer
-        self.Layout() #update the layout of the window to account for the new control
+        #set column titles
+        if self._table_model.GetCount() > 0:
+            for index in range(len(unit_strings)):
+                column_obj = self._dvc_columns[index]
+                new_col_string = variable_symbols[index]
+                
+                if unit_strings[index] != '': #add si units to title, if there are any
+                    new_col_string += ': ' + unit_strings[index]
+                    column_obj.SetTitle(new_col_string)
+        
+        #set column widths
+        if len(self._dvc_columns) > 0:
+            col_width = (self._dvc_data.GetSize()[0] - 30) / len(self._dvc_columns)
+            for col in self._dvc_columns:
+                col.SetWidth(col_width)
+    
+    def _show_table_error(self, e: Exception):
+        """
+        Tell the user that the table couldn't be loaded by _load_table
+        """
+        self.root_frame.show_progress(0, 0)
+        wx.MessageBox('Couldn\'t generate table\n{}'.format(str(e)), type(e).__name__, wx.ICON_ERROR | wx.OK) #display error message for the user
     
     def refresh_column_list(self):
         """
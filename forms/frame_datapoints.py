@@ -94,6 +94,7 @@ class DataPointsFrame(forms.SubFrame):
     def _bind_btn_add_new_clicked(self, event):
         if self._data_set_id is not None:
             self._datafile.query(sciplot.database.Query("INSERT INTO DataPoint (DataSetID, Value) VALUES ((?), (?));", [self._data_set_id, 0], 0)) #add new data point to the database
+            self.report_data_set_changed()
             self.refresh_data_points()
 
         event.Skip()
@@ -101,6 +102,7 @@ class DataPointsFrame(forms.SubFrame):
     def _bind_btn_remove_clicked(self, event):
         if self._data_point_current is not None and self._data_set_id is not None: #a data point is selected, so remove it
             self._datafile.query(sciplot.database.Query("DELETE FROM DataPoint WHERE DataSetID = (?) AND DataPointID = (?);", [self._data_set_id, self._data_points[self._data_point_current][0]], 0)) #remove the selected data point
+            self.report_data_set_changed()
             self.refresh_data_points()
 
             selection = self._dvl_datapoints.GetSelectedRow()
@@ -144,6 +146,14 @@ class DataPointsFrame(forms.SubFrame):
         else:
             self._data_point_current = None
     
+    def report_data_set_changed(self):
+        """
+        Tell the change tracker that the currently selected data set has changed, so that only the values that depend on it are evaluated again
+        """
+        for data_set_id, symbol in self._data_sets:
+            if data_set_id == self._data_set_id:
+                self._change_tracker.data_set_changed(symbol)
+    
     def write_current_data_point(self):
         """
         Update the stored value of the currently selected data point in the database to match the value inputted by the user
@@ -154,6 +164,7 @@ class DataPointsFrame(forms.SubFrame):
             old_data_point_id = self._data_points[self._data_point_current][0]
             self._data_points[self._data_point_current][1] = self._spn_value.GetValue()
             self._datafile.query(sciplot.database.Query("UPDATE DataPoint SET Value = (?) WHERE DataSetID = (?) AND DataPointID = (?);", [self._spn_value.GetValue(), self._data_set_id, old_data_point_id], 0))
+            self.report_data_set_changed()
 
             self.refresh_data_points()
             self._dvl_datapoints.SelectRow(selection)
\ No newline at end of file
@@ -1,11 +1,18 @@
 import wx
 import wx.lib.plot.plotcanvas
 
+import typing
+import functools
+
+import numpy
+
 import forms
 
 import sciplot.database
 import sciplot.datafile
+import sciplot.datatable
 import sciplot.graphing
+import sciplot.compute
 
 
 class GraphFrame(forms.SubFrame):
@@ -26,6 +33,9 @@ class GraphFrame(forms.SubFrame):
         self._gbs_main.SetNonFlexibleGrowMode(wx.FLEX_GROWMODE_SPECIFIED)
 
         #create elements
+        self._plot_data = None #data calculated by get_plot_data for the plot being shown, kept so that the plot can be redrawn in more detail when it is zoomed
+        self._plot_titles = None
+
         self._plot_ids = [] #list of primary keys of plots
         self._variable_ids = [] #list of primary keys of variables
 
@@ -77,6 +87,7 @@ class GraphFrame(forms.SubFrame):
         self._plot_main.enableDrag = True #allow the user to reposition the graph with their mouse
         self._plot_main.useScientificNotation = True #exponential form on axes
         self._plot_main.Bind(wx.EVT_MOUSEWHEEL, self._bind_graph_scroll) #allow the user to scroll to zoom
+        self._plot_main.canvas.Bind(wx.EVT_LEFT_UP, self._bind_graph_drag_finished)
         self._gbs_main.Add(self._plot_main, wx.GBPosition(0, 2), wx.GBSpan(6, 1), wx.ALL | wx.EXPAND)
 
         self._btn_reset_zoom = wx.Button(self, wx.ID_ANY, "Reset Zoom")
@@ -108,10 +119,16 @@ class GraphFrame(forms.SubFrame):
                   self._plot_main.yCurrentRange[0] + (self._plot_main.yCurrentRange[1] - self._plot_main.yCurrentRange[0]) / 2)
 
         self._plot_main.Zoom(centre, (zoom, zoom))
+        self._redraw_plot(True) #show the points in the zoomed region in more detail
+        event.Skip()
+    
+    def _bind_graph_drag_finished(self, event):
+        wx.CallAfter(self._redraw_plot, True) #the plot canvas moves the plot after this event, so redraw the newly visible region once it has
         event.Skip()
     
     def _bind_btn_reset_zoom_clicked(self, event):
         self._plot_main.Reset() #resets the plot zoom to the default (plot fills the window exactly)
+        self._redraw_plot(False)
         event.Skip()
     
     def _bind_btn_refresh_clicked(self, event):
@@ -275,108 +292,174 @@ class GraphFrame(forms.SubFrame):
     
     def refresh_plot(self):
         """
-        Redraw currently selected graph on screen
+        Redraw currently selected graph on screen. The plot is calculated by the compute worker so that the UI doesn't freeze, and it is drawn once it has been calculated
         """
         self._plot_main.Clear()
+        self._plot_data = None
 
         selection = self._lb_plots.GetSelection()
         if selection != -1:
             plot_id = self._plot_ids[selection]
             x_axis_id, y_axis_id, x_axis_title, y_axis_title, show_regression = self._datafile.query(sciplot.database.Query("SELECT VariableXID, VariableYID, VariableXTitle, VariableYTitle, ShowRegression FROM Plot WHERE PlotID = (?)", [plot_id], 2))[0] #get graph data
 
-            lines, x_value, y_value = self.get_plot_lines(x_axis_id, y_axis_id, show_regression) #get data required for drawing currently selected plot
-
-            if lines is not None:
-                #add units to axis titles
-                x_unit_string = self._datafile.get_unit_string(x_value.units)
-                if x_unit_string != '':
-                    x_axis_title += ' ({})'.format(x_unit_string)
-                
-                y_unit_string = self._datafile.get_unit_string(y_value.units)
-                if y_unit_string != '':
-                    y_axis_title += ' ({})'.format(y_unit_string)
-                
-                gc = wx.lib.plot.PlotGraphics(lines, 'Plot of {} against {}'.format(y_axis_title, x_axis_title), x_axis_title, y_axis_title) #make a new plot
-                self._plot_main.Draw(gc)
+            #calculate the plot in the background. if the plot is refreshed again before it has been calculated, this calculation is cancelled
+            #the shared datafile and change tracker are got here, as they can be replaced by the UI thread while the plot is being calculated
+            self._compute_worker.submit('graph plot', functools.partial(self.get_plot_data, self._datafile, self._change_tracker, x_axis_id, y_axis_id, show_regression), functools.partial(self._draw_plot, x_axis_title, y_axis_title), self._show_plot_error, self.root_frame.show_progress)
+        
+        else:
+            self._compute_worker.cancel('graph plot')
+    
+    def _draw_plot(self, x_axis_title: str, y_axis_title: str, plot_data: typing.Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray, list, str, str]):
+        """
+        Draw a plot calculated by get_plot_data
+        """
+        x_unit_string, y_unit_string = plot_data[5:]
 
-    def get_plot_lines(self, x_axis_id, y_axis_id, show_regression = True):
+        #add units to axis titles
+        if x_unit_string != '':
+            x_axis_title += ' ({})'.format(x_unit_string)
+        
+        if y_unit_string != '':
+            y_axis_title += ' ({})'.format(y_unit_string)
+        
+        self._plot_data = plot_data
+        self._plot_titles = ('Plot of {} against {}'.format(y_axis_title, x_axis_title), x_axis_title, y_axis_title)
+        self._redraw_plot(False)
+    
+    def _redraw_plot(self, keep_zoom: bool):
         """
-        Get the line objects that make up the plot (points, error bars, fit lines)
+        Draw the plot with as much detail as can be seen at the current zoom
+
+        Args:
+            keep_zoom (bool): keep the visible region of the plot. If False, the whole plot is shown
         """
-        lines = []
+        if self._plot_data is not None:
+            if keep_zoom:
+                x_range = tuple(self._plot_main.xCurrentRange)
+                y_range = tuple(self._plot_main.yCurrentRange)
+            else:
+                x_range = None
+                y_range = None
+
+            lines = self.get_plot_lines(self._plot_data, x_range, y_range) #get lines required for drawing currently selected plot
+            gc = wx.lib.plot.PlotGraphics(lines, *self._plot_titles) #make a new plot
+
+            if keep_zoom:
+                self._plot_main.Draw(gc, x_range, y_range)
+            else:
+                self._plot_main.Draw(gc)
+    
+    def _show_plot_error(self, e: Exception):
+        """
+        Tell the user that the plot couldn't be calculated by get_plot_data
+        """
+        self.root_frame.show_progress(0, 0)
+        wx.MessageBox('Couldn\'t generate values for plotting\n{}'.format(str(e)), type(e).__name__, wx.ICON_ERROR | wx.OK)
 
+    def get_plot_data(self, datafile: sciplot.datafile.DataFile, change_tracker: sciplot.datatable.ChangeTracker, x_axis_id: int, y_axis_id: int, show_regression: bool = True, task: sciplot.compute.ComputeTask = None) -> typing.Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray, list, str, str]:
+        """
+        Calculate the points and fit lines of a plot. Doesn't use the UI (or the properties shared between frames), so it can be run on the compute worker thread
+
+        Returns:
+            (numpy.ndarray of float): x values
+            (numpy.ndarray of float): y values
+            (numpy.ndarray of float): absolute x uncertainties
+            (numpy.ndarray of float): absolute y uncertainties
+            (list of (list of [float, float], str)): fit lines, as the two ends of each line and its colour
+            (str): units of the x axis
+            (str): units of the y axis
+        """
         #get constants
         constants_table = {}
-        for composite_unit_id, constant_symbol, constant_value in self._datafile.query(sciplot.database.Query("SELECT UnitCompositeID, Symbol, Value FROM Constant;", [], 1))[0]:
+        for composite_unit_id, constant_symbol, constant_value in datafile.query(sciplot.database.Query("SELECT UnitCompositeID, Symbol, Value FROM Constant;", [], 1))[0]:
             value = sciplot.functions.Value(constant_value)
             if composite_unit_id != None:
-                value.units = self._datafile.get_unit_by_id(composite_unit_id)[1]
+                value.units = datafile.get_unit_by_id(composite_unit_id)[1]
             constants_table[constant_symbol] = constant_value
 
         #plot all values
-        datatable = sciplot.datatable.Datatable(self._datafile)
+        datatable = sciplot.datatable.Datatable(datafile, change_tracker)
         datatable.set_variables([x_axis_id, y_axis_id])
 
-        no_exception = True
-        try:
+        if task is None:
             datatable.load(constants_table) #load data for plotting
-        
-        except Exception as e:
-            wx.MessageBox('Couldn\'t generate values for plotting\n{}'.format(str(e)), type(e).__name__, wx.ICON_ERROR | wx.OK)
-            no_exception = False
-        
-        if no_exception:
-            err_lines = [] #uncertainty bars
+        else:
+            datatable.load(constants_table, task.report_progress)
+
+        x_column, y_column = datatable.as_columns()
+        x_values, x_uncertainties = numpy.broadcast_arrays(x_column.value, x_column.absolute_uncertainty)
+        y_values, y_uncertainties = numpy.broadcast_arrays(y_column.value, y_column.absolute_uncertainty)
 
-            data = []
-            for x_value, y_value in datatable.as_rows(): #create uncertainty bars
-                #value
-                data_point = [x_value.value, y_value.value]
-                data.append(data_point)
+        fit_lines_points = []
+        if len(x_values) > 0 and show_regression: #calculate regression lines if there is any data
+            fit_lines = sciplot.graphing.FitLines(datatable) #calculate fit lines
+            fit_lines.calculate_all()
 
-                #error bars
-                #x unc
-                err_lines.append(wx.lib.plot.PolyLine([[x_value.value - x_value.absolute_uncertainty, y_value.value], [x_value.value + x_value.absolute_uncertainty, y_value.value]], colour = 'black', width = 1))
+            #get ranges to plot over
+            max_x = float(numpy.max(x_values + x_uncertainties))
+            min_x = float(numpy.min(x_values - x_uncertainties))
 
-                #y unc
-                err_lines.append(wx.lib.plot.PolyLine([[x_value.value, y_value.value - y_value.absolute_uncertainty], [x_value.value, y_value.value + y_value.absolute_uncertainty]], colour = 'black', width = 1))
+            fit_lines_data = [(fit_lines.fit_best_gradient, fit_lines.fit_best_intercept, "green")]
+
+            if None not in [fit_lines.fit_worst_max_gradient, fit_lines.fit_worst_max_intercept]: #there is a worst fit, so display it
+                fit_lines_data.append((fit_lines.fit_worst_max_gradient, fit_lines.fit_worst_max_intercept, "red"))
             
-            lines.append(wx.lib.plot.PolyMarker(data, colour = 'black', width = 1, marker = 'cross', size = 1, legend = 'Data points')) #all data points
+            if None not in [fit_lines.fit_worst_min_gradient, fit_lines.fit_worst_min_intercept]: #there is a worst fit, so display it
+                fit_lines_data.append((fit_lines.fit_worst_min_gradient, fit_lines.fit_worst_min_intercept, "red"))
+
+            for gradient, intercept, colour in fit_lines_data:
+                if gradient is not None and intercept is not None: #construct lines and uncertainty bars
+                    best_fit_points = [[min_x, intercept + (min_x * gradient)],
+                                    [max_x, intercept + (max_x * gradient)]]
 
-            if len(datatable.as_rows()) > 0 and show_regression: #calculate regression lines if there is any data
-                fit_lines = sciplot.graphing.FitLines(datatable) #calculate fit lines
-                fit_lines.calculate_all()
+                    fit_lines_points.append((best_fit_points, colour))
+        
+        return x_values, y_values, x_uncertainties, y_uncertainties, fit_lines_points, datafile.get_unit_string(x_column.units), datafile.get_unit_string(y_column.units)
 
-                #get ranges to plot over
-                max_x = datatable.as_columns()[0][0].value
-                min_x = datatable.as_columns()[0][0].value
-                for value in datatable.as_columns()[0]:
-                    if value.value + value.absolute_uncertainty > max_x:
-                        max_x = value.value + value.absolute_uncertainty
+    def get_plot_lines(self, plot_data: typing.Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray, list, str, str], x_range: typing.Tuple[float, float] = None, y_range: typing.Tuple[float, float] = None) -> list:
+        """
+        Get the line objects that make up the plot (points, error bars, fit lines) from the plot data calculated by get_plot_data.
+        Points are reduced to about one per pixel (see sciplot.graphing.decimate_points) and the error bars are drawn as two objects, so that plots with many points can be drawn quickly
 
-                    if value.value - value.absolute_uncertainty < min_x:
-                        min_x = value.value - value.absolute_uncertainty
+        Kwargs:
+            x_range ((float, float)): visible x range, which is shown in full detail. If this or y_range is None, the whole plot is visible
+            y_range ((float, float)): visible y range
+        """
+        x_values, y_values, x_uncertainties, y_uncertainties, fit_lines_points = plot_data[:5]
 
-                fit_lines_data = [(fit_lines.fit_best_gradient, fit_lines.fit_best_intercept, "green")]
+        width, height = self._plot_main.GetClientSize()
+        points, x_bars, y_bars = sciplot.graphing.decimate_points(x_values, y_values, x_uncertainties, y_uncertainties, (max(width, 1), max(height, 1)), x_range, y_range)
+
+        lines = []
+        lines.append(wx.lib.plot.PolyMarker(points, colour = 'black', width = 1, marker = 'cross', size = 1, legend = 'Data points')) #all data points
 
-                if None not in [fit_lines.fit_worst_max_gradient, fit_lines.fit_worst_max_intercept]: #there is a worst fit, so display it
-                    fit_lines_data.append((fit_lines.fit_worst_max_gradient, fit_lines.fit_worst_max_intercept, "red"))
-                
-                if None not in [fit_lines.fit_worst_min_gradient, fit_lines.fit_worst_min_intercept]: #there is a worst fit, so display it
-                    fit_lines_data.append((fit_lines.fit_worst_min_gradient, fit_lines.fit_worst_min_intercept, "red"))
+        for points, colour in fit_lines_points:
+            lines.append(wx.lib.plot.PolyLine(points, colour = colour, width = 1))
 
-                for gradient, intercept, colour in fit_lines_data:
-                    if gradient is not None and intercept is not None: #construct lines and uncertainty bars
-                        best_fit_points = [[min_x, intercept + (min_x * gradient)],
-                                        [max_x, intercept + (max_x * gradient)]]
+        #put error bar lines last
+        for bars in [x_bars, y_bars]:
+            if len(bars) > 0:
+                lines.append(LineSegments(bars.reshape(-1, 2), colour = 'black', width = 1))
 
-                        lines.append(wx.lib.plot.PolyLine(best_fit_points, colour = colour, width = 1))
+        return lines
 
-            #put error bar lines last
-            for line in err_lines:
-                lines.append(line)
 
-            return lines, x_value, y_value
+class LineSegments(wx.lib.plot.PolyLine):
+    """
+    Draws separate lines (e.g. error bars) as one object. Points are taken in pairs, each pair being the ends of a line
+    """
+    def draw(self, dc, printerScale, coord = None):
+        if coord is not None: #legend
+            super().draw(dc, printerScale, coord)
         
         else:
-            return None, None, None
\ No newline at end of file
+            colour = self.attributes['colour']
+            if not isinstance(colour, wx.Colour):
+                colour = wx.Colour(colour)
+
+            pen = wx.Pen(colour, self.attributes['width'] * printerScale * self._pointSize[0], self.attributes['style'])
+            pen.SetCap(wx.CAP_BUTT)
+            dc.SetPen(pen)
+
+            if len(self.scaled) > 0:
+                dc.DrawLineList(self.scaled.reshape(-1, 4).tolist())
\ No newline at end of file
@@ -44,7 +44,7 @@ class ImportFrame(forms.SubFrame):
 
         self._btns_column_pickers: typing.List[wx.Button] = []
 
-        self._dvl_data: wx.dataview.DataViewListCtrl = None #DataViewListCtrls can't have their columns dynamically changed, so this is deferred to a method (more about this in forms.frame_data.py)
+        self._dvl_data: wx.dataview.DataViewListCtrl = None #DataViewListCtrls can't have their columns dynamically changed once they contain data, so this is deferred to a method that recreates the control
         self._dvl_data_columns: typing.List[wx.dataview.DataViewColumn] = []
         self._recreate_dvl_data(False)
 
@@ -148,8 +148,9 @@ The values (with their row indices) that couldn't be converted were:"""
                 data_set_id = self._datafile.create_data_set(0, False, unit_id) #add a new blank data set to the database
                 self._datafile.create_variable(title, 0, data_set_id)
 
-                for value in values:
-                    self._datafile.create_data_point(value, data_set_id)
+                self._datafile.create_data_points(values, data_set_id)
+                
+                self._change_tracker.invalidate_all() #the new data set could share a name with a variable that didn't exist before
 
                 message = "Added data set '{}' containing {} item".format(title, len(values))
                 if len(values) != 1:
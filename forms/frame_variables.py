@@ -105,6 +105,7 @@ class VariablesFrame(forms.SubFrame):
     def _bind_btn_new_formula_clicked(self, event):
         formula_id = self._datafile.create_formula("0")
         self._datafile.create_variable("<blank>", 1, formula_id) #add a new blank formula to the database
+        self._change_tracker.invalidate_all()
         self.refresh_variable_list()
         event.Skip()
     
@@ -112,6 +113,7 @@ class VariablesFrame(forms.SubFrame):
         unit_id = self._datafile.create_unit("<blank>", [])
         data_set_id = self._datafile.create_data_set(0, False, unit_id) #add a new blank data set to the database
         self._datafile.create_variable("<blank>", 0, data_set_id)
+        self._change_tracker.invalidate_all()
         self.refresh_variable_list()
         event.Skip()
     
@@ -127,6 +129,7 @@ class VariablesFrame(forms.SubFrame):
 
             variable_id = self._variable_data[current_variable][3]
             self._datafile.remove_variable(variable_id) #remove currently selected variable from the database
+            self._change_tracker.invalidate_all()
 
             self.refresh_variable_list()
 
@@ -142,6 +145,7 @@ class VariablesFrame(forms.SubFrame):
         if selection != -1 and property_event.GetPropertyName() == "symbol":
             prop = property_event.GetProperty()
             self._datafile.query(sciplot.database.Query("UPDATE Variable SET Symbol = (?) WHERE VariableID = (?);", [prop.GetValue(), self._variable_data[selection][3]], 0)) #send new property values to the database
+            self._change_tracker.invalidate_all() #names in the stored results are out of date
 
             self.refresh_variable_list()
     
@@ -258,6 +262,7 @@ To see this system in action, try one of the examples in user/example.""", "Vari
 
             if old_variable[1] == 0:
                 data = self._prop_dataset.GetPropertyValues(inc_attributes = False)
+                old_uncertainty, old_uncisperc = self._datafile.query(sciplot.database.Query("SELECT Uncertainty, UncIsPerc FROM DataSet WHERE DataSetID = (?);", [old_variable[2]], 2))[0]
 
                 self._datafile.query(sciplot.database.Query("UPDATE Variable SET Symbol = (?) WHERE ID = (?) AND Type = 0;", [data['symbol'], old_variable[2]], 0))
                 self._datafile.query(sciplot.database.Query("UPDATE DataSet SET Uncertainty = (?), UncIsPerc = (?) WHERE DataSetID = (?);", [data['unc'], data['uncisperc'], old_variable[2]], 0))
@@ -268,7 +273,13 @@ To see this system in action, try one of the examples in user/example.""", "Vari
                         if data[unit_string] != 0:
                             units_table.append((self._datafile.query(sciplot.database.Query("SELECT UnitID FROM Unit WHERE Symbol = (?);", [unit_string[6:]], 2))[0][0], float(data[unit_string])))
 
-                self._datafile.update_units("DataSet", old_variable[2], data['units'], units_table)
+                units_changed = self._datafile.update_units("DataSet", old_variable[2], data['units'], units_table)
+
+                #the properties are stored whenever the selection changes, so only report a change if there was one (otherwise stored results would be thrown away for nothing)
+                if data['symbol'] != old_variable[0]: #names in the stored results are out of date
+                    self._change_tracker.invalidate_all()
+                elif units_changed or data['unc'] != old_uncertainty or bool(data['uncisperc']) != bool(old_uncisperc):
+                    self._change_tracker.data_set_changed(data['symbol'])
 
             else:
                 data = self._prop_formula.GetPropertyValues(inc_attributes = False)
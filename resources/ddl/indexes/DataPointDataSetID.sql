@@ -0,0 +1,3 @@
+CREATE INDEX "DataPointDataSetID" ON "DataPoint" (
+	"DataSetID"
+)
\ No newline at end of file
@@ -0,0 +1,3 @@
+CREATE INDEX "TableColumnTableID" ON "TableColumn" (
+	"TableID"
+)
\ No newline at end of file
@@ -0,0 +1,3 @@
+CREATE INDEX "UnitCompositeDetailsUnitCompositeID" ON "UnitCompositeDetails" (
+	"UnitCompositeID"
+)
\ No newline at end of file
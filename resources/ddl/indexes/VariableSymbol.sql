@@ -0,0 +1,3 @@
+CREATE INDEX "VariableSymbol" ON "Variable" (
+	"Symbol"
+)
\ No newline at end of file
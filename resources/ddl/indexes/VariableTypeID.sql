@@ -0,0 +1,4 @@
+CREATE INDEX "VariableTypeID" ON "Variable" (
+	"Type",
+	"ID"
+)
\ No newline at end of file
@@ -1,5 +1,8 @@
 import typing
 import math
+import functools
+
+import numpy
 
 #core components of the sciplot package
 
@@ -10,6 +13,8 @@ class Value:
 
     NB: Python uses Banker's rounding. This class rounds upwards to resolve equidistant cases as this is the expected behaviour by A-Level physics students. This functionality can be overridden by setting round_use_internal to True.
     """
+    __slots__ = ['value', '_uncertainty', '_uncertainty_is_percentage', 'units', '_round_use_internal'] #no per-instance __dict__, as there can be millions of Values in memory
+
     def __init__(self, value: typing.Union[float, int, str, bytes, bytearray], uncertainty: float = 0, uncertainty_is_percentage: bool = True, units: typing.List[typing.Tuple[int, float]] = [], round_use_internal: bool = False):
         self.value: float = float(value) #enforce type
         self._uncertainty: float = uncertainty
@@ -42,143 +47,7 @@ class Value:
         if value is None:
             value = self.value
 
-        if formatstring.endswith('e'): #exponent mode (standard form)
-            formatstring = formatstring[:-1]
-
-            exponent = math.floor(math.log10(value))
-
-            pivot = formatstring.find('.')
-            if pivot != -1:
-                exponent -= pivot
-                exponent += 1
-                if formatstring.startswith('*'):
-                    exponent -= 1
-
-            multiplier = value / pow(10, exponent)
-
-            return (self.format(formatstring, multiplier)[0], str(exponent))
-
-        else: #decimalised mode
-            return_string = None
-            if formatstring == '*' or formatstring == '*.*':
-                return_string = str(value)
-            
-            elif formatstring.endswith('#'):
-                significant_figures = len(formatstring) - 1
-
-                exponent = significant_figures - 1 - math.floor(math.log10(value))
-
-                result_value = value * pow(10, exponent)
-                result_value = self.upwards_round(result_value)
-                result_value /= pow(10, exponent)
-
-                if result_value.is_integer():
-                    result_value = int(result_value)
-                
-                return_string = str(result_value)
-
-                required_length = len(formatstring) - 1
-                return_string_sigfig = 0
-                for char in return_string:
-                    if (char != '.') and ((char != '0') or (return_string_sigfig > 0)):
-                        return_string_sigfig += 1
-                
-                if return_string_sigfig < required_length:
-                    chars_to_add = required_length - return_string_sigfig
-
-                    if '.' not in return_string:
-                        return_string += '.'
-
-                    return_string += '0' * chars_to_add
-            
-            else: #standard mode (*.*, 00.* etc)
-                return_string = str(value)
-
-                #pre_decimal: format string pre decimal place
-                #post_decimal: format string post decimal place
-                #pre_return: digits before the decimal place in formatted form
-                #post_return: digits after the decimal place in formatted form
-                #pre_capped: whether or not the number of digits before the decimal place is capped
-                #post_capped: whether or not the number of digits after the decimal place is capped
-                #pre_size: number of digits to cap to before the deicmal place
-                #post_size: number of digits to cap to after the deicmal place
-
-                #split format string around decimal place
-                if formatstring.find('.') == -1: #no decimal place
-                    pre_decimal = formatstring
-                    post_decimal = ''
-                else:
-                    pre_decimal = formatstring[:formatstring.find('.')]
-                    post_decimal = formatstring[formatstring.find('.') + 1:]
-
-                #interpret format string
-                pre_capped = not pre_decimal.startswith('*')
-                pre_size = len(pre_decimal)
-                if not pre_capped:
-                    pre_size -= 1
-
-                post_capped = not post_decimal.endswith('*')
-                post_size = len(post_decimal)
-                if not post_capped:
-                    post_size -= 1
-                
-                #pre rounding
-                if post_capped:
-                    return_string = float(return_string)
-                    return_string *= pow(10, post_size)
-                    return_string = self.upwards_round(return_string)
-                    return_string /= pow(10, post_size)
-                    return_string = str(return_string)
-                
-                #split value to format around decimal place
-                return_pivot = return_string.find('.')
-                if return_pivot == -1:
-                    pre_return = return_string
-                    post_return = ''
-                else:
-                    pre_return = return_string[:return_pivot]
-                    post_return = return_string[return_pivot + 1:]
-                
-                if pre_size > len(pre_return): #pre_return is too short, pad with zeroes
-                    pre_return = ('0' * (pre_size - len(pre_return))) + pre_return
-                elif (pre_size < len(pre_return)) and pre_capped: #pre_return is too long, remove leading digits
-                    pre_return = pre_return[0 - len(pre_return) + pre_size:]
-                
-                if post_decimal == '': #nothing should be added after the decimal place
-                    post_return = ''
-
-                elif post_size > len(post_return): #post_return is too short, pad with zeroes
-                    post_return += '0' * (post_size - len(post_return))
-
-                elif (post_size < len(post_return)) and post_capped:
-                    leading_zeroes = 0 #get the number of leading zeroes as these aren't preserved by the rounding and they are significant (as this is after the decimal place)
-                    for i in range(len(post_return)):
-                        char = post_return[i]
-                        if char == '0':
-                            leading_zeroes += 1
-                        else:
-                            break
-                    
-                    check_round_up = True
-                    for j in range(i, len(post_return), 1):
-                        if self.upwards_round(int(post_return[j]) / 10) == 0:
-                            check_round_up = False
-                    
-                    #remove a leading zero if the number will round up (and add another digit to the front)
-                    if i < len(post_return) - 2 and post_return[i] == '9' and check_round_up:
-                        leading_zeroes -= 1
-                    
-                    post_return = '0' * leading_zeroes + str(int(self.upwards_round(int(post_return) / pow(10, len(post_return) - post_size)))) #add leading zeroes and round
-                
-                #combine pre_return and post_return
-                if post_return == '':
-                    return_string = pre_return
-                elif pre_return == '':
-                    return_string = '0.{}'.format(post_return)
-                else:
-                    return_string = '{}.{}'.format(pre_return, post_return)
-
-            return (return_string, None)
+        return get_formatter(formatstring).format(value, self._round_use_internal)
     
     def format_scientific(self):
         """
@@ -232,5 +101,310 @@ class Value:
         self._uncertainty = value
         self._uncertainty_is_percentage = True
     
+    def _get_unc_is_perc(self):
+        return self._uncertainty_is_percentage
+    
     absolute_uncertainty = property(_get_unc_abs, _set_unc_abs)
-    percentage_uncertainty = property(_get_unc_perc, _set_unc_perc)
\ No newline at end of file
+    percentage_uncertainty = property(_get_unc_perc, _set_unc_perc)
+    uncertainty_is_percentage = property(_get_unc_is_perc)
+
+
+class ValueFormatter:
+    """
+    A format string (see Value.format) that has been interpreted once so that it can be used to format many values (e.g. a whole column of a table) without interpreting it again.
+    Use get_formatter to get the formatter for a format string, as formatters are cached
+
+    Args:
+        formatstring (str): string to format with
+    """
+    def __init__(self, formatstring: str):
+        self.formatstring: str = formatstring
+
+        self._multiplier_formatter: ValueFormatter = None #formatter used on the multiplier in exponent mode
+        self._exponent_offset: int = 0
+        self._mode: str = None #'exponent', 'string', 'sigfig' or 'standard'
+
+        if formatstring.endswith('e'): #exponent mode (standard form)
+            self._mode = 'exponent'
+            formatstring = formatstring[:-1]
+            self._multiplier_formatter = get_formatter(formatstring)
+
+            pivot = formatstring.find('.')
+            if pivot != -1:
+                self._exponent_offset = 1 - pivot
+                if formatstring.startswith('*'):
+                    self._exponent_offset -= 1
+        
+        elif formatstring == '*' or formatstring == '*.*':
+            self._mode = 'string'
+        
+        elif formatstring.endswith('#'):
+            self._mode = 'sigfig'
+            self._significant_figures: int = len(formatstring) - 1
+        
+        else: #standard mode (*.*, 00.* etc)
+            self._mode = 'standard'
+
+            #split format string around decimal place
+            if formatstring.find('.') == -1: #no decimal place
+                pre_decimal = formatstring
+                post_decimal = ''
+            else:
+                pre_decimal = formatstring[:formatstring.find('.')]
+                post_decimal = formatstring[formatstring.find('.') + 1:]
+            
+            #interpret format string
+            self._pre_capped: bool = not pre_decimal.startswith('*') #whether or not the number of digits before the decimal place is capped
+            self._pre_size: int = len(pre_decimal) #number of digits to cap to before the decimal place
+            if not self._pre_capped:
+                self._pre_size -= 1
+
+            self._post_capped: bool = not post_decimal.endswith('*') #whether or not the number of digits after the decimal place is capped
+            self._post_size: int = len(post_decimal) #number of digits to cap to after the decimal place
+            if not self._post_capped:
+                self._post_size -= 1
+            
+            self._has_post_decimal: bool = post_decimal != ''
+    
+    def format(self, value: float, round_use_internal: bool = False) -> typing.Tuple[str, typing.Optional[str]]:
+        """
+        Format a value
+
+        Args:
+            value (float): value to format
+            round_use_internal (bool: False): use Python's rounding instead of rounding upwards (see Value)
+        
+        Returns:
+            (multiplier: str, exponent: str or None): value post-formatting. Exponent will be None if exponent form wasn't specified by the format string
+        """
+        if round_use_internal:
+            return self._format(value, round)
+        else:
+            return self._format(value, _round_upwards)
+    
+    def format_column(self, values: typing.Union[numpy.ndarray, typing.List[float]], round_use_internal: bool = False) -> typing.List[typing.Tuple[str, typing.Optional[str]]]:
+        """
+        Format every value in a column
+
+        Args:
+            values (numpy.ndarray or list of float): values to format
+            round_use_internal (bool: False): use Python's rounding instead of rounding upwards (see Value)
+        
+        Returns:
+            (list of (str, str or None)): the result of format for each value
+        """
+        if isinstance(values, numpy.ndarray):
+            values = values.tolist() #formatting python floats gives the same strings as Value.format
+
+        if round_use_internal:
+            rounding = round
+        else:
+            rounding = _round_upwards
+        
+        return [self._format(value, rounding) for value in values]
+    
+    def _format(self, value: float, rounding: typing.Callable[[float], int]) -> typing.Tuple[str, typing.Optional[str]]:
+        if self._mode == 'exponent':
+            exponent = math.floor(math.log10(value)) + self._exponent_offset
+            multiplier = value / pow(10, exponent)
+
+            return (self._multiplier_formatter._format(multiplier, rounding)[0], str(exponent))
+        
+        elif self._mode == 'string':
+            return (str(value), None)
+        
+        elif self._mode == 'sigfig':
+            exponent = self._significant_figures - 1 - math.floor(math.log10(value))
+
+            result_value = value * pow(10, exponent)
+            result_value = rounding(result_value)
+            result_value /= pow(10, exponent)
+
+            if result_value.is_integer():
+                result_value = int(result_value)
+            
+            return_string = str(result_value)
+
+            return_string_sigfig = 0
+            for char in return_string:
+                if (char != '.') and ((char != '0') or (return_string_sigfig > 0)):
+                    return_string_sigfig += 1
+            
+            if return_string_sigfig < self._significant_figures:
+                if '.' not in return_string:
+                    return_string += '.'
+
+                return_string += '0' * (self._significant_figures - return_string_sigfig)
+            
+            return (return_string, None)
+        
+        else:
+            return (self._format_standard(value, rounding), None)
+    
+    def _format_standard(self, value: float, rounding: typing.Callable[[float], int]) -> str:
+        #pre_return: digits before the decimal place in formatted form
+        #post_return: digits after the decimal place in formatted form
+        pre_size = self._pre_size
+        post_size = self._post_size
+
+        return_string = str(value)
+
+        #pre rounding
+        if self._post_capped:
+            return_string = float(return_string)
+            return_string *= pow(10, post_size)
+            return_string = rounding(return_string)
+            return_string /= pow(10, post_size)
+            return_string = str(return_string)
+        
+        #split value to format around decimal place
+        return_pivot = return_string.find('.')
+        if return_pivot == -1:
+            pre_return = return_string
+            post_return = ''
+        else:
+            pre_return = return_string[:return_pivot]
+            post_return = return_string[return_pivot + 1:]
+        
+        if pre_size > len(pre_return): #pre_return is too short, pad with zeroes
+            pre_return = ('0' * (pre_size - len(pre_return))) + pre_return
+        elif (pre_size < len(pre_return)) and self._pre_capped: #pre_return is too long, remove leading digits
+            pre_return = pre_return[0 - len(pre_return) + pre_size:]
+        
+        if not self._has_post_decimal: #nothing should be added after the decimal place
+            post_return = ''
+
+        elif post_size > len(post_return): #post_return is too short, pad with zeroes
+            post_return += '0' * (post_size - len(post_return))
+
+        elif (post_size < len(post_return)) and self._post_capped:
+            leading_zeroes = 0 #get the number of leading zeroes as these aren't preserved by the rounding and they are significant (as this is after the decimal place)
+            for i in range(len(post_return)):
+                char = post_return[i]
+                if char == '0':
+                    leading_zeroes += 1
+                else:
+                    break
+            
+            check_round_up = True
+            for j in range(i, len(post_return), 1):
+                if rounding(int(post_return[j]) / 10) == 0:
+                    check_round_up = False
+            
+            #remove a leading zero if the number will round up (and add another digit to the front)
+            if i < len(post_return) - 2 and post_return[i] == '9' and check_round_up:
+                leading_zeroes -= 1
+            
+            post_return = '0' * leading_zeroes + str(int(rounding(int(post_return) / pow(10, len(post_return) - post_size)))) #add leading zeroes and round
+        
+        #combine pre_return and post_return
+        if post_return == '':
+            return pre_return
+        elif pre_return == '':
+            return '0.{}'.format(post_return)
+        else:
+            return '{}.{}'.format(pre_return, post_return)
+
+
+@functools.lru_cache(maxsize = 256)
+def get_formatter(formatstring: str) -> ValueFormatter:
+    """
+    Get the formatter for a format string (see Value.format). Formatters are cached, so each format string is only interpreted once
+    """
+    return ValueFormatter(formatstring)
+
+
+def _round_upwards(num: float) -> int:
+    """
+    Rounding used by Value unless round_use_internal is set (see Value)
+    """
+    return int(num + 0.5)
+
+
+class ValueColumn:
+    """
+    A column of values that all have the same uncertainty type and units, stored as numpy arrays instead of as one Value per row.
+    Can be used in place of a list of Values: indexing and iterating give a Value for each row, which is only made when it is asked for.
+    Also provides the same attributes as Value, but for the whole column (as arrays)
+
+    Args:
+        value (numpy.ndarray of float): values in the column
+        uncertainty (numpy.ndarray of float): uncertainties in the column, either absolute or percentage. Can be of length 1 to use the same uncertainty for every row
+        uncertainty_is_percentage (bool): whether the uncertainties are percentage or absolute
+        units (list of (int, float)): the units of every value in the column
+    """
+    __slots__ = ['value', 'uncertainty', 'uncertainty_is_percentage', 'units']
+
+    def __init__(self, value: numpy.ndarray, uncertainty: numpy.ndarray, uncertainty_is_percentage: bool, units: typing.List[typing.Tuple[int, float]]):
+        self.value: numpy.ndarray = value
+        self.uncertainty: numpy.ndarray = uncertainty
+        self.uncertainty_is_percentage: bool = uncertainty_is_percentage
+        self.units: typing.List[typing.Tuple[int, float]] = units
+
+    @classmethod
+    def from_values(cls, values: typing.Union[Value, typing.List[Value], "ValueColumn"]) -> "ValueColumn":
+        """
+        Make a column out of a single Value (a column of length 1 that will be broadcast against the other columns) or a list of Values. ValueColumns are returned unchanged
+        """
+        if isinstance(values, ValueColumn):
+            return values
+
+        if isinstance(values, Value):
+            values = [values]
+        
+        if len(values) == 0:
+            return cls(numpy.zeros(0), numpy.zeros(0), False, [])
+
+        #keep the stored form of the uncertainty if every row uses the same one so that converting doesn't change any results
+        uncertainty_is_percentage = values[0].uncertainty_is_percentage
+        for value in values:
+            if value.uncertainty_is_percentage != uncertainty_is_percentage:
+                uncertainty_is_percentage = False
+                break
+        
+        if uncertainty_is_percentage:
+            uncertainties = [value.percentage_uncertainty for value in values]
+        else:
+            uncertainties = [value.absolute_uncertainty for value in values]
+
+        return cls(numpy.array([value.value for value in values], dtype = float), numpy.array(uncertainties, dtype = float), uncertainty_is_percentage, values[0].units)
+    
+    def to_values(self) -> typing.List[Value]:
+        """
+        Split the column into one Value per row. The Values all share the same units list
+        """
+        values, uncertainties = numpy.broadcast_arrays(self.value, self.uncertainty)
+        return [Value(value, uncertainty, self.uncertainty_is_percentage, self.units) for value, uncertainty in zip(values.tolist(), uncertainties.tolist())]
+
+    #sequence methods - the column acts like a list of Values
+    def __len__(self) -> int:
+        return numpy.broadcast(self.value, self.uncertainty).shape[0]
+    
+    def __getitem__(self, index: typing.Union[int, slice]) -> typing.Union[Value, "ValueColumn"]:
+        values, uncertainties = numpy.broadcast_arrays(self.value, self.uncertainty)
+
+        if isinstance(index, slice):
+            return ValueColumn(values[index], uncertainties[index], self.uncertainty_is_percentage, self.units)
+        else:
+            return Value(values[index].item(), uncertainties[index].item(), self.uncertainty_is_percentage, self.units)
+    
+    def __iter__(self) -> typing.Iterator[Value]:
+        values, uncertainties = numpy.broadcast_arrays(self.value, self.uncertainty)
+        for value, uncertainty in zip(values.tolist(), uncertainties.tolist()):
+            yield Value(value, uncertainty, self.uncertainty_is_percentage, self.units)
+
+    #properties - same conversions as Value, but for the whole column
+    @property
+    def absolute_uncertainty(self) -> numpy.ndarray:
+        if self.uncertainty_is_percentage:
+            return self.uncertainty * self.value
+        else:
+            return self.uncertainty
+    
+    @property
+    def percentage_uncertainty(self) -> numpy.ndarray:
+        if self.uncertainty_is_percentage:
+            return self.uncertainty
+        else: #values of 0 have a percentage uncertainty of 0 (see Value)
+            uncertainty, value = numpy.broadcast_arrays(self.uncertainty, self.value)
+            return numpy.divide(uncertainty, value, out = numpy.zeros(value.shape), where = value != 0)
@@ -0,0 +1,7 @@
+import sys
+
+import sciplot.batch
+
+#python -m sciplot: evaluate datafiles from the command line (see sciplot.batch)
+if __name__ == '__main__': #import guard, the pool processes import this module on some platforms
+    sys.exit(sciplot.batch.main())
@@ -0,0 +1,308 @@
+import argparse
+import concurrent.futures
+import csv
+import json
+import math
+import os
+import sys
+import typing
+
+import numpy
+
+import sciplot
+import sciplot.datafile
+import sciplot.datatable
+import sciplot.graphing
+from sciplot.database import Query
+
+#evaluates the tables and plots of datafiles without the UI (and without wxPython) so that many files can be processed from the command line
+#run as python -m sciplot (see main)
+
+
+def load_constants(datafile: sciplot.datafile.DataFile) -> typing.Dict[str, float]:
+    """
+    Get the constants table used to evaluate a datafile. This is the same table that the UI uses
+
+    Returns:
+        (dict of str: float): value of each constant by its symbol
+    """
+    constants_table = {}
+    for constant_symbol, constant_value in datafile.query(Query("SELECT Symbol, Value FROM Constant;", [], 1))[0]:
+        constants_table[constant_symbol] = constant_value
+
+    return constants_table
+
+
+def evaluate_table(datafile: sciplot.datafile.DataFile, table_id: int, constants_table: typing.Dict[str, float]) -> typing.Dict[str, object]:
+    """
+    Evaluate every column of a table
+
+    Args:
+        datafile (DataFile): datafile containing the table
+        table_id (int): primary key of the table
+        constants_table (dict of str: float): constants to evaluate with (see load_constants)
+
+    Returns:
+        (dict of str: object): the title of the table and its columns. Each column has its symbol, units, format pattern, values and absolute uncertainties
+    """
+    title = datafile.query(Query("SELECT Title FROM `Table` WHERE TableID = (?);", [table_id], 2))[0][0]
+    columns_data = datafile.query(Query("SELECT Variable.Symbol, Variable.VariableID, TableColumn.FormatPattern FROM Variable INNER JOIN TableColumn ON TableColumn.VariableID = Variable.VariableID WHERE TableColumn.TableID = (?);", [table_id], 1))[0]
+
+    datatable = sciplot.datatable.Datatable(datafile)
+    datatable.set_variables([variable_id for variable_symbol, variable_id, format_pattern in columns_data])
+    datatable.load(constants_table)
+
+    columns = []
+    for (variable_symbol, variable_id, format_pattern), column in zip(columns_data, datatable.as_columns()):
+        values, uncertainties = numpy.broadcast_arrays(column.value, column.absolute_uncertainty)
+        columns.append({"symbol": variable_symbol,
+                        "units": datafile.get_unit_string(column.units),
+                        "format": format_pattern,
+                        "values": values.tolist(),
+                        "uncertainties": uncertainties.tolist()})
+
+    return {"title": title, "columns": columns}
+
+
+def evaluate_plot(datafile: sciplot.datafile.DataFile, plot_id: int, constants_table: typing.Dict[str, float]) -> typing.Dict[str, object]:
+    """
+    Evaluate the lines of best and worst fit of a plot
+
+    Args:
+        datafile (DataFile): datafile containing the plot
+        plot_id (int): primary key of the plot
+        constants_table (dict of str: float): constants to evaluate with (see load_constants)
+
+    Returns:
+        (dict of str: object): the axis titles and units of the plot, its number of points and the gradients and intercepts of its fit lines (None where a line doesn't exist)
+    """
+    x_axis_id, y_axis_id, x_axis_title, y_axis_title = datafile.query(Query("SELECT VariableXID, VariableYID, VariableXTitle, VariableYTitle FROM Plot WHERE PlotID = (?);", [plot_id], 2))[0]
+
+    datatable = sciplot.datatable.Datatable(datafile)
+    datatable.set_variables([x_axis_id, y_axis_id])
+    datatable.load(constants_table)
+
+    x_column, y_column = datatable.as_columns()
+    fit_lines = sciplot.graphing.FitLines(datatable)
+    if len(x_column) > 0: #fit lines can only be calculated if there is any data
+        fit_lines.calculate_all()
+
+    return {"plot": plot_id,
+            "x title": x_axis_title,
+            "y title": y_axis_title,
+            "x units": datafile.get_unit_string(x_column.units),
+            "y units": datafile.get_unit_string(y_column.units),
+            "points": len(x_column),
+            "best gradient": fit_lines.fit_best_gradient,
+            "best intercept": fit_lines.fit_best_intercept,
+            "worst max gradient": fit_lines.fit_worst_max_gradient,
+            "worst max intercept": fit_lines.fit_worst_max_intercept,
+            "worst min gradient": fit_lines.fit_worst_min_gradient,
+            "worst min intercept": fit_lines.fit_worst_min_intercept}
+
+
+def process_file(path: str, table_titles: typing.List[str] = None, plot_ids: typing.List[int] = None) -> typing.Dict[str, object]:
+    """
+    Evaluate tables and plots from a datafile. The datafile is opened read-only, so it isn't changed and can be on a read-only file system. If neither table_titles nor plot_ids are given, every table and plot is evaluated
+
+    Args:
+        path (str): path to the datafile
+
+    Kwargs:
+        table_titles (list of str): titles of the tables to evaluate
+        plot_ids (list of int): primary keys of the plots to evaluate
+
+    Returns:
+        (dict of str: object): the path of the datafile, its evaluated tables (see evaluate_table) and its evaluated plots (see evaluate_plot)
+    """
+    if not os.path.isfile(path): #opening a path that doesn't exist would create an empty datafile
+        raise FileNotFoundError("No datafile at '{}'".format(path))
+
+    if table_titles is None and plot_ids is None:
+        evaluate_all = True
+    else:
+        evaluate_all = False
+
+        if table_titles is None:
+            table_titles = []
+
+        if plot_ids is None:
+            plot_ids = []
+
+    with sciplot.datafile.DataFile(path, read_only = True) as datafile:
+        if not datafile.tables_are_valid():
+            raise ValueError("'{}' isn't a valid datafile".format(path))
+
+        constants_table = load_constants(datafile)
+
+        #find the tables and plots to evaluate
+        tables = datafile.list_tables()
+        if evaluate_all:
+            table_ids = [table_id for table_id, title in tables]
+            plot_ids = datafile.list_plots()
+
+        else:
+            table_ids = []
+            for table_title in table_titles:
+                matches = [table_id for table_id, title in tables if title == table_title]
+                if len(matches) == 0:
+                    raise KeyError("No table titled '{}' in '{}'".format(table_title, path))
+                table_ids += matches
+
+            existing_plot_ids = datafile.list_plots()
+            for plot_id in plot_ids:
+                if plot_id not in existing_plot_ids:
+                    raise KeyError("No plot with id {} in '{}'".format(plot_id, path))
+
+        return {"file": path,
+                "tables": [evaluate_table(datafile, table_id, constants_table) for table_id in table_ids],
+                "plots": [evaluate_plot(datafile, plot_id, constants_table) for plot_id in plot_ids]}
+
+
+def write_json(result: typing.Dict[str, object], output_dir: str = None):
+    """
+    Write the result of process_file as JSON, either to <output_dir>/<datafile name>.json or (if output_dir is None) to stdout as a single line.
+    NaN and infinite values aren't valid JSON, so they are written as null
+    """
+    result = _replace_non_finite(result)
+
+    if output_dir is None:
+        sys.stdout.write(json.dumps(result, allow_nan = False) + '\n')
+
+    else:
+        with open(os.path.join(output_dir, '{}.json'.format(_file_stem(result["file"]))), 'w') as file:
+            json.dump(result, file, indent = 4, allow_nan = False)
+
+
+def write_csv(result: typing.Dict[str, object], output_dir: str):
+    """
+    Write the result of process_file as CSV files in output_dir. Each table is written to <datafile name>.<table title>.csv, with a column of values and a column of absolute uncertainties for each of its columns.
+    The fit lines of the plots are written to <datafile name>.plots.csv, one plot per row
+    """
+    stem = _file_stem(result["file"])
+
+    for table in result["tables"]:
+        header = []
+        for column in table["columns"]:
+            if column["units"] == '':
+                header.append(column["symbol"])
+            else:
+                header.append('{} ({})'.format(column["symbol"], column["units"]))
+            header.append('{} uncertainty'.format(column["symbol"]))
+
+        with open(os.path.join(output_dir, '{}.{}.csv'.format(stem, _safe_name(table["title"]))), 'w', newline = '') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+
+            rows = [column[key] for column in table["columns"] for key in ["values", "uncertainties"]]
+            writer.writerows(zip(*rows))
+
+    if len(result["plots"]) > 0:
+        with open(os.path.join(output_dir, '{}.plots.csv'.format(stem)), 'w', newline = '') as file:
+            writer = csv.DictWriter(file, fieldnames = list(result["plots"][0].keys()))
+            writer.writeheader()
+            writer.writerows(result["plots"])
+
+
+def _replace_non_finite(data: object) -> object:
+    """
+    Copy the lists and dicts of a result, replacing NaN and infinite floats with None
+    """
+    if isinstance(data, dict):
+        return {key: _replace_non_finite(value) for key, value in data.items()}
+    
+    elif isinstance(data, list):
+        return [_replace_non_finite(value) for value in data]
+    
+    elif isinstance(data, float) and not math.isfinite(data):
+        return None
+    
+    else:
+        return data
+
+
+def _file_stem(path: str) -> str:
+    """
+    Get the name of a file without its directory or extension
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _safe_name(name: str) -> str:
+    """
+    Replace any characters in a name that can't be used in file names on some platforms
+    """
+    return ''.join(['_' if char in '<>:"/\\|?*' else char for char in name])
+
+
+def main(argv: typing.List[str] = None) -> int:
+    """
+    Command line entry point. Evaluates the tables and plots of every datafile given and writes the results.
+    Datafiles that can't be evaluated are reported on stderr and don't stop the others from being evaluated
+
+    Args:
+        argv (list of str: None): command line arguments (without the program name). If None, sys.argv is used
+
+    Returns:
+        (int): exit status, 0 if every datafile was evaluated and 1 otherwise
+    """
+    parser = argparse.ArgumentParser(prog = 'python -m sciplot', description = 'Evaluate the tables and lines of best and worst fit of datafiles without opening the UI')
+    parser.add_argument('files', nargs = '+', help = 'datafiles (.db) to evaluate')
+    parser.add_argument('-t', '--table', action = 'append', dest = 'tables', metavar = 'TITLE', help = 'title of a table to evaluate (can be given more than once). If no tables or plots are given, all of them are evaluated')
+    parser.add_argument('-p', '--plot', action = 'append', dest = 'plots', type = int, metavar = 'ID', help = 'id of a plot to evaluate (can be given more than once)')
+    parser.add_argument('-f', '--format', choices = ['json', 'csv'], default = 'json', help = 'output format (default: json)')
+    parser.add_argument('-o', '--output', metavar = 'DIR', help = 'directory to write results to. JSON is written to stdout (one line per datafile) if this isn\'t given')
+    parser.add_argument('-j', '--processes', type = int, default = 1, metavar = 'N', help = 'number of datafiles to evaluate at once in separate processes (0: one per CPU, default: 1)')
+    args = parser.parse_args(argv)
+
+    if args.format == 'csv' and args.output is None:
+        parser.error('an output directory is required for CSV output')
+
+    if args.processes < 0:
+        parser.error('the number of processes can\'t be negative')
+
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok = True)
+
+    #results are written by this process as they arrive, in the order that the files were given
+    if args.processes == 1:
+        executor = None
+        results = (_run(process_file, path, args.tables, args.plots) for path in args.files) #evaluated one at a time as they are written
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(args.processes if args.processes > 0 else None)
+        results = [executor.submit(process_file, path, args.tables, args.plots) for path in args.files]
+
+    status = 0
+    try:
+        for path, result in zip(args.files, results):
+            try:
+                result = result.result()
+
+            except Exception as e:
+                sys.stderr.write('{}: {}: {}\n'.format(path, type(e).__name__, e))
+                status = 1
+
+            else:
+                if args.format == 'json':
+                    write_json(result, args.output)
+                else:
+                    write_csv(result, args.output)
+
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return status
+
+
+def _run(function: typing.Callable[..., object], *args) -> concurrent.futures.Future:
+    """
+    Call a function in this process, putting its result (or exception) in a future so that it can be handled in the same way as the results of a process pool
+    """
+    future = concurrent.futures.Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as e:
+        future.set_exception(e)
+
+    return future
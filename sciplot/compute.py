@@ -0,0 +1,183 @@
+import concurrent.futures
+import queue
+import threading
+import typing
+
+
+class ComputeTask:
+    """
+    A computation that has been sent to a ComputeWorker. Passed to the function being run so that it can report its progress and stop early once it has been cancelled
+
+    Args:
+        key (str): computations with the same key replace each other
+        function (func: ComputeTask -> object): the computation
+        on_result (func: object -> None): called with the result of function
+        on_error (func: Exception -> None): called with any exception raised by function
+        on_progress (func: int, int -> None): called with the progress reported by function
+    """
+    def __init__(self, key: str, function: typing.Callable[["ComputeTask"], typing.Any], on_result: typing.Callable[[typing.Any], None], on_error: typing.Callable[[Exception], None], on_progress: typing.Callable[[int, int], None]):
+        self.key: str = key
+        self.function = function
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_progress = on_progress
+
+        self._cancelled = threading.Event()
+        self._dispatch: typing.Callable[..., None] = None #set by the worker
+
+    def cancel(self):
+        """
+        Stop the computation from returning a result. If it is running, it is stopped the next time that it reports its progress
+        """
+        self._cancelled.set()
+
+    def report_progress(self, done: int, total: int):
+        """
+        Report progress to on_progress. Called by the function being run
+
+        Args:
+            done (int): number of steps that have been completed
+            total (int): total number of steps
+
+        Raises:
+            concurrent.futures.CancelledError: the task has been cancelled, so the function should stop (this can be left to stop the function)
+        """
+        if self.cancelled:
+            raise concurrent.futures.CancelledError()
+
+        if self.on_progress is not None:
+            self._dispatch(self._deliver, self.on_progress, done, total)
+
+    def _deliver(self, callback: typing.Callable[..., None], *args):
+        """
+        Call a callback, unless the task was cancelled after the callback was dispatched
+        """
+        if not self.cancelled:
+            callback(*args)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+class ComputeWorker:
+    """
+    Runs computations (such as Datatable loads) one at a time on a background thread so that they don't block the thread that sent them (e.g. the UI thread).
+    Results, exceptions and progress are passed to callbacks through dispatch, which should call them on the thread that they are wanted on (e.g. wx.CallAfter).
+    Sending a computation cancels any computation with the same key that hasn't finished yet, so callbacks are only ever called for the newest computation for each key
+
+    Kwargs:
+        dispatch (func: (func, *args) -> None): calls a callback with arguments. If None, callbacks are called on the worker thread
+    """
+    def __init__(self, dispatch: typing.Callable[..., None] = None):
+        if dispatch is None:
+            dispatch = lambda callback, *args: callback(*args)
+
+        self._dispatch = dispatch
+
+        self._task_queue: queue.Queue = queue.Queue() #None stops the thread
+        self._current_tasks: typing.Dict[str, ComputeTask] = {} #newest task for each key
+        self._tasks_lock = threading.Lock()
+
+        self._running = True
+
+        self._thread = threading.Thread(target = self._workerd, name = 'Compute Worker Thread', daemon = True)
+        self._thread.start()
+
+    def _workerd(self):
+        """
+        Thread that runs the computations. Automatically started on object creation
+        """
+        while True:
+            task: ComputeTask = self._task_queue.get()
+            if task is None: #the worker is being closed
+                break
+
+            if task.cancelled: #replaced before it started
+                continue
+
+            try:
+                result = task.function(task)
+
+            except concurrent.futures.CancelledError: #replaced while it was running
+                pass
+
+            except Exception as e:
+                if task.on_error is not None:
+                    self._dispatch(task._deliver, task.on_error, e)
+
+            else:
+                self._dispatch(task._deliver, task.on_result, result)
+
+            with self._tasks_lock:
+                if self._current_tasks.get(task.key) is task:
+                    self._current_tasks.pop(task.key)
+
+    def submit(self, key: str, function: typing.Callable[[ComputeTask], typing.Any], on_result: typing.Callable[[typing.Any], None], on_error: typing.Callable[[Exception], None] = None, on_progress: typing.Callable[[int, int], None] = None) -> ComputeTask:
+        """
+        Send a computation to the worker thread, cancelling any unfinished computation with the same key
+
+        Args:
+            key (str): identifies what the computation is for (e.g. the table in a frame)
+            function (func: ComputeTask -> object): the computation. It can report its progress through the task that it is given
+            on_result (func: object -> None): called with the result of function
+
+        Kwargs:
+            on_error (func: Exception -> None): called with any exception raised by function
+            on_progress (func: int, int -> None): called with the number of steps completed and the total number of steps whenever function reports its progress
+
+        Returns:
+            (ComputeTask): the task that will run the computation
+        """
+        if not self._running:
+            raise RuntimeError("Can't send computations to a worker that has been closed")
+
+        task = ComputeTask(key, function, on_result, on_error, on_progress)
+        task._dispatch = self._dispatch
+
+        with self._tasks_lock:
+            if key in self._current_tasks:
+                self._current_tasks[key].cancel()
+            self._current_tasks[key] = task
+
+        self._task_queue.put(task)
+        return task
+
+    def cancel(self, key: str):
+        """
+        Cancel the unfinished computation with this key, if there is one
+        """
+        with self._tasks_lock:
+            if key in self._current_tasks:
+                self._current_tasks.pop(key).cancel()
+
+    def cancel_all(self):
+        """
+        Cancel all unfinished computations (e.g. before closing the file that they use)
+        """
+        with self._tasks_lock:
+            for key in self._current_tasks:
+                self._current_tasks[key].cancel()
+            self._current_tasks.clear()
+
+    def close(self, wait: bool = True):
+        """
+        Cancel all unfinished computations and stop the worker thread
+
+        Args:
+            wait (bool: True): wait for the thread to exit before returning
+        """
+        if self._running:
+            self._running = False
+            self.cancel_all()
+            self._task_queue.put(None)
+
+            if wait:
+                self._thread.join()
+
+    #context management
+    def __enter__(self) -> "ComputeWorker":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
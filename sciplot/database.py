@@ -1,9 +1,16 @@
 from dataclasses import dataclass
-import multiprocessing, multiprocessing.connection
+import concurrent.futures
+import queue
 import sqlite3
 import threading
 import typing
 import shutil
+import logging
+import os
+import urllib.request
+
+
+_logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -15,16 +22,21 @@ class Query:
 
     arguments (list of serialisable): arguments to replace (?) in query
 
-    fetchmode (int: 0-3):
+    fetchmode (int: -2-3):
         0 - fetch none
         1 - fetch all
         2 - fetch one
-        3 - fetch many
-       -1 - blank interrupt (used internally)
+        3 - stream (used by iter_query): the database thread keeps the cursor and returns an identifier for it
+       -1 - blank interrupt (skipped)
+       -2 - fetch the next rows of a streamed cursor (used by iter_query): arguments are the cursor identifier and the number of rows.
+            The cursor is closed once it runs out of rows or if 0 rows are requested
+    
+    many (bool: False): execute the query once for every list of arguments in arguments (which can be any iterable, including a generator). The query must be a single statement
     """
     query: str
     arguments: list
     fetchmode: int
+    many: bool = False
 
 
 class Database:
@@ -33,25 +45,27 @@ class Database:
 
     Args:
         path (str): the path to the SQLite3 database
+    
+    Kwargs:
+        read_connections (int: 0): number of extra read-only connections (each with its own thread) that run queries that only read from the database concurrently.
+                                   This puts the database in WAL journal mode. Reads still go through the main connection while its transaction contains writes, as they wouldn't be visible to the other connections.
+                                   In-memory databases can't have read connections
+        read_only (bool: False): open the database without being able to write to it, so that it can be read from a read-only file or file system. Queries that write raise sqlite3.OperationalError.
+                                 The database must already exist
     """
-    def __init__(self, path: str):
+    def __init__(self, path: str, read_connections: int = 0, read_only: bool = False):
         #database connection
         self._connection: sqlite3.Connection = None
 
-        #query transfer
-        self._query_pipe, pipe = multiprocessing.Pipe()
-        self._query_pipe_size: int = 0
-        self._query_pipe_ready = threading.Event()
-        self._query_pipe_ready.clear()
-
-        #data response
-        self._response_values = {}
-        self._response_written_event = threading.Event()
-        self._response_ids = 0
-        self._response_id_event = threading.Event()
-        self._response_id_event.set()
+        #query transfer: each item is a list of queries and the future to complete with their results (None stops the thread)
+        self._query_queue: queue.Queue = queue.Queue()
+        self._read_queue: queue.Queue = queue.Queue()
 
-        self._response_collected_event = threading.Event()
+        #uncommitted write tracking: each batch that could write is numbered when it is sent, and the database thread records the last batch after which the transaction contained no writes
+        #the read connections can only be used when these are the same (so they see the same data as the main connection)
+        self._dispatch_lock = threading.Lock()
+        self._write_counter: int = 0
+        self._clean_counter: int = 0
 
         #successful db connection control
         self._creation_event = threading.Event()
@@ -62,80 +76,193 @@ class Database:
         self._running = True
 
         #database thread
-        self._query_thread = threading.Thread(target = self._queryd, args = [path, pipe], name = 'SQLite3 Database Query Thread', daemon = True)
+        self._query_thread = threading.Thread(target = self._queryd, args = [path, read_connections > 0, read_only], name = 'SQLite3 Database Query Thread', daemon = True)
         self._query_thread.start()
 
         #throw any database creation exceptions
         self._creation_event.wait()
         if self._creation_exception is not None:
+            self._running = False
             raise type(self._creation_exception)(str(self._creation_exception))
         
+        #read-only database threads
+        self._read_threads: typing.List[threading.Thread] = []
+        read_creation_events: typing.List[threading.Event] = []
+        for i in range(read_connections):
+            read_creation_events.append(threading.Event())
+            self._read_threads.append(threading.Thread(target = self._readd, args = [path, read_creation_events[-1]], name = 'SQLite3 Database Read Thread {}'.format(i), daemon = True))
+            self._read_threads[-1].start()
+        
+        #throw any read connection creation exceptions (e.g. for in-memory databases, which can't be opened by another connection). nothing would read from the queue of a thread that failed
+        for event in read_creation_events:
+            event.wait()
+        if self._creation_exception is not None:
+            exception = self._creation_exception
+            self.close()
+            raise type(exception)(str(exception))
+        
         #open a new transaction
         query = Query("BEGIN", [], 1)
         self.query(query)
     
-    def _queryd(self, path: str, pipe: multiprocessing.connection.PipeConnection):
+    def _queryd(self, path: str, use_wal: bool, read_only: bool):
         """
         Thread that processes queries and handles interactions with the database. Automatically started on object creation
         """
         try:
-            self._connection: sqlite3.Connection = sqlite3.connect(path)
+            if read_only: #the journal mode can't be changed without writing
+                self._connection: sqlite3.Connection = sqlite3.connect(_read_only_uri(path), uri = True)
+            else:
+                self._connection: sqlite3.Connection = sqlite3.connect(path)
+                if use_wal:
+                    self._connection.execute("PRAGMA journal_mode=WAL;")
         except Exception as e:
             self._creation_exception = e
+            return
         finally:
             self._creation_event.set()
 
-        while self._running:
-            self._query_pipe_ready.wait()
-            data: typing.Tuple[int, typing.List[Query]] = pipe.recv()
-            self._query_pipe_size -= 1
-            if self._query_pipe_size <= 0:
-                self._query_pipe_ready.clear()
-            counter, queries = data
-
-            return_values = []
-            for query in queries:
-                if query.fetchmode != -1: #blank interrupt, skip this query
-                    try:
-                        for line in query.query.split(';'):
-                            if line != '':
-                                line += ';'
-                                
-                                cursor = self._connection.execute(line, query.arguments)
-
-                                if query.fetchmode == 1: #mode: fetch all
-                                    return_values.append((0, cursor.fetchall()))
-
-                                elif query.fetchmode == 2: #mode: fetch one
-                                    return_values.append((0, cursor.fetchone()))
-
-                                elif query.fetchmode == 3: #mode: fetch many rows (unused)
-                                    return_values.append((0, cursor.fetchmany()))
-                    
-                    except Exception as e:
-                        self._connection.execute("ROLLBACK;") #roll back after bad transaction
-                        self._connection.execute("BEGIN;")
-
-                        if query.fetchmode == 0: #rethrow the exception: there is no thread to throw it in other than this one
-                            raise type(e)(str(e))
-                        
-                        else: #send the exception back to the waiting thread to be thrown there
-                            return_values.append((1, (type(e), str(e))))
-                            self._running = False
-                
-            if len(return_values) > 0:
-                self._response_values[counter] = return_values
-                self._response_collected_event.clear()
-                self._response_written_event.set() #release all waiting query calls
-                self._response_collected_event.wait() #wait for the data to be claimed by a thread
+        transaction_has_writes = False
+        cursors: typing.Dict[int, sqlite3.Cursor] = {} #streamed cursors
+        cursor_counter = 0
+        while True:
+            item: typing.Tuple[typing.List[Query], concurrent.futures.Future, int] = self._query_queue.get()
+            if item is None: #the database is being closed
+                break
+
+            queries, future, counter = item
+            if not future.set_running_or_notify_cancel(): #the caller no longer wants the result
+                continue
+            
+            try:
+                return_values = []
+                for query in queries:
+                    if query.fetchmode == -2: #fetch the next rows of a streamed cursor
+                        cursor_id, batch_size = query.arguments
+                        rows = []
+                        if cursor_id in cursors:
+                            if batch_size > 0:
+                                rows = cursors[cursor_id].fetchmany(batch_size)
+                            
+                            if len(rows) < batch_size or batch_size == 0: #no rows left (or the stream is being abandoned)
+                                cursors.pop(cursor_id).close()
+
+                        return_values.append(rows)
+
+                    elif query.fetchmode != -1: #blank interrupt, skip this query
+                        for line in _split_statements(query.query):
+                            #keep track of whether there are any uncommitted writes
+                            keyword = _statement_keyword(line)
+                            if _ends_transaction(line):
+                                transaction_has_writes = False
+                            elif keyword not in ['SELECT', 'BEGIN', '']:
+                                transaction_has_writes = True
+
+                            result = _execute_statement(self._connection, line, query)
+
+                            if query.fetchmode == 3: #keep the cursor so that its rows can be fetched later
+                                cursors[cursor_counter] = result[0]
+                                return_values.append(cursor_counter)
+                                cursor_counter += 1
+                            
+                            else:
+                                return_values += result
+            
+            except Exception as e:
+                self._connection.execute("ROLLBACK;") #roll back after bad transaction
+                self._connection.execute("BEGIN;")
+                transaction_has_writes = False
+
+                future.set_exception(e) #the exception is thrown in the thread that collects the result
+
+            else:
+                future.set_result(return_values)
+            
+            if not transaction_has_writes:
+                self._clean_counter = counter
         
         self._connection.close()
-        self._query_pipe.close()
-        self._response_collected_event.clear() #release any other waiting threads
+    
+    def _readd(self, path: str, creation_event: threading.Event):
+        """
+        Thread that runs queries that only read from the database on its own connection. Automatically started on object creation
+        """
+        try:
+            connection = sqlite3.connect(_read_only_uri(path), uri = True) #read-only, so queries that were wrongly sent here can't write
+        except Exception as e:
+            self._creation_exception = e
+            return
+        finally:
+            creation_event.set()
+
+        while True:
+            item: typing.Tuple[typing.List[Query], concurrent.futures.Future] = self._read_queue.get()
+            if item is None: #the database is being closed
+                break
+
+            queries, future = item
+            if not future.set_running_or_notify_cancel(): #the caller no longer wants the result
+                continue
+
+            try:
+                return_values = []
+                for query in queries:
+                    if query.fetchmode != -1: #blank interrupt, skip this query
+                        for line in _split_statements(query.query):
+                            return_values += _execute_statement(connection, line, query)
+            
+            except Exception as e:
+                future.set_exception(e)
+
+            else:
+                future.set_result(return_values)
+        
+        connection.close()
+
+    def query_async(self, query: typing.Union[Query, typing.List[Query]]) -> concurrent.futures.Future:
+        """
+        Sends a Query object (or a list of Query objects) to the database without waiting for them to be executed
+
+        Args:
+            query (Query or list of Query): Queries to be executed
+        
+        Returns:
+            (concurrent.futures.Future): completed with the same list that query would return (empty if no queries expect a response) once the queries have been executed.
+                                         If a query fails, the transaction is rolled back, the rest of the queries aren't executed and the future holds the exception
+        """
+        if type(query) != list:
+            query = [query]
+
+        if not self._running:
+            raise RuntimeError("Can't send queries to a database that has been closed")
+        
+        #queries are only sent to the read connections if they can't write. streamed cursors always stay on the main connection
+        could_write = False
+        read_only = len(self._read_threads) > 0
+        for q in query:
+            if q.fetchmode != -1:
+                if q.fetchmode not in [1, 2]:
+                    read_only = False
+
+                for line in _split_statements(q.query):
+                    if _statement_keyword(line) not in ['SELECT', '']:
+                        could_write = True
+        
+        future = concurrent.futures.Future()
+        with self._dispatch_lock: #the order that queries are sent in must be the same as the order they are numbered in
+            if read_only and not could_write and self._clean_counter == self._write_counter:
+                self._read_queue.put((query, future))
+
+            else:
+                if could_write:
+                    self._write_counter += 1
+                self._query_queue.put((query, future, self._write_counter))
+
+        return future
 
     def query(self, query: typing.Union[Query, typing.List[Query]]) -> typing.List[typing.Any]:
         """
-        Sends a Query object (or a list of Query objects) to the database. If any Query objects expect a response, hang until one is received
+        Sends a Query object (or a list of Query objects) to the database and hangs until they have been executed, so that any exception (after which the transaction has been rolled back) is thrown in the calling thread
 
         Args:
             query (Query or list of Query): Queries to be executed
@@ -146,59 +273,70 @@ class Database:
                 list of tuple: fetchmode = 1, 3
             for each query where fetchmode =/= 0
         """
-        if type(query) == list:
-            #check if any of the queries expect a response
-            wait_for_value = False
-            for q in query:
-                if q.fetchmode not in [-1, 0]:
-                    wait_for_value = True
+        if type(query) != list:
+            query = [query]
 
-            self._response_id_event.wait()
-            self._response_id_event.clear()
+        future = self.query_async(query)
 
-            self._query_pipe.send((self._response_ids, query))
+        #wait for every batch that runs a query, even if there is no response, as a failure rolls back any uncommitted changes and the caller must know about it
+        expects_response = False
+        runs_query = False
+        for q in query:
+            if q.fetchmode != -1:
+                runs_query = True
 
-            self._query_pipe_size += 1
-            self._query_pipe_ready.set()
-
-            counter = self._response_ids
-            self._response_ids += 1
-            self._response_id_event.set()
-
-            result = None
-
-            if wait_for_value: #at least one query expects a value
-                cont = True
-                while cont and self._running:
-                    self._response_written_event.wait() #wait for data to be written
-                    
-                    if counter in self._response_values: #check if the data that has been written is for this call
-                        returned_value = self._response_values.pop(counter)
+                if q.fetchmode != 0:
+                    expects_response = True
+        
+        if runs_query:
+            result = future.result() #exceptions triggered here have been handed down by the database thread
 
-                        result = []
-                        for identifier, data in returned_value:
-                            if identifier == 0:
-                                result.append(data)
-                                
-                            elif identifier == 1:
-                                raise data[0](data[1]) #exceptions triggered here have been handed down by the database thread
+            if expects_response:
+                return result
 
-                        cont = False
-                        self._response_collected_event.set()
+        return None
+    
+    def iter_query(self, query: Query, batch_size: int = 1000) -> typing.Iterator[tuple]:
+        """
+        Execute a query and yield the rows that it returns without fetching them all at once. The cursor is kept by the database thread and the rows are fetched in batches,
+        so other queries can be sent while the rows are being iterated over
 
-                    self._response_written_event.clear()
+        Args:
+            query (Query): query to be executed (fetchmode is ignored). If it contains multiple statements, the rows of each statement are yielded in order
+        
+        Kwargs:
+            batch_size (int: 1000): number of rows to fetch from the database thread at a time
+        
+        Returns:
+            (iterator of tuple): rows returned by the query
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1, not {}".format(batch_size))
 
-            return result
+        cursor_ids = self.query(Query(query.query, query.arguments, 3))
+        try:
+            while len(cursor_ids) > 0:
+                rows = self.query(Query("", [cursor_ids[0], batch_size], -2))[0]
+                yield from rows
 
-        else:
-            return self.query([query]) #don't duplicate functionality, just make another call with a corrected data format
+                if len(rows) < batch_size: #the database thread has closed the cursor
+                    cursor_ids.pop(0)
+        
+        finally: #the iterator was abandoned or failed, close the remaining cursors
+            if len(cursor_ids) > 0 and self._running:
+                self.query([Query("", [cursor_id, 0], -2) for cursor_id in cursor_ids])
         
     def commit(self, wait: bool = True):
         """
         Commit transaction to the database and open a new one
         """
-        self.query([Query('COMMIT;', [], int(wait)),
-                    Query('BEGIN;', [], int(wait))])
+        queries = [Query('COMMIT;', [], 0),
+                   Query('BEGIN;', [], 0)]
+
+        if wait:
+            self.query(queries)
+        else: #nothing waits for the result, so a failure can only be reported in the log
+            self.query_async(queries).add_done_callback(_log_exception)
     
     def close(self, wait: bool = True):
         """
@@ -209,14 +347,14 @@ class Database:
         """
         if self._running:
             self._running = False
-
-            try:
-                self.query(Query("", [], -1)) #interrupt the thread so that it will process _running = False
-            except:
-                pass #pipe has already been closed
-
-            if wait:
-                self._query_thread.join() #wait for the thread to exit
+            self._query_queue.put(None) #stop the threads once they have executed the queries that were sent before this
+            for thread in self._read_threads:
+                self._read_queue.put(None)
+
+            if wait: #wait for the threads to exit
+                for thread in self._read_threads:
+                    thread.join()
+                self._query_thread.join()
     
     #context management
     #these python magic methods allow it to be used in with .. as ..: syntax where the database is guaranteed to be closed automatically
@@ -225,4 +363,68 @@ class Database:
         return self
     
     def __exit__(self, *args):
-        self.close()
\ No newline at end of file
+        self.close()
+
+def _read_only_uri(path: str) -> str:
+    """
+    Make a URI that opens the database at a path without being able to write to it
+    """
+    return 'file:{}?mode=ro'.format(urllib.request.pathname2url(os.path.abspath(path)))
+
+def _log_exception(future: concurrent.futures.Future):
+    """
+    Log the exception of a batch of queries that nothing is waiting for
+    """
+    if not future.cancelled() and future.exception() is not None:
+        _logger.error('Queries failed and the transaction was rolled back', exc_info = future.exception())
+
+
+def _split_statements(query: str) -> typing.List[str]:
+    """
+    Split the text of a query into its statements (each ending with ;)
+    """
+    return [line + ';' for line in query.split(';') if line != '']
+
+
+def _statement_keyword(statement: str) -> str:
+    """
+    Get the first keyword of a statement in upper case (e.g. SELECT), or an empty string if the statement is empty
+    """
+    words = statement.rstrip(';').split(None, 1)
+    if len(words) == 0:
+        return ''
+    else:
+        return words[0].upper()
+
+
+def _ends_transaction(statement: str) -> bool:
+    """
+    Check whether a statement ends the transaction (COMMIT, END or ROLLBACK, but not ROLLBACK TO a savepoint, which keeps the transaction open)
+    """
+    words = statement.rstrip(';').upper().split()
+    return len(words) > 0 and words[0] in ['COMMIT', 'END', 'ROLLBACK'] and 'TO' not in words[1:]
+
+
+def _execute_statement(connection: sqlite3.Connection, statement: str, query: Query) -> list:
+    """
+    Execute a single statement from a query
+
+    Returns:
+        list: empty if the query doesn't expect a response, otherwise contains the fetched row(s) (or the cursor, when streaming)
+    """
+    if query.many:
+        cursor = connection.executemany(statement, query.arguments)
+    else:
+        cursor = connection.execute(statement, query.arguments)
+
+    if query.fetchmode == 1: #mode: fetch all
+        return [cursor.fetchall()]
+
+    elif query.fetchmode == 2: #mode: fetch one
+        return [cursor.fetchone()]
+
+    elif query.fetchmode == 3: #mode: stream, the rows are fetched later
+        return [cursor]
+    
+    else:
+        return []
@@ -1,18 +1,56 @@
+from dataclasses import dataclass
 import os
-import sys
+import threading
 
 from sciplot.database import *
 
 
+@dataclass
+class _UnitRegistry:
+    """
+    Struct holding every unit in a datafile so that they can be looked up without querying the database
+
+    base_units (dict of int: str): symbol of each base unit
+
+    composite_units (dict of int: (str, list of (int, float))): symbol and unit table (base unit primary keys and powers) of each composite unit
+
+    composite_ids_by_table (dict of frozenset of (int, float): list of int): primary keys of the composite units with each unit table
+    """
+    base_units: typing.Dict[int, str]
+    composite_units: typing.Dict[int, typing.Tuple[str, typing.List[typing.Tuple[int, float]]]]
+    composite_ids_by_table: typing.Dict[typing.FrozenSet[typing.Tuple[int, float]], typing.List[int]]
+
+
 class DataFile(Database):
     """
     A thread-safe database object with methods specific to databases following the internal file structure
 
     Args:
         path (str): path to datafile
+    
+    Kwargs:
+        read_connections (int: 0): number of extra connections that only read from the datafile (see Database)
+        read_only (bool: False): open the datafile without being able to write to it (see Database). Missing indexes aren't added
     """
-    def __init__(self, path: str):
-        super().__init__(path)
+    def __init__(self, path: str, read_connections: int = 0, read_only: bool = False):
+        #all units in the datafile, loaded when they are first needed. Thrown away (see _invalidate_unit_registry) whenever the units could have changed
+        self._unit_registry: _UnitRegistry = None
+        self._unit_registry_generation: int = 0 #incremented whenever the registry is thrown away, so that a registry loaded on another thread in the meantime isn't kept
+        self._unit_registry_lock = threading.Lock()
+
+        super().__init__(path, read_connections, read_only)
+
+        if not read_only and self.tables_are_valid(): #files made before indexes were added to the structure need them to be created
+            self.initialise_indexes()
+    
+    def query_async(self, query: typing.Union[Query, typing.List[Query]]) -> concurrent.futures.Future:
+        future = super().query_async(query)
+        future.add_done_callback(self._query_done)
+        return future
+    
+    def _query_done(self, future: concurrent.futures.Future):
+        if not future.cancelled() and future.exception() is not None: #the transaction has been rolled back, so any changes to the units have been undone
+            self._invalidate_unit_registry()
     
     ##ddl
     #management
@@ -23,6 +61,7 @@ class DataFile(Database):
     def goto_rollback(self):
         queries = [Query("ROLLBACK", [], 1), Query("BEGIN", [], 1)]
         self.query(queries)
+        self._invalidate_unit_registry()
     
     #tables
     def tables_are_valid(self) -> bool:
@@ -30,11 +69,7 @@ class DataFile(Database):
         Make sure that the database contains the correct tables
         """
         #load ddl for required tables from disk
-        ddl_queries: typing.Dict[str, str] = {}
-        for name in os.listdir(os.path.join(sys.path[0], "resources", "ddl")):
-            if name.endswith('.sql'):
-                with open(os.path.join(sys.path[0], "resources", "ddl", name), 'r') as file:
-                    ddl_queries[name[:-4]] = file.read()
+        ddl_queries = _load_ddl(_DDL_PATH)
 
         #get names of all tables
         table_names = [tup[0] for tup in self.query(Query('SELECT name FROM sqlite_master WHERE type = "table" and name NOT LIKE "sqlite_%"', [], 1))[0]]
@@ -52,19 +87,34 @@ class DataFile(Database):
     
     def initialise_tables(self):
         #load ddl for required tables from disk
-        ddl_queries: typing.Dict[str, str] = {}
-        for name in os.listdir(os.path.join(sys.path[0], "resources", "ddl")):
-            if name.endswith('.sql'):
-                with open(os.path.join(sys.path[0], "resources", "ddl", name), 'r') as file:
-                    ddl_queries[name[:-4]] = file.read()
+        ddl_queries = _load_ddl(_DDL_PATH)
         
         for name in ddl_queries:
             self.query(Query(ddl_queries[name], [], 0))
+        
+        self.initialise_indexes()
 
         queries = []
         for name in ["s", "m", "kg", "A", "K", "mol", "cd"]: #add base SI units to new database
             queries.append(Query("INSERT INTO Unit (Symbol) VALUES ((?))", [name], 0))
         self.query(queries)
+        self._invalidate_unit_registry()
+    
+    def initialise_indexes(self):
+        """
+        Create any indexes that are missing from the database. Indexes aren't checked by tables_are_valid, so older files without them are still valid
+        """
+        ddl_queries = _load_ddl(os.path.join(_DDL_PATH, "indexes"))
+
+        index_names = [tup[0] for tup in self.query(Query('SELECT name FROM sqlite_master WHERE type = "index"', [], 1))[0]]
+
+        queries = []
+        for name in ddl_queries:
+            if name not in index_names:
+                queries.append(Query(ddl_queries[name], [], 0))
+        
+        if len(queries) > 0:
+            self.query(queries)
     
     ##dml
     #metadata
@@ -114,18 +164,15 @@ class DataFile(Database):
         return result[0]
     
     def get_base_unit(self, base_unit_id: int) -> str:
-        query = Query("SELECT Symbol FROM Unit WHERE UnitID = (?)", [base_unit_id], 2)
-        return self.query(query)[0][0]
+        return self._get_unit_registry().base_units[base_unit_id]
     
     #composite units
     def get_unit_id_by_symbol(self, symbol: str) -> int:
         query = Query("SELECT UnitCompositeID FROM UnitComposite WHERE Symbol = (?)", [symbol], 2)
         return [tup[0] for tup in self.query(query)]
 
-    def get_unit_by_id(self, unit_id: int) -> typing.Tuple[str, typing.Tuple[int, float]]:
-        unit_details = self.query(Query("SELECT Unit.UnitID, UnitCompositeDetails.Power FROM UnitCompositeDetails INNER JOIN Unit ON Unit.UnitID = UnitCompositeDetails.UnitID WHERE UnitCompositeDetails.UnitCompositeID = (?)", [unit_id], 1))[0]
-        unit_symbol = self.query(Query('SELECT UnitComposite.Symbol FROM UnitComposite WHERE UnitComposite.UnitCompositeID = (?)', [unit_id], 2))[0][0]
-        return unit_symbol, unit_details
+    def get_unit_by_id(self, unit_id: int) -> typing.Tuple[str, typing.Tuple[int, float]]: #the unit table is shared between calls, so it must not be modified
+        return self._get_unit_registry().composite_units[unit_id]
     
     def create_unit(self, symbol: str, base_units: typing.List[typing.Tuple[int, float]]) -> int:
         queries = [Query('INSERT INTO UnitComposite (Symbol) VALUES ((?));', [symbol], 0),
@@ -135,7 +182,8 @@ class DataFile(Database):
         for base_unit_id, power in base_units:
             query = Query('INSERT INTO UnitCompositeDetails (UnitCompositeID, UnitID, Power) VALUES ((?), (?), (?))', [unit_id, base_unit_id, power], 0)
             self.query(query)
-            
+        
+        self._invalidate_unit_registry()
         return unit_id
     
     def list_units(self) -> typing.List[int]:
@@ -144,29 +192,23 @@ class DataFile(Database):
     def remove_unit(self, unit_id: int):
         self.query([Query('DELETE FROM UnitComposite WHERE UnitCompositeID = (?)', [unit_id], 0),
                     Query('DELETE FROM UnitCompositeDetails WHERE UnitCompositeID = (?)', [unit_id], 0)])
+        self._invalidate_unit_registry()
     
     def get_unit_id_by_table(self, unit_table: typing.List[typing.Tuple[int, float]]) -> typing.List[int]:
-        unitcomposite_ids: typing.List[int] = [tup[0] for tup in self.query(Query("SELECT UnitCompositeID FROM UnitComposite;", [], 1))[0]]
-
-        matches = []
-        for i in range(len(unitcomposite_ids)):
-            scan_units = self.query(Query("SELECT UnitCompositeDetails.UnitID, UnitCompositeDetails.Power FROM UnitComposite INNER JOIN UnitCompositeDetails ON UnitCompositeDetails.UnitCompositeID = UnitComposite.UnitCompositeID WHERE UnitComposite.UnitCompositeID = (?);", [unitcomposite_ids[i]], 1))[0]
-            
-            if set(scan_units) == set(unit_table):
-                matches.append(unitcomposite_ids[i])
-
-        return matches
+        return list(self._get_unit_registry().composite_ids_by_table.get(frozenset(unit_table), []))
     
     def rename_unit(self, primary_key: int, symbol: str):
         self.query(Query("UPDATE UnitComposite SET Symbol = (?) WHERE UnitCompositeID = (?);", [symbol, primary_key], 0))
+        self._invalidate_unit_registry()
     
     def update_unit(self, primary_key: int, unit_table: typing.List[typing.Tuple[int, float]]):
         queries = [Query("DELETE FROM UnitCompositeDetails WHERE UnitCompositeID = (?)", [primary_key], 0)]
         for unit_id, power in unit_table:
             queries.append(Query("INSERT INTO UnitCompositeDetails (`UnitCompositeID`, `UnitID`, `Power`) VALUES ((?), (?), (?))", [primary_key, unit_id, power], 0))
         self.query(queries)
+        self._invalidate_unit_registry()
     
-    def update_units(self, table_name: str, table_id: int, unit_name: str, unit_table: typing.List[typing.Tuple[int, float]]):
+    def update_units(self, table_name: str, table_id: int, unit_name: str, unit_table: typing.List[typing.Tuple[int, float]]) -> bool: #returns whether the units were changed
         if table_name not in ["DataSet", "Constant"]: #sanitise input
             raise ValueError('Invalid table: {}'.format(table_name))
 
@@ -205,6 +247,9 @@ class DataFile(Database):
                     self.query(Query("UPDATE {0} SET UnitCompositeID = (?) WHERE {0}ID = (?);".format(table_name), [potential_merges[0], table_id], 0))
                     self.query(Query("DELETE FROM UnitComposite WHERE UnitCompositeID = (?);", [unit_composite_id], 0))
                     self.query(Query("DELETE FROM UnitCompositeDetails WHERE UnitCompositeID = (?);", [unit_composite_id], 0))
+                    self._invalidate_unit_registry()
+        
+        return units_changed
     
     def prune_unused_composite_units(self): #remove composite units that aren't attached to a data set or constant
         for composite_unit_id in self.query(Query("SELECT UnitCompositeID FROM UnitComposite", [], 1))[0]:
@@ -213,6 +258,50 @@ class DataFile(Database):
             if len(self.query(Query("SELECT DataSetID FROM DataSet WHERE UnitCompositeID = (?)", [composite_unit_id], 1))[0]) == 0 and len(self.query(Query("SELECT ConstantID FROM Constant WHERE UnitCompositeID = (?)", [composite_unit_id], 1))[0]) == 0:
                 self.query(Query("DELETE FROM UnitComposite WHERE UnitCompositeID = (?);", [composite_unit_id], 1))
                 self.query(Query("DELETE FROM UnitCompositeDetails WHERE UnitCompositeID = (?);", [composite_unit_id], 1))
+        
+        self._invalidate_unit_registry()
+    
+    def _get_unit_registry(self) -> _UnitRegistry:
+        """
+        Get every unit in the datafile, loading them from the database if they have changed since they were last loaded
+        """
+        with self._unit_registry_lock:
+            registry = self._unit_registry
+            generation = self._unit_registry_generation
+
+        if registry is None:
+            registry = _UnitRegistry({}, {}, {})
+
+            for base_unit_id, symbol in self.query(Query("SELECT UnitID, Symbol FROM Unit;", [], 1))[0]:
+                registry.base_units[base_unit_id] = symbol
+
+            for unit_id, symbol in self.query(Query("SELECT UnitCompositeID, Symbol FROM UnitComposite;", [], 1))[0]:
+                registry.composite_units[unit_id] = (symbol, [])
+            
+            for unit_id, base_unit_id, power in self.query(Query("SELECT UnitCompositeDetails.UnitCompositeID, Unit.UnitID, UnitCompositeDetails.Power FROM UnitCompositeDetails INNER JOIN Unit ON Unit.UnitID = UnitCompositeDetails.UnitID ORDER BY UnitCompositeDetails.rowid;", [], 1))[0]:
+                if unit_id in registry.composite_units:
+                    registry.composite_units[unit_id][1].append((base_unit_id, power))
+            
+            for unit_id in registry.composite_units:
+                key = frozenset(registry.composite_units[unit_id][1])
+                if key in registry.composite_ids_by_table:
+                    registry.composite_ids_by_table[key].append(unit_id)
+                else:
+                    registry.composite_ids_by_table[key] = [unit_id]
+            
+            with self._unit_registry_lock:
+                if generation == self._unit_registry_generation: #the units haven't changed while they were being loaded
+                    self._unit_registry = registry
+        
+        return registry
+    
+    def _invalidate_unit_registry(self):
+        """
+        Throw away the loaded units so that they are loaded again when they are next needed
+        """
+        with self._unit_registry_lock:
+            self._unit_registry_generation += 1
+            self._unit_registry = None
     
     #data sets
     def list_data_sets(self) -> typing.List[int]:
@@ -247,6 +336,23 @@ WHERE DataSet.DataSetID = (?)'''
         return self.query([Query('INSERT INTO DataPoint (DataSetID, Value) VALUES ((?), (?));', [data_set_id, value], 0),
                            Query('SELECT last_insert_rowid();', [], 2)])[0][0]
     
+    def create_data_points(self, values: typing.Iterable[float], data_set_id: int) -> range:
+        """
+        Add many data points to a data set at once
+
+        Args:
+            values (iterable of float): values of the new data points. Can be a generator, which will be consumed by the database thread
+            data_set_id (int): primary key of the data set to add the data points to
+        
+        Returns:
+            (range): primary keys of the new data points
+        """
+        #the queries are executed together, so the new primary keys are the ones after the largest primary key before the insert
+        result = self.query([Query('SELECT IFNULL(MAX(DataPointID), 0) FROM DataPoint;', [], 2),
+                             Query('INSERT INTO DataPoint (DataSetID, Value) VALUES ((?), (?));', ((data_set_id, value) for value in values), 0, True),
+                             Query('SELECT IFNULL(MAX(DataPointID), 0) FROM DataPoint;', [], 2)])
+        return range(result[0][0] + 1, result[1][0] + 1)
+    
     def get_data_point(self, data_point_id: int) -> typing.Tuple[int, float]:
         return self.query(Query('SELECT DataSetID, Value FROM DataPoint WHERE DataPointID = (?)', [data_point_id], 2))[0]
     
@@ -371,4 +477,23 @@ WHERE DataSet.DataSetID = (?)'''
                 else:
                     unit_string += ' {}^{}'.format(unit_name, unit_power)
         
-        return unit_string[1:]
\ No newline at end of file
+        return unit_string[1:]
+
+#location of the sql files that define the structure of a datafile
+_DDL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "ddl")
+
+
+def _load_ddl(path: str) -> typing.Dict[str, str]:
+    """
+    Load the ddl for each table (or index) from the .sql files in a directory
+
+    Returns:
+        (dict of str: str): ddl query for each table (or index) name
+    """
+    ddl_queries: typing.Dict[str, str] = {}
+    for name in os.listdir(path):
+        if name.endswith('.sql'):
+            with open(os.path.join(path, name), 'r') as file:
+                ddl_queries[name[:-4]] = file.read()
+    
+    return ddl_queries
@@ -1,5 +1,8 @@
 import typing
 import math
+import threading
+
+import numpy
 
 import sciplot
 import sciplot.functions as functions
@@ -8,18 +11,138 @@ import sciplot.datafile as datafile
 import sciplot.graphing as graphing
 
 
+class ChangeTracker:
+    """
+    Keeps the results of previous Datatable loads so that only the values downstream of a change are evaluated again.
+    Changes to formulae and constants are found when a Datatable is loaded, but changes to data sets (or anything else stored in the datafile)
+    must be reported using data_set_changed or invalidate_all. A ChangeTracker must only be used with one datafile.
+    It can be shared between threads (e.g. changes reported by the UI while a load runs on a ComputeWorker)
+    """
+    def __init__(self):
+        self._values: typing.Dict[str, typing.Union[sciplot.Value, sciplot.ValueColumn]] = {} #results by dependency name
+        self._dependents: typing.Dict[str, typing.Set[str]] = {} #edges of the dependency graphs that have been loaded, from each dependency to the names that depend on it
+        self._expressions: typing.Dict[str, str] = None #formulae and constants at the last load, None if there hasn't been a load
+        self._constants: typing.Dict[str, typing.Tuple[float, float, typing.Tuple[typing.Tuple[int, float]]]] = None
+        self.generation: int = 0 #incremented whenever results are thrown away, so that loads running on other threads don't store results that are out of date
+        self._lock = threading.Lock() #held while results are checked, thrown away or stored
+    
+    def data_set_changed(self, symbol: str):
+        """
+        Report that the values, uncertainty or units of a data set have changed
+
+        Args:
+            symbol (str): the symbol of the data set
+        """
+        with self._lock:
+            self._invalidate(symbol)
+    
+    def invalidate_all(self):
+        """
+        Throw away all stored results (e.g. when variables have been added, removed or renamed)
+        """
+        with self._lock:
+            self.generation += 1
+            self._values.clear()
+            self._dependents.clear()
+
+    def check_for_changes(self, expressions: typing.Dict[str, str], constants_table: typing.Dict[str, sciplot.Value]) -> int:
+        """
+        Throw away the results that depend on any formulae or constants that have changed since the last load. Called by Datatable.load
+
+        Args:
+            expressions (dict of str: str): the expression of every formula by symbol
+            constants_table (dict of str: sciplot.Value): the constants being used for this load
+        
+        Returns:
+            (int): the generation after the check, to be passed to store_values
+        """
+        constants = {symbol: self._constant_signature(constants_table[symbol]) for symbol in constants_table}
+
+        with self._lock:
+            if self._expressions is not None:
+                for old_table, new_table in [(self._expressions, expressions), (self._constants, constants)]:
+                    for name in set(old_table).union(new_table): #added, removed and changed names
+                        if name not in old_table or name not in new_table or old_table[name] != new_table[name]:
+                            self._invalidate(name)
+            
+            self._expressions = expressions.copy()
+            self._constants = constants
+
+            return self.generation
+
+    def get_value(self, dependency_name: str) -> typing.Union[sciplot.Value, sciplot.ValueColumn]:
+        """
+        Get the stored result for a dependency name
+
+        Returns:
+            (Value or ValueColumn): the stored result
+            (None): there is no result stored for this name, so it must be evaluated
+        """
+        with self._lock:
+            return self._values.get(dependency_name)
+    
+    def store_values(self, dependency_table: typing.Dict[str, typing.Dict[str, object]], values_table: typing.Dict[str, typing.Union[sciplot.Value, sciplot.ValueColumn]], generation: int = None):
+        """
+        Store the evaluated dependency graph from a load so that its results can be reused. Called by Datatable.load
+
+        Kwargs:
+            generation (int: None): the generation when the load started. If results have been thrown away since, the results of the load might be out of date so they aren't stored
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            for dependency_name in values_table:
+                self._values[dependency_name] = values_table[dependency_name]
+
+                for dependency in dependency_table[dependency_name]["dependencies"]:
+                    if dependency in self._dependents:
+                        self._dependents[dependency].add(dependency_name)
+                    else:
+                        self._dependents[dependency] = {dependency_name}
+
+    def _invalidate(self, dependency_name: str):
+        """
+        Throw away the stored result for a name and everything downstream of it. The lock must be held
+        """
+        self.generation += 1
+
+        to_invalidate = [dependency_name]
+        while len(to_invalidate) > 0:
+            name = to_invalidate.pop()
+
+            if name in self._values:
+                self._values.pop(name)
+            
+            if name in self._dependents:
+                to_invalidate += self._dependents.pop(name)
+    
+    def _constant_signature(self, value: typing.Union[sciplot.Value, float]) -> typing.Tuple[float, float, typing.Tuple[typing.Tuple[int, float]]]:
+        """
+        Make a comparable copy of a constant (Value doesn't implement __eq__)
+        """
+        if isinstance(value, sciplot.Value):
+            return (value.value, value.absolute_uncertainty, tuple(sorted(value.units)))
+        else:
+            return (value, 0, ())
+
+
 class Datatable:
     """
     An object that evaluates multiple variables by ID and creates a table out of them ready for evaluation
 
     Args:
         datafile (Datafile): datafile to get variables from
+    
+    Kwargs:
+        change_tracker (ChangeTracker): stores results between loads so that only values affected by changes are evaluated again. If None, everything is evaluated on every load
     """
-    def __init__(self, datafile: datafile.DataFile):
+    def __init__(self, datafile: datafile.DataFile, change_tracker: ChangeTracker = None):
         self._datafile = datafile
+        self._change_tracker = change_tracker
 
         self._variable_ids: typing.List[int] = []
-        self._value_table: typing.Dict[int, typing.List[sciplot.Value]] = {}
+        self._value_table: typing.Dict[int, sciplot.ValueColumn] = {}
     
     def set_variables(self, variable_ids: typing.List[int]):
         """
@@ -31,322 +154,303 @@ class Datatable:
         """
         self._variable_ids = variable_ids.copy()
 
-    def load(self, constants_table: typing.Dict[str, sciplot.Value]):
+    def load(self, constants_table: typing.Dict[str, sciplot.Value], progress: typing.Callable[[int, int], None] = None):
         """
         Load the variables given in set_variables into memory where they can be retrieved using as_rows and as_columns
 
         Args:
             constants_table (dict of str: sciplot.Value): table containing constant values and their symbols for use while evaluating functions
+        
+        Kwargs:
+            progress (func: int, int -> None): called with the number of values evaluated so far and the total whenever a value has been evaluated. Exceptions raised by it stop the load
         """
         constants_table = constants_table.copy()
 
-        var_type_lookup = ["dataset", "formula"]
-
         #get all functions from the database
+        expressions: typing.Dict[str, str] = {}
         function_table: typing.Dict[str, functions.Function] = {}
-        function_var_table: typing.Dict[int, functions.Function] = {}
-        for variable_id, expression, name in self._datafile.query(database.Query("SELECT VariableID, Expression, Symbol FROM Formula INNER JOIN Variable ON ID = FormulaID AND Type = 1", [], 1))[0]:
+        function_dependencies: typing.Dict[str, typing.List[str]] = {} #dependencies before optimisation, so that the graph includes the constants used by each function
+        for expression, name in self._datafile.query(database.Query("SELECT Expression, Symbol FROM Formula INNER JOIN Variable ON ID = FormulaID AND Type = 1", [], 1))[0]:
             func = functions.Function(expression)
-            func.pre_evaluate(constants_table) #optimise functions
-            function_table[name] = func
-            function_var_table[variable_id] = func
-
-        #check for circular dependencies
-        #they should be checked for at submission time, but it is conceivable that there is some unknown submission/modification order
-        #that could slip one by
-        #also, the database could be maliciously crafted
-        for function_name in function_table:
-            if sciplot.functions.check_circular_dependencies(function_name, function_table):
-                raise RuntimeError("Function '{}' has circular dependencies. Cancelling load".format(function_name))
+            expressions[name] = expression
+            function_table[name] = func.pre_evaluate(constants_table) #optimise functions
+            function_dependencies[name] = func.evaluate_dependencies()
         
-        #get all datasets from the database
-        dataset_names_ids: typing.Dict[str, int] = {}
-        for dataset_symbol, variable_id in self._datafile.query(database.Query("SELECT Symbol, VariableID FROM Variable WHERE Type = 0", [], 1))[0]:
-            dataset_names_ids[dataset_symbol] = variable_id
-        
-        dependencies = [] #get names of all dependencies (things that need to be evaluated before the final variables can be evaluated)
+        if self._change_tracker is not None: #throw away stored results that are out of date
+            generation = self._change_tracker.check_for_changes(expressions, constants_table)
 
         #get data on all columns
         variable_data = []
         for variable_id in self._variable_ids:
             variable_symbol, variable_subid, variable_type = self._datafile.query(database.Query("SELECT Symbol, ID, Type FROM Variable WHERE VariableID = (?);", [variable_id], 2))[0]
             variable_data.append((variable_id, variable_symbol, variable_subid, variable_type))
-
-            if variable_symbol not in function_table: #is a dataset
-                dependencies.append((variable_symbol, variable_symbol))
         
-        #get formula dependencies
+        #build a graph of everything that the columns depend on
+        #each node is a name that can be used in a formula (e.g. a, a.MEAN, BEST.GRADIENT.a-b) and is evaluated once, after all of the nodes that it depends on
+        dependency_table: typing.Dict[str, typing.Dict[str, object]] = {}
+        dependents: typing.Dict[str, typing.List[str]] = {} #edges of the graph, from each node to the nodes that depend on it
+        to_visit = [variable_symbol for variable_id, variable_symbol, variable_subid, variable_type in variable_data]
+        while len(to_visit) > 0:
+            dependency_name = to_visit.pop()
+
+            if dependency_name not in dependency_table:
+                dependency_data = self._interpret_dependency(dependency_name, function_dependencies, constants_table)
+                dependency_table[dependency_name] = dependency_data
+
+                for dependency in dependency_data["dependencies"]:
+                    if dependency in dependents:
+                        dependents[dependency].append(dependency_name)
+                    else:
+                        dependents[dependency] = [dependency_name]
+
+                    to_visit.append(dependency)
+        
+        #evaluate the graph in topological order (Kahn's algorithm): a node is ready to be evaluated once all of its dependencies have been evaluated
+        num_unevaluated = {dependency_name: len(dependency_table[dependency_name]["dependencies"]) for dependency_name in dependency_table}
+        ready = [dependency_name for dependency_name in dependency_table if num_unevaluated[dependency_name] == 0]
+        values_table: typing.Dict[str, typing.Union[sciplot.Value, sciplot.ValueColumn]] = {}
+        subexpression_cache = functions.SubexpressionCache() #formulae often repeat branches (e.g. {x}^2), these are only evaluated once per load
+        while len(ready) > 0:
+            dependency_name = ready.pop()
+
+            value = None
+            if self._change_tracker is not None: #reuse results from previous loads where they are still valid
+                value = self._change_tracker.get_value(dependency_name)
+
+            if value is None:
+                value = self._evaluate_dependency(dependency_name, dependency_table, values_table, constants_table, function_table, subexpression_cache)
+
+            values_table[dependency_name] = value
+
+            if progress is not None:
+                progress(len(values_table), len(dependency_table))
+
+            if dependency_name in dependents:
+                for dependent in dependents[dependency_name]:
+                    num_unevaluated[dependent] -= 1
+                    if num_unevaluated[dependent] == 0:
+                        ready.append(dependent)
+        
+        #any nodes that were never ready are part of (or depend on) a cycle
+        #they should be checked for at submission time, but it is conceivable that there is some unknown submission/modification order
+        #that could slip one by
+        #also, the database could be maliciously crafted
+        if len(values_table) != len(dependency_table):
+            for dependency_name in dependency_table:
+                if dependency_name not in values_table:
+                    raise RuntimeError("Function '{}' has circular dependencies. Cancelling load".format(dependency_name))
+        
+        if self._change_tracker is not None:
+            self._change_tracker.store_values(dependency_table, values_table, generation)
+
+        #columns are nodes of the graph, so they have all already been evaluated
         for variable_id, variable_symbol, variable_subid, variable_type in variable_data:
-            if var_type_lookup[variable_type] == "formula":
-                for dependency_info in functions.evaluate_dependencies(variable_symbol, function_table):
-                    if dependency_info not in dependencies:
-                        dependencies.append(dependency_info)
+            self._value_table[variable_id] = values_table[variable_symbol]
         
-        #process dependencies so that they can be retrieved and evaluated in the correct order
-        dependency_table: typing.Dict[str, typing.Dict[str, object]] = {}
-        for symbol, dependency in dependencies:
-            current_dependency = {"symbol": symbol}
+        self._check_column_lengths()
 
-            split_dep_name = dependency.split('.')
+    def _interpret_dependency(self, dependency_name: str, function_dependencies: typing.Dict[str, typing.List[str]], constants_table: typing.Dict[str, sciplot.Value]) -> typing.Dict[str, object]:
+        """
+        Work out what a name used in a formula refers to and which other names must be evaluated before it
 
-            #interpret name
-            if dependency in function_table: #formula
-                current_dependency["type"] = "formula"
-            
-            elif dependency in constants_table: #constant
-                current_dependency["type"] = "constant"
+        Args:
+            dependency_name (str): the name to interpret
+            function_dependencies (dict of str: list of str): the dependencies of every function in the datafile
+            constants_table (dict of str: sciplot.Value): the constants available
+        
+        Returns:
+            (dict of str: object): the type of the dependency, its dependencies and any information needed to evaluate it
+        """
+        current_dependency = {"symbol": dependency_name, "dependencies": []}
 
-            elif len(split_dep_name) > 2: #graph attribute
-                current_dependency["type"] = "graphical"
+        split_dep_name = dependency_name.split('.')
 
-                if split_dep_name[0] in ["BEST", "WORST", "WORSTMIN", "WORSTMAX"]:
-                    current_dependency["fit line"] = split_dep_name[0].lower()
+        #interpret name
+        if dependency_name in function_dependencies: #formula
+            current_dependency["type"] = "formula"
+            current_dependency["dependencies"] = function_dependencies[dependency_name]
+        
+        elif dependency_name in constants_table: #constant
+            current_dependency["type"] = "constant"
 
-                if split_dep_name[1] in ["GRAD", "GRADIENT", "SLOPE"]:
-                    current_dependency["subtype"] = "gradient"
-                elif split_dep_name[1] in ["INTERCEPT", "Y-INTERCEPT"]:
-                    current_dependency["subtype"] = "intercept"
-                
-                current_dependency["axis names"] = functions.get_variable_names(dependency, split_graphs = True)
+        elif len(split_dep_name) > 2: #graph attribute
+            current_dependency["type"] = "graphical"
 
-            elif split_dep_name[-1] in ["MEAN", "MAX", "MIN"]: #processed data set
-                current_dependency["type"] = "value"
+            if split_dep_name[0] in ["BEST", "WORST", "WORSTMIN", "WORSTMAX"]:
+                current_dependency["fit line"] = split_dep_name[0].lower()
 
-                if split_dep_name[-1] == "MEAN":
-                    current_dependency["access mode"] = "single"
-                    current_dependency["processing"] = "mean"
-                
-                elif split_dep_name[-1] == "MAX":
-                    current_dependency["access mode"] = "single"
-                    current_dependency["processing"] = "max"
-                
-                elif split_dep_name[-1] == "MIN":
-                    current_dependency["access mode"] = "single"
-                    current_dependency["processing"] = "min"
+            if split_dep_name[1] in ["GRAD", "GRADIENT", "SLOPE"]:
+                current_dependency["subtype"] = "gradient"
+            elif split_dep_name[1] in ["INTERCEPT", "Y-INTERCEPT"]:
+                current_dependency["subtype"] = "intercept"
             
-                if current_dependency["symbol"] in function_table: #processed data set is actually a formula, not a data set
-                    current_dependency["subtype"] = "processed formula"
-                else:
-                    current_dependency["subtype"] = None
+            current_dependency["axis names"] = functions.get_variable_names(dependency_name, split_graphs = True)
+            current_dependency["dependencies"] = current_dependency["axis names"].copy()
+
+        elif split_dep_name[-1] in ["MEAN", "MAX", "MIN"]: #processed data set or formula
+            current_dependency["type"] = "value"
+            current_dependency["symbol"] = functions.get_variable_names(dependency_name)
+            current_dependency["processing"] = split_dep_name[-1].lower()
+            current_dependency["dependencies"] = [current_dependency["symbol"]]
+        
+        else: #dataset
+            current_dependency["type"] = "dataset"
+        
+        return current_dependency
+
+    def _evaluate_dependency(self, dependency_name: str, dependency_table: typing.Dict[str, typing.Dict[str, object]], values_table: typing.Dict[str, typing.Union[sciplot.Value, sciplot.ValueColumn]], constants_table: typing.Dict[str, sciplot.Value], function_table: typing.Dict[str, functions.Function], subexpression_cache: functions.SubexpressionCache = None) -> typing.Union[sciplot.Value, sciplot.ValueColumn]:
+        """
+        Evaluate a single node of the dependency graph. All of its dependencies must already be in values_table. Formulae share the results of identical branches through subexpression_cache
+
+        Returns:
+            (Value or ValueColumn): the value (for constants, processed values and graph attributes) or column (for datasets and formulae) of the node
+        """
+        dependency_data = dependency_table[dependency_name]
+
+        if dependency_data["type"] == "dataset":
+            data_set = self._datafile.query(database.Query("SELECT DataSet.DataSetID, DataSet.Uncertainty, DataSet.UncIsPerc, DataSet.UnitCompositeID FROM DataSet INNER JOIN `Variable` ON DataSet.DataSetID = Variable.ID WHERE Symbol = (?) AND Type = 0;", [dependency_name], 2))[0]
+            if data_set is None:
+                return sciplot.ValueColumn.from_values([])
             
-            else: #dataset
-                current_dependency["type"] = "dataset"
-                current_dependency["access mode"] = "same row"
-                current_dependency["processing"] = None
-                current_dependency["subtype"] = None
+            data_set_id, unc, uncisperc, unit_id = data_set
+            units = self._datafile.get_unit_by_id(unit_id)[1] #every value in a data set has the same units and uncertainty
 
-            dependency_table[dependency] = current_dependency
+            #stream the rows straight into an array
+            values = numpy.fromiter((value for value, in self._datafile.iter_query(database.Query("SELECT `Value` FROM DataPoint WHERE DataSetID = (?) ORDER BY DataPointID ASC;", [data_set_id], 0))), dtype = float)
+            return sciplot.ValueColumn(values, numpy.array([unc], dtype = float), bool(uncisperc), units)
         
-        #get dataset dependency values
-        dataset_table: typing.Dict[str, typing.List[sciplot.Value]] = {}
-        for dependency_name in dependency_table:
-            dependency_data = dependency_table[dependency_name]
-            if dependency_data["type"] == "dataset" and dependency_data["subtype"] is None:
-                values_raw = self._datafile.query(database.Query("SELECT `Value`, DataSet.Uncertainty, DataSet.UncIsPerc, DataSet.UnitCompositeID FROM DataPoint INNER JOIN DataSet ON DataPoint.DataSetID = DataSet.DataSetID INNER JOIN `Variable` ON DataSet.DataSetID = Variable.ID WHERE Symbol = (?) AND Type = 0 ORDER BY DataPoint.DataPointID ASC;", [dependency_data["symbol"]], 1))[0]
-                
-                values = []
-                for value, unc, uncisperc, unit_id in values_raw:
-                    value_obj = functions.Value(value, unc, bool(uncisperc))
-                    value_obj.units = self._datafile.get_unit_by_id(unit_id)[1]
-
-                    values.append(value_obj)
+        elif dependency_data["type"] == "constant":
+            return constants_table[dependency_name]
         
-                dataset_table[dependency_name] = values
+        elif dependency_data["type"] == "formula":
+            function_inputs = {} #inputs for the function, stored as values or lists of values
+            dataset_length = -1 #datasets must all be the same length to be properly evaluated
+            for func_dependency in function_table[dependency_name].evaluate_dependencies(): #constants have already been substituted in by pre_evaluate
+                function_inputs[func_dependency] = values_table[func_dependency]
+
+                if dependency_table[func_dependency]["type"] == "dataset":
+                    if dataset_length == -1: #no dataset length has yet been encountered - all other data sets must be of this length
+                        dataset_length = len(values_table[func_dependency])
+                    elif len(values_table[func_dependency]) != dataset_length:
+                        raise ValueError("Dataset '{}' length ({}) differs from length of other datasets ({}), in function '{}' evaluation".format(func_dependency, len(values_table[func_dependency]), dataset_length, dependency_name))
+            
+            return function_table[dependency_name].evaluate_columns(function_inputs, subexpression_cache) #evaluate every row at once. if no inputs have a length, there is one row
         
-        #pick out averages, maxes, mins and graphical data for processing
-        values_to_evaluate = []
-        for dependency_name in dependency_table:
-            dependency_data = dependency_table[dependency_name]
-            if dependency_data["type"] in ["value", "graphical"]:
-                values_to_evaluate.append(dependency_data)
-
-        #run passes of the dependency table looking for dependencies that can be evaluated until all have been evaluated
-        values_table = {}
-        last_loop = len(values_to_evaluate)
-        while len(values_to_evaluate) != 0:
-            for dependency_name in dependency_table:
-                dependency_data = dependency_table[dependency_name]
-
-                if dependency_data in values_to_evaluate:
-                    if dependency_data["type"] == "value":
-                        values = []
-                        if dependency_data["subtype"] is None: #set of values
-                            values = dataset_table[dependency_name]
-
-                        else: #function
-                            func_dependencies = functions.evaluate_dependencies(dependency_data["symbol"], function_table)
-
-                            #Notes on use of break in this loop:
-                            #Using a break in this situation is justified as it improves readability and maintains performance in what is an o(n^2) dependency check
-                            #The way of achieving the same functionality (breaking out of an iteration) would be achieved with a while loop and a counter. This would
-                            #actually decrease readability and require me to add extra boilerplate code for getting the list of dictionary keys, managing the counter
-                            #etc. In fact, breaks aren't dissimilar to other syntax like return and raise. Because of this, I have decided to use it in this situation
-                            #instead of other, less readable constructs that are a part of structured programming.
-
-                            function_inputs = {}
-                            function_input_table = {}
-                            dataset_length = -1 #datasets must all be the same length to be properly evaluated
-                            for func_dependency_symbol, func_dependency in func_dependencies: #gather all dependencies
-                                if func_dependency in values_to_evaluate:
-                                    break #a dependency is yet to be completed, stop compiling dependencies
-
-                                else:
-                                    if func_dependency in constants_table:
-                                        function_inputs[func_dependency] = constants_table[func_dependency]
-                                        function_input_table[func_dependency] = constants_table[func_dependency]
-
-                                    elif func_dependency in values_table:
-                                        function_inputs[func_dependency] = values_table[func_dependency]
-                                        function_input_table[func_dependency] = values_table[func_dependency]
-
-                                    elif func_dependency in dataset_table:
-                                        function_inputs[func_dependency] = dataset_table[func_dependency]
-
-                                        if dataset_length == -1: #no dataset length has yet been encountered - all other data sets must be of this length
-                                            dataset_length = len(dataset_table[func_dependency]) #length mismatch, exit
-                                        elif len(dataset_table[func_dependency]) != dataset_length:
-                                            raise ValueError("Dataset '{}' length ({}) differs from length of other datasets ({}), in function '{}' evaluation".format(func_dependency, len(dataset_table[func_dependency]), dataset_length, dependency_name))
-
-                            else: #break not triggered, function can be evaluated using the function inputs
-                                for i in range(max(dataset_length, 1)):
-                                    for key in function_inputs:
-                                        if type(function_inputs[key]) == list:
-                                            function_input_table[key] = function_inputs[key][i]
-                                    
-                                    values.append(functions.evaluate_tree(dependency_data["symbol"], function_table, function_input_table))
-                        
-                        if len(values) != 0: #calculate statistical operation
-                            if dependency_data["processing"] == "max":
-                                new_value = sciplot.Value(max([value.value for value in values]), values[0].absolute_uncertainty, False, values[0].units)
-                                values_table[dependency_name] = new_value
-                            elif dependency_data["processing"] == "min":
-                                new_value = sciplot.Value(min([value.value for value in values]), values[0].absolute_uncertainty, False, values[0].units)
-                                values_table[dependency_name] = new_value
-                            elif dependency_data["processing"] == "mean":
-                                new_value = sciplot.Value(sum([value.value for value in values]) / len(values), values[0].percentage_uncertainty / math.sqrt(len(values)), True, values[0].units)
-                                values_table[dependency_name] = new_value
-                            else:
-                                raise ValueError("Invalid dataset processing step '{}' on dependency '{}'".format(dependency_data["processing"], dependency_data))
-
-                            values_to_evaluate.remove(dependency_data)
-                    
-                    elif dependency_data["type"] == "graphical": #use graphing submodule
-                        data_table = Datatable(self._datafile) #load table to be graphed (recursive process)
-                        variable_ids = [self._datafile.query(database.Query("SELECT VariableID FROM Variable WHERE Symbol = (?)", [symbol], 2))[0][0] for symbol in current_dependency["axis names"]]
-                        variable_ids.reverse() #change from yx to xy
-                        data_table.set_variables(variable_ids)
-                        data_table.load(constants_table)
-
-                        #check graphing inputs
-                        if len(data_table.as_columns()) != 2:
-                            raise ValueError('{} doesn\'t have exactly 2 columns'.format(dependency_name))
-                            
-                        if len(data_table.as_rows()) == 0:
-                            raise ValueError('{} is empty'.format(dependency_name))
-
-                        fit_lines = graphing.FitLines(data_table)
-
-                        value = None
-                        
-                        #get correct fit line and attribute
-                        if dependency_data["fit line"] == "best":
-                            fit_lines.calculate_best_fit()
-                            if current_dependency["subtype"] == "gradient":
-                                value = fit_lines.fit_best_gradient
-                            else:
-                                value = fit_lines.fit_best_intercept
-                            
-                        else:
-                            fit_lines.calculate_all()
-
-                            if current_dependency["subtype"] == "gradient":
-                                if current_dependency["fit line"] == "worst":
-                                    value = fit_lines.fit_worst_gradient
-                                elif current_dependency["fit line"] == "worstmin":
-                                    value = fit_lines.fit_worst_min_gradient
-                                elif current_dependency["fit line"] == "worstmax":
-                                    value = fit_lines.fit_worst_max_gradient
-                                
-                            else:
-                                if current_dependency["fit line"] == "worst":
-                                    value = fit_lines.fit_worst_intercept
-                                elif current_dependency["fit line"] == "worstmin":
-                                    value = fit_lines.fit_worst_min_intercept
-                                elif current_dependency["fit line"] == "worstmax":
-                                    value = fit_lines.fit_worst_max_intercept
-                        
-                        #store value in Value object
-                        values_table[dependency_name] = sciplot.Value(value)
-
-                        #get correct units
-                        if current_dependency["subtype"] == "gradient": #divide the two units - subtract x powers from y powers
-                            units_x = data_table.as_rows()[0][0].units
-                            units_y = data_table.as_rows()[0][1].units
-                            unit_dict_x = {key: 0 - value for key, value in units_x}
-                            unit_dict_y = {key: value for key, value in units_y}
-
-                            result = {}
-                            for unit_dict in [unit_dict_x, unit_dict_y]:
-                                for key in unit_dict:
-                                    if key in result:
-                                        result[key] += unit_dict[key]
-                                    else:
-                                        result[key] = unit_dict[key]
-
-                            values_table[dependency_name].units = [(key, result[key]) for key in result]
-
-                        else: #y intercept has units of y axis
-                            values_table[dependency_name].units = data_table.as_rows()[0][1].units
-                        
-                        #don't leave these two large objects for the garbage collector, get rid of them as soon as possible to reduce risk of memory errors
-                        del fit_lines
-                        del data_table
-
-                        values_to_evaluate.remove(dependency_data)
-
-            if last_loop == len(values_to_evaluate): #no more dependencies will be evaluateable - this state should never be achieved, but just in case this inexpensive catch is here
-                raise RuntimeError("No more dependencies can be evaluated - stuck on {} left in an infinite loop".format(last_loop))
-
-            last_loop = len(values_to_evaluate)
-
-        #evaluate all columns
-        for variable_id, variable_symbol, variable_subid, variable_type in variable_data:
-            if var_type_lookup[variable_type] == "formula":
-                dataset_length = -1
-                function_inputs = {} #inputs for the function, stored as values or lists of values
-                function_input_table = {} #inputs for the function containing a specific row (samples from function_inputs)
-
-                func_dependencies = functions.evaluate_dependencies(variable_symbol, function_table, step_into_processed_sets = False)
-                for func_dependency_symbol, func_dependency in func_dependencies: #produce a table of the correct inputs
-                    if func_dependency in constants_table:
-                        function_inputs[func_dependency] = constants_table[func_dependency]
-                        function_input_table[func_dependency] = constants_table[func_dependency]
-
-                    elif func_dependency in values_table:
-                        function_inputs[func_dependency] = values_table[func_dependency]
-                        function_input_table[func_dependency] = values_table[func_dependency]
-
-                    elif func_dependency in dataset_table:
-                        function_inputs[func_dependency] = dataset_table[func_dependency]
-
-                        if dataset_length == -1: #has no length (e.g. a formula, give it the length of its dependency)
-                            dataset_length = len(dataset_table[func_dependency])
-                        elif len(dataset_table[func_dependency]) != dataset_length:
-                            raise ValueError("Dataset '{}' length ({}) differs from length of other datasets ({}), in function '{}' evaluation".format(func_dependency, len(dataset_table[func_dependency]), dataset_length, dependency_name))
-                
-                self._value_table[variable_id] = []
-
-                for i in range(max(dataset_length, 1)): #if dataset length is -1 (no inputs have a length) default to one row
-                    for key in function_inputs:
-                        if type(function_inputs[key]) == list:
-                            function_input_table[key] = function_inputs[key][i]
-                    
-                    self._value_table[variable_id].append(functions.evaluate_tree(variable_symbol, function_table, function_input_table))
+        elif dependency_data["type"] == "value":
+            values = sciplot.ValueColumn.from_values(values_table[dependency_data["symbol"]])
+
+            if len(values) == 0:
+                raise ValueError("Can't calculate '{}' as '{}' is empty".format(dependency_name, dependency_data["symbol"]))
+
+            #calculate statistical operation
+            if dependency_data["processing"] == "max":
+                return sciplot.Value(float(numpy.max(values.value)), values[0].absolute_uncertainty, False, values.units)
+            elif dependency_data["processing"] == "min":
+                return sciplot.Value(float(numpy.min(values.value)), values[0].absolute_uncertainty, False, values.units)
+            elif dependency_data["processing"] == "mean":
+                return sciplot.Value(sum(values.value.tolist()) / len(values), values[0].percentage_uncertainty / math.sqrt(len(values)), True, values.units)
+            else:
+                raise ValueError("Invalid dataset processing step '{}' on dependency '{}'".format(dependency_data["processing"], dependency_data))
+        
+        elif dependency_data["type"] == "graphical": #use graphing submodule
+            return self._evaluate_graphical(dependency_name, dependency_data, values_table)
+        
+        else:
+            raise ValueError("Invalid dependency type '{}' on dependency '{}'".format(dependency_data["type"], dependency_name))
+
+    def _evaluate_graphical(self, dependency_name: str, dependency_data: typing.Dict[str, object], values_table: typing.Dict[str, typing.Union[sciplot.Value, sciplot.ValueColumn]]) -> sciplot.Value:
+        """
+        Evaluate a graph attribute (e.g. BEST.GRADIENT.a-b) from the already evaluated columns of its two axes
+
+        Returns:
+            (Value): the gradient or intercept of the chosen fit line
+        """
+        #make the table to be graphed out of columns that have already been evaluated instead of loading them again
+        axis_names = dependency_data["axis names"].copy()
+        axis_names.reverse() #change from yx to xy
+        variable_ids = [self._datafile.query(database.Query("SELECT VariableID FROM Variable WHERE Symbol = (?)", [symbol], 2))[0][0] for symbol in axis_names]
+
+        data_table = Datatable(self._datafile)
+        data_table.set_variables(variable_ids)
+        for i in range(len(variable_ids)):
+            data_table._value_table[variable_ids[i]] = values_table[axis_names[i]]
+        data_table._check_column_lengths()
+
+        #check graphing inputs
+        if len(data_table.as_columns()) != 2:
+            raise ValueError('{} doesn\'t have exactly 2 columns'.format(dependency_name))
             
-            else: #datasets have all already been fetched
-                self._value_table[variable_id] = dataset_table[variable_symbol]
+        x_column, y_column = data_table.as_columns()
+        if len(x_column) == 0:
+            raise ValueError('{} is empty'.format(dependency_name))
+
+        fit_lines = graphing.FitLines(data_table)
+
+        value = None
         
-        #check column lengths to make sure they all match
+        #get correct fit line and attribute
+        if dependency_data["fit line"] == "best":
+            fit_lines.calculate_best_fit()
+            if dependency_data["subtype"] == "gradient":
+                value = fit_lines.fit_best_gradient
+            else:
+                value = fit_lines.fit_best_intercept
+            
+        else:
+            fit_lines.calculate_all()
+
+            #worst fit lines don't exist if no line goes through every box or the gradient isn't limited. the worst line is chosen from both of them
+            if dependency_data["fit line"] == "worst" and None in [fit_lines.fit_worst_max_gradient, fit_lines.fit_worst_min_gradient]:
+                value = None
+
+            elif dependency_data["subtype"] == "gradient":
+                if dependency_data["fit line"] == "worst":
+                    value = fit_lines.fit_worst_gradient
+                elif dependency_data["fit line"] == "worstmin":
+                    value = fit_lines.fit_worst_min_gradient
+                elif dependency_data["fit line"] == "worstmax":
+                    value = fit_lines.fit_worst_max_gradient
+                
+            else:
+                if dependency_data["fit line"] == "worst":
+                    value = fit_lines.fit_worst_intercept
+                elif dependency_data["fit line"] == "worstmin":
+                    value = fit_lines.fit_worst_min_intercept
+                elif dependency_data["fit line"] == "worstmax":
+                    value = fit_lines.fit_worst_max_intercept
+        
+        if value is None:
+            raise ValueError("No {} fit line exists for {} (no line goes through the error bars of every point, or the gradients of the lines that do aren\'t limited)".format(dependency_data["fit line"], dependency_name))
+
+        #store value in Value object
+        result = sciplot.Value(value)
+
+        #get correct units
+        if dependency_data["subtype"] == "gradient": #divide the two units - subtract x powers from y powers
+            units_x = x_column.units
+            units_y = y_column.units
+            unit_dict_x = {key: 0 - value for key, value in units_x}
+            unit_dict_y = {key: value for key, value in units_y}
+
+            units = {}
+            for unit_dict in [unit_dict_x, unit_dict_y]:
+                for key in unit_dict:
+                    if key in units:
+                        units[key] += unit_dict[key]
+                    else:
+                        units[key] = unit_dict[key]
+
+            result.units = [(key, units[key]) for key in units]
+
+        else: #y intercept has units of y axis
+            result.units = y_column.units
+        
+        return result
+    
+    def _check_column_lengths(self):
+        """
+        Check that all of the loaded columns are the same length. Raises a ValueError if they aren't
+        """
         length = -1
         for key in self._value_table:
             if length == -1:
@@ -357,7 +461,7 @@ class Datatable:
 
     def as_rows(self) -> typing.List[typing.List[sciplot.Value]]:
         """
-        Get the variables table (after calling load()) as a list of lists where each list is a table row
+        Get the variables table (after calling load()) as a list of lists where each list is a table row. Every Value is made from the columns when this is called
 
         Returns:
             (list of list of Value)
@@ -374,23 +478,20 @@ class Datatable:
                 elif length != len(self._value_table[key]):
                     raise ValueError('Can\'t transpose: column {} has length {}, required length {}'.format(key, len(self._value_table[key]), length))
 
-            for row_index in range(length):
-                row.clear()
-                for variable_id in self._variable_ids:
-                    row.append(self._value_table[variable_id][row_index])
-                result.append(row.copy())
+            for row in zip(*[self._value_table[variable_id] for variable_id in self._variable_ids]): #iterating over a column makes its Values one at a time
+                result.append(list(row))
 
             return result
 
         else:
             return []
 
-    def as_columns(self) -> typing.List[typing.List[sciplot.Value]]: #matches internal layout, simply return
+    def as_columns(self) -> typing.List[sciplot.ValueColumn]: #matches internal layout, simply return
         """
-        Get the variables table (after calling load()) as a list of lists where each list is a table column
+        Get the variables table (after calling load()) as a list of columns
 
         Returns:
-            (list of list of Value)
+            (list of ValueColumn)
         """
         result = []
 
@@ -1,12 +1,19 @@
-from dataclasses import dataclass
 import abc
 import re
+import copy
+import functools
 import math
+import operator
 import typing
 
-from sciplot import Value
+import numpy
+
+from sciplot import Value, ValueColumn
 
 t_datatable = typing.Dict[str, Value] #composite type hint
+t_columntable = typing.Dict[str, typing.Union[Value, typing.List[Value], ValueColumn]] #composite type hint for evaluate_columns
+
+_ONE = Value(1) #used in place of multipliers of 1 that have been removed by simplify
 
 
 #interface defining all functions
@@ -20,6 +27,11 @@ class IMathematicalFunction:
     Kwargs:
         autoparse (bool) = True: whether or not strings in args should be processed and turned into new IMathematicalFunctions
     """
+    _units_depend_on_values: bool = False #whether _evaluate_units uses the values of the subfunctions as well as their units
+    _gives_percentage_uncertainty: bool = None #True or False if the uncertainty of the result is always percentage or absolute, None if it depends on the subfunctions
+    _first_operand_is_multiplier: bool = False #whether the first operand is a multiplier (e.g. 2sin{x}) which is 1 when it isn't given
+    _implicit_multiplier: bool = False #set by simplify when a multiplier of 1 has been removed from the tree, so the multiplier isn't in _subfuncs
+
     def __init__(self, *args: typing.List[typing.Union[object, str]], autoparse: bool = True):
         self._subfuncs: typing.List["IMathematicalFunction"] = []
         
@@ -42,22 +54,147 @@ class IMathematicalFunction:
             (Value): the result of the function
         """
         evaluated_subfuncs = [subfunc.evaluate(datatable) for subfunc in self._subfuncs]
+        if self._implicit_multiplier:
+            evaluated_subfuncs.insert(0, _ONE)
 
         value = self._evaluate_value(datatable, evaluated_subfuncs)
         uncertainty, uncertainty_is_percentage = self._evaluate_uncertainty(datatable, evaluated_subfuncs)
 
-        units = self._evaluate_units(datatable, evaluated_subfuncs)
-
-        #remove units with a power of 0
-        to_remove = []
-        for i in range(len(units)):
-            if units[i][1] == 0:
-                to_remove.append(i)
-        to_remove.reverse()
-        for i in to_remove:
-            units.pop(i)
+        units = _remove_zero_powers(self._evaluate_units(datatable, evaluated_subfuncs))
         
         return Value(value, uncertainty, uncertainty_is_percentage, units)
+    
+    def compile(self) -> typing.Callable[[t_datatable], Value]:
+        """
+        Flatten this branch of the tree into a single closure that gives the same result as evaluate. The tree is only walked once (here), so the closure
+        can be called for every row of a table without repeating the attribute and method lookups that evaluate makes at every node.
+        The tree must not be changed after it has been compiled - compile it again instead
+
+        Returns:
+            (func: dict of str: Value -> Value): takes a datatable and returns the result of the function
+        """
+        evaluate_value = self._evaluate_value
+        evaluate_uncertainty = self._evaluate_uncertainty
+        evaluate_units = self._evaluate_units
+
+        compiled_subfuncs = [subfunc.compile() for subfunc in self._subfuncs]
+        if self._implicit_multiplier:
+            compiled_subfuncs.insert(0, lambda datatable: _ONE)
+
+        if len(compiled_subfuncs) == 2: #all operators are binary, so the subfunctions can be unpacked now instead of on every call
+            first, second = compiled_subfuncs
+            units_depend_on_values = self._units_depend_on_values
+
+            #the units of a column are normally the same list object on every row, so the units produced from them can be reused
+            #the input unit lists are kept alive by the cache, so an identity check is enough to know that they haven't changed
+            units_cache = (None, None, None)
+
+            def compiled(datatable: t_datatable) -> Value:
+                nonlocal units_cache
+
+                evaluated_subfuncs = [first(datatable), second(datatable)]
+
+                value = evaluate_value(datatable, evaluated_subfuncs)
+                uncertainty, uncertainty_is_percentage = evaluate_uncertainty(datatable, evaluated_subfuncs)
+
+                cache = units_cache
+                if units_depend_on_values or cache[0] is not evaluated_subfuncs[0].units or cache[1] is not evaluated_subfuncs[1].units:
+                    cache = (evaluated_subfuncs[0].units, evaluated_subfuncs[1].units, _remove_zero_powers(evaluate_units(datatable, evaluated_subfuncs)))
+                    units_cache = cache
+
+                return Value(value, uncertainty, uncertainty_is_percentage, cache[2])
+        
+        else:
+            def compiled(datatable: t_datatable) -> Value:
+                evaluated_subfuncs = [subfunc(datatable) for subfunc in compiled_subfuncs]
+
+                value = evaluate_value(datatable, evaluated_subfuncs)
+                uncertainty, uncertainty_is_percentage = evaluate_uncertainty(datatable, evaluated_subfuncs)
+
+                return Value(value, uncertainty, uncertainty_is_percentage, _remove_zero_powers(evaluate_units(datatable, evaluated_subfuncs)))
+
+        return compiled
+
+    def evaluate_columns(self, datatable: t_columntable, cache: "SubexpressionCache" = None) -> ValueColumn:
+        """
+        Evaluate this function for every row of a table at once. Gives the same result as calling evaluate once per row, but each operator works on whole
+        columns (numpy arrays) and units are only worked out once per column
+        To change the evaluation method, you should override _evaluate_column_value and _evaluate_column_units (they default to _evaluate_value and _evaluate_units)
+
+        Args:
+            datatable (dict of str: Value, list of Value or ValueColumn): values to be substituted into variables. Lists and ValueColumns are columns and must all be the same length, single Values are used for every row
+        
+        Kwargs:
+            cache (SubexpressionCache: None): shares the results of identical branches with other functions evaluated with the same cache, so that each is only evaluated once
+        
+        Returns:
+            (ValueColumn): the result of the function for each row. There is one row if datatable doesn't contain any columns
+        """
+        columns = {name: ValueColumn.from_values(datatable[name]) for name in self.evaluate_dependencies()}
+
+        #numpy only warns about invalid operations by default, but evaluate raises exceptions for them
+        with numpy.errstate(divide = 'raise', invalid = 'raise'):
+            try:
+                result = self._evaluate_columns(columns, cache)
+            except FloatingPointError as e:
+                raise ValueError(str(e))
+
+        return result
+    
+    def _evaluate_columns(self, columns: typing.Dict[str, ValueColumn], cache: "SubexpressionCache" = None) -> ValueColumn:
+        """
+        Column equivalent of evaluate, used internally by evaluate_columns. Recursively evaluates the whole function tree
+        """
+        if cache is not None: #this branch might have already been evaluated as part of another function
+            key = cache.key(self)
+            result = cache.get(key)
+            if result is not None:
+                return result
+
+        evaluated_subfuncs = [subfunc._evaluate_columns(columns, cache) for subfunc in self._subfuncs]
+        if self._implicit_multiplier:
+            evaluated_subfuncs.insert(0, ValueColumn.from_values(_ONE))
+
+        value = self._evaluate_column_value(columns, evaluated_subfuncs)
+        uncertainty, uncertainty_is_percentage = self._evaluate_uncertainty(columns, evaluated_subfuncs)
+
+        units = _remove_zero_powers(self._evaluate_column_units(columns, evaluated_subfuncs))
+
+        result = ValueColumn(value, uncertainty, uncertainty_is_percentage, units)
+        if cache is not None:
+            cache.store(key, result)
+
+        return result
+    
+    def _structure(self, subfunc_keys: typing.List[int]) -> tuple: #to be overridden by leaves
+        """
+        Describe this node for common subexpression elimination. Branches with the same structure always give the same result for the same inputs
+
+        Args:
+            subfunc_keys (list of int): the keys given to each subfunction by SubexpressionCache.key
+        
+        Returns:
+            (tuple): hashable description of this node and its subfunctions
+        """
+        return (type(self), tuple(subfunc_keys))
+    
+    def _evaluate_column_value(self, columns: typing.Dict[str, ValueColumn], evaluated_subfuncs: typing.List[ValueColumn]) -> numpy.ndarray:
+        """
+        Calculate the resultant values of this function for a whole column. Must be overridden by functions that use the math module as it doesn't accept arrays
+
+        Returns:
+            (numpy.ndarray of float): the result of the function for each row
+        """
+        return self._evaluate_value(columns, evaluated_subfuncs)
+    
+    def _evaluate_column_units(self, columns: typing.Dict[str, ValueColumn], evaluated_subfuncs: typing.List[ValueColumn]) -> typing.List[typing.Tuple[int, float]]:
+        """
+        Calculate the resultant units of this function for a whole column. Must be overridden by functions whose units depend on the values of their subfunctions
+
+        Returns:
+            (list of (int, float)): the resultant units
+        """
+        return self._evaluate_units(columns, evaluated_subfuncs)
 
     @abc.abstractclassmethod
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]) -> float:
@@ -103,7 +240,8 @@ class IMathematicalFunction:
 
     def generate_from(self, string: str) -> "IMathematicalFunction":
         """
-        Breaks down a string into a function that operates on two subfunctions (to be determined by that function). Effectively recursive.
+        Breaks down a string into a tree of functions. The string is split into tokens and then parsed in a single pass (see _parse_expression).
+        Trees are cached by expression (see parse_cache_info), so the tree returned may be shared and must not be modified
 
         Args:
             string (str): the string to be broken down
@@ -111,153 +249,7 @@ class IMathematicalFunction:
         Returns:
             (instance of IMathematicalFunction): the function that this string represents
         """
-        #strip redundant brackets
-        string = _strip_brackets(string)
-        string = _remove_all_spaces(string)
-
-        #look for valid places for operators to be in the string (not inside brackets or variables)
-        search_regions = []
-        current_segment = ''
-        start_index = 0
-
-        bracket_level = 0
-        is_variable = False
-        for i in range(len(string)):
-            if string[i] == '{': #brackets inside a variable don't affect operators, so don't count them
-                if is_variable:
-                    raise ValueError('{}: can\'t use { when not opening a variable names'.format(i))
-                else:
-                    is_variable = True
-            
-            if string[i] == '(':
-                bracket_level += 1
-            
-            if bracket_level == 0 and not is_variable: #operators at this character could be parsable
-                if current_segment == '':
-                    start_index = i
-                current_segment += string[i]
-
-            elif current_segment != '': #end of valid segment, add the completed segment to search_regions
-                search_regions.append((start_index, current_segment))
-                current_segment = ''
-            
-            if string[i] == '}':
-                if is_variable:
-                    is_variable = False
-                else:
-                    raise ValueError('{}: can\'t use } when not closing a variable name'.format(i))
-            
-            if string[i] == ')':
-                if bracket_level > 0:
-                    bracket_level -= 1
-                
-                else:
-                    raise ValueError('In expression "{}" at {}: can\'t close an unopened bracket pair'.format(string, i))
-            
-        
-        if current_segment != '': #if there is a leftover search segment add it to search segments
-            search_regions.append((start_index, current_segment))
-            current_segment = ''
-        
-        if bracket_level != 0:
-            raise ValueError('In expression "{}": {} bracket(s) were not closed'.format(string, bracket_level))
-            
-        if is_variable:
-            raise ValueError('In expression "{}": a variable was opened with "{{" but not closed with "}}" before the end of the expression'.format(string))
-        
-        #find locations of operators in the string
-        matches = []
-        for operator in operator_register:
-            for start_index, segment in search_regions:
-                for match in operator['expression'].finditer(segment):
-                    start, end = start_index + match.start(), start_index + match.end()
-                    matches.append([{'start': start, 'end': end}, operator])
-        
-        if len(matches) == 0: #if there are no operators at all, it is likely a float or variable
-            is_float = True
-            items = []
-            for char in string:
-                if char not in '1234567890.':
-                    is_float = False
-
-            if is_float:
-                return Float(string)
-            
-            elif string.startswith('{') and string.endswith('}') and '}' not in string[1:-1]: #check for variable
-                return Variable(string[1:len(string) - 1])
-
-            else:
-                raise ValueError('No valid operators found in "{}"'.format(string)) #not a float, variable or expression with operators
-        
-        else:
-            #find operators that overlap and remove them first, longer operators take precedence (e.g. in sin and asin, asin takes priority)
-            has_overlap = True
-            while has_overlap:
-                to_remove = None
-
-                for match in matches:
-                    for other_match in matches:
-                        if match != other_match:
-                            if (match[0]['start'] <= other_match[0]['start']) and (match[0]['end'] >= other_match[0]['end']):
-                                to_remove = other_match
-
-                            elif (((match[0]['start'] <= other_match[0]['start']) and (match[0]['end'] <= other_match[0]['end']) and (match[0]['end'] >= other_match[0]['start']))
-                                 or ((match[0]['end'] >= other_match[0]['end']) and (match[0]['start'] >= other_match[0]['start']) and (match[0]['start'] <= other_match[0]['end']))): #overlap check
-                                match_len = match[0]['end'] - match[0]['start'] #compare lengths
-                                other_match_len = other_match[0]['end'] - other_match[0]['start']
-
-                                if match_len > other_match_len: #longer match takes precedence (all matches are compared twice (once each way), so the single comparison here is fine)
-                                    to_remove = other_match
-                                elif match_len == other_match_len: #this is not a condition that should occur with the default operators, but this system is very flexible so operators that trigger this could be added
-                                    raise ValueError('Two operators of equal length {} are competing for the same match in expression "{}" - "{}": ({}, {}), "{}": ({}, {}). This conflict can\'t be resolved without changing the expression or modifying the capture expressions at the bottom of the functions module to avoid triggering both conditions.'.format(match_len, string, match[1]['name'], match[0]['start'], match[0]['end'], other_match[1]['name'], other_match[0]['start'], other_match[0]['end']))
-
-                if to_remove is None:
-                    has_overlap = False
-                else:
-                    matches.remove(to_remove) #remove reported overlapping matches
-
-            #find highest priority operator and process that first (BIDMAS)
-            operator = matches[0]
-            for match in matches:
-                if match[1]['priority'] > operator[1]['priority']:
-                    operator = match
-
-            #remove the operator and split the strings either side
-            raw_items = [string[:operator[0]['start']], string[operator[0]['end']:]]
-            raw_items = [_strip_brackets(item) for item in raw_items]
-
-            #insert a default value for the operator if the value is missing (e.g. sin2 -> 1sin(2))
-            for i in range(len(raw_items)):
-                if raw_items[i] == '':
-                    has_default = False
-                    if 'default values' in operator[1]:
-                        if len(operator[1]['default values']) > i:
-                            if operator[1]['default values'][i] is not None:
-                                raw_items[i] = operator[1]['default values'][i]
-                                has_default = True
-                    
-                    if not has_default:
-                        raise ValueError('In expression "{}": operand {} was not supplied for operator "{}" and a default value couldn\'t be found'.format(string, i, operator[1]['name']))
-
-            #check for variable or float
-            items = [] #items (string or IMathematicalFunction) beneath the operator node that will be created
-            for item in raw_items:
-                #check for float
-                is_float = True
-                for char in item:
-                    if char not in '1234567890.':
-                        is_float = False
-
-                if is_float:
-                    items.append(Float(item))
-                
-                elif item.startswith('{') and item.endswith('}') and '}' not in item[1:-1]: #check for variable
-                    items.append(Variable(item[1:len(item) - 1]))
-                
-                else:
-                    items.append(item) #further evaluation needed (will happen recursively)
-
-            return operator[1]['class'](*items) #construct the next section of the tree
+        return _parse(string)
     
     def is_static(self, constants: t_datatable) -> bool: #to be overridden by leaves
         """
@@ -273,23 +265,59 @@ class IMathematicalFunction:
     
     def pre_evaluate(self, constants: t_datatable) -> "IMathematicalFunction":
         """
-        Pre-evaluate sections of the tree that are static as determined by is_static
+        Pre-evaluate sections of the tree that are static as determined by is_static. The tree is left unchanged (it could be shared through the parse cache)
 
         Args:
             constants (dict str: float): the variables in the datatable that are constant
         
         Returns:
-            (self): This section of the tree is dynamic
+            (self): This section of the tree is dynamic and none of its branches could be pre-evaluated
+            (instance of IMathematicalFunction): This section of the tree is dynamic, a copy with its static branches pre-evaluated
             (Float): This section of the tree is static and has been evaluated down to this Float object
         """
         if self.is_static(constants):
             return Float(self.evaluate(constants))
         
         else:
-            for i in range(len(self._subfuncs)):
-                self._subfuncs[i] = self._subfuncs[i].pre_evaluate(constants)
+            subfuncs = [subfunc.pre_evaluate(constants) for subfunc in self._subfuncs]
 
-            return self
+            if False not in [subfuncs[i] is self._subfuncs[i] for i in range(len(subfuncs))]: #nothing changed, this branch can be shared
+                return self
+
+            result = copy.copy(self)
+            result._subfuncs = subfuncs
+            return result
+    
+    def simplify(self) -> "IMathematicalFunction":
+        """
+        Simplify this branch of the tree without changing its results: constant operands of chains of additions or multiplications are folded together
+        (e.g. 2*{x}*3 becomes 6*{x}), multipliers of 1 (e.g. the 1 in sin{x}, which is 1sin{x}) are removed and identities like x*1 and x^1 are removed where x already has a percentage uncertainty.
+        Branches that are entirely static are left for pre_evaluate. The tree is left unchanged (it could be shared through the parse cache)
+
+        Returns:
+            (self): none of this branch could be simplified
+            (instance of IMathematicalFunction): a simplified copy of this branch
+        """
+        subfuncs = [subfunc.simplify() for subfunc in self._subfuncs]
+
+        result = self
+        if False in [subfuncs[i] is self._subfuncs[i] for i in range(len(subfuncs))]: #subfunctions were simplified, make a copy so that the tree isn't changed
+            result = copy.copy(self)
+            result._subfuncs = subfuncs
+        
+        return result._simplify_node()
+    
+    def _simplify_node(self) -> "IMathematicalFunction": #to be overridden by operators with identities
+        """
+        Simplify this node, once its subfunctions have been simplified. Must return a copy instead of changing this node
+        """
+        if self._first_operand_is_multiplier and not self._implicit_multiplier and _is_number(self._subfuncs[0], 1):
+            result = copy.copy(self)
+            result._subfuncs = self._subfuncs[1:]
+            result._implicit_multiplier = True
+            return result
+        
+        return self
     
     def num_nodes(self, include_branches = True) -> int: #to be overwritten by leaves
         """
@@ -333,8 +361,37 @@ class Function(IMathematicalFunction):
 
         self._subfuncs.append(self.generate_from(string))
 
+        #the compiled tree and dependencies are built on first use and thrown away whenever the tree changes
+        self._compiled: typing.Callable[[t_datatable], Value] = None
+        self._dependencies: typing.List[str] = None
+
     def evaluate(self, datatable: t_datatable) -> Value:
-        return self._subfuncs[0].evaluate(datatable)
+        if self._compiled is None:
+            self._compiled = self.compile()
+
+        return self._compiled(datatable)
+    
+    def compile(self) -> typing.Callable[[t_datatable], Value]:
+        return self._subfuncs[0].compile()
+    
+    def _evaluate_columns(self, columns: typing.Dict[str, ValueColumn], cache: "SubexpressionCache" = None) -> ValueColumn:
+        return self._subfuncs[0]._evaluate_columns(columns, cache)
+    
+    def pre_evaluate(self, constants: t_datatable) -> "Function": #always returns a Function (even when the whole tree is static) so that the result can be used in place of this one
+        result = copy.copy(self)
+        result._subfuncs = [self._subfuncs[0].pre_evaluate(constants).simplify()]
+        result._compiled = None
+        result._dependencies = None
+        return result
+    
+    def simplify(self) -> "Function": #folds entirely static branches as well
+        return self.pre_evaluate({})
+    
+    def evaluate_dependencies(self) -> typing.List[str]:
+        if self._dependencies is None:
+            self._dependencies = super().evaluate_dependencies()
+
+        return self._dependencies.copy()
 
 
 #sub functions
@@ -355,6 +412,20 @@ class Float(IMathematicalFunction):
     def evaluate(self, datatable: t_datatable):
         return self._value #the value is just the stored vlaue
     
+    def compile(self):
+        value = self._value
+        return lambda datatable: value
+    
+    def _evaluate_columns(self, columns, cache = None):
+        return ValueColumn.from_values(self._value)
+    
+    def _structure(self, subfunc_keys):
+        value = self._value
+        if value.uncertainty_is_percentage:
+            return (Float, value.value, value.percentage_uncertainty, True, tuple(value.units))
+        else:
+            return (Float, value.value, value.absolute_uncertainty, False, tuple(value.units))
+    
     def is_static(self, constants: t_datatable):
         return True
     
@@ -374,6 +445,15 @@ class Variable(IMathematicalFunction):
     def evaluate(self, datatable: t_datatable):
         return datatable[self._name] #return the value from the datatable provided
     
+    def compile(self):
+        return operator.itemgetter(self._name) #same lookup as evaluate, but without a python-level call
+    
+    def _evaluate_columns(self, columns, cache = None):
+        return columns[self._name]
+    
+    def _structure(self, subfunc_keys):
+        return (Variable, self._name)
+    
     def is_static(self, constants: t_datatable):
         return self._name in constants #if the variable is a constant, it is static. if not, it can't be
     
@@ -386,9 +466,14 @@ class Variable(IMathematicalFunction):
 
 # branches
 class Add(IMathematicalFunction):
+    _gives_percentage_uncertainty = False
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
+    def _simplify_node(self):
+        return _fold_chain(self, 0)
+    
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value + evaluated_subfuncs[1].value
     
@@ -407,9 +492,16 @@ class Add(IMathematicalFunction):
 
 
 class Subtract(IMathematicalFunction):
+    _gives_percentage_uncertainty = False
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
+    def _simplify_node(self):
+        if _is_number(self._subfuncs[1], 0) and self._subfuncs[0]._gives_percentage_uncertainty is False: #x - 0
+            return self._subfuncs[0]
+        return self
+    
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value - evaluated_subfuncs[1].value
     
@@ -428,9 +520,14 @@ class Subtract(IMathematicalFunction):
 
 
 class Multiply(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
+    def _simplify_node(self):
+        return _fold_chain(self, 1)
+    
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * evaluated_subfuncs[1].value
     
@@ -438,28 +535,20 @@ class Multiply(IMathematicalFunction):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
     def _evaluate_units(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
-        result = evaluated_subfuncs[0].units.copy()
-        for unit_id, power in evaluated_subfuncs[1].units:
-            to_add = None
-            to_remove = -1
-            for i in range(len(result)):
-                if result[i][0] == unit_id:
-                    to_add = (unit_id, result[i][1] + power)
-                    to_remove = i
-
-            if to_add is None:
-                result.append((unit_id, power))
-            else:
-                result.pop(to_remove)
-                result.append(to_add)
-        
-        return result
+        return _combine_units(evaluated_subfuncs[0].units, evaluated_subfuncs[1].units, 1)
 
 
 class Division(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
+    def _simplify_node(self):
+        if _is_number(self._subfuncs[1], 1) and self._subfuncs[0]._gives_percentage_uncertainty: #x / 1
+            return self._subfuncs[0]
+        return self
+    
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value / evaluated_subfuncs[1].value
     
@@ -467,28 +556,21 @@ class Division(IMathematicalFunction):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
     def _evaluate_units(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
-        result = evaluated_subfuncs[0].units.copy()
-        for unit_id, power in evaluated_subfuncs[1].units:
-            to_add = None
-            to_remove = -1
-            for i in range(len(result)):
-                if result[i][0] == unit_id:
-                    to_add = (unit_id, result[i][1] - power)
-                    to_remove = i
-
-            if to_add is None:
-                result.append((unit_id, 0 - power))
-            else:
-                result.pop(to_remove)
-                result.append(to_add)
-        
-        return result
+        return _combine_units(evaluated_subfuncs[0].units, evaluated_subfuncs[1].units, -1)
 
 
 class Power(IMathematicalFunction):
+    _units_depend_on_values = True #powers are multiplied by the exponent
+    _gives_percentage_uncertainty = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
+    def _simplify_node(self):
+        if _is_number(self._subfuncs[1], 1) and self._subfuncs[0]._gives_percentage_uncertainty: #x ^ 1
+            return self._subfuncs[0]
+        return self
+    
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return pow(evaluated_subfuncs[0].value, evaluated_subfuncs[1].value)
     
@@ -498,15 +580,28 @@ class Power(IMathematicalFunction):
     
     def _evaluate_units(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return [(unit_id, power * evaluated_subfuncs[1].value) for unit_id, power in evaluated_subfuncs[0].units]
+    
+    def _evaluate_column_units(self, columns, evaluated_subfuncs):
+        if len(evaluated_subfuncs[1].value) == 0:
+            return evaluated_subfuncs[0].units
+
+        #a column only has one set of units, so they are taken from the exponent of the first row
+        return [(unit_id, power * float(evaluated_subfuncs[1].value[0])) for unit_id, power in evaluated_subfuncs[0].units]
 
 
 class Sin(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.sin(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.sin(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -515,12 +610,18 @@ class Sin(IMathematicalFunction):
 
 
 class Cos(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.cos(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.cos(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -529,12 +630,18 @@ class Cos(IMathematicalFunction):
 
 
 class Tan(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.tan(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.tan(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -543,12 +650,18 @@ class Tan(IMathematicalFunction):
 
 
 class ArcSin(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.asin(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.arcsin(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -557,12 +670,18 @@ class ArcSin(IMathematicalFunction):
 
 
 class ArcCos(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.acos(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.arccos(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -571,12 +690,18 @@ class ArcCos(IMathematicalFunction):
 
 
 class ArcTan(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.atan(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.arctan(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -585,12 +710,18 @@ class ArcTan(IMathematicalFunction):
 
 
 class Deg(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.degrees(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.degrees(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -599,12 +730,18 @@ class Deg(IMathematicalFunction):
 
 
 class Rad(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.radians(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.radians(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -613,6 +750,9 @@ class Rad(IMathematicalFunction):
 
 
 class Absolute(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
@@ -623,31 +763,22 @@ class Absolute(IMathematicalFunction):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
     def _evaluate_units(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
-        result = evaluated_subfuncs[0].units.copy()
-        for unit_id, power in evaluated_subfuncs[1].units:
-            to_add = None
-            to_remove = -1
-            for i in range(len(result)):
-                if result[i][0] == unit_id:
-                    to_add = (unit_id, result[i][1] + power)
-                    to_remove = i
-
-            if to_add is None:
-                result.append((unit_id, power))
-            else:
-                result.pop(to_remove)
-                result.append(to_add)
-        
-        return result
+        return _combine_units(evaluated_subfuncs[0].units, evaluated_subfuncs[1].units, 1)
 
 
 class NatLog(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.log(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.log(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -655,12 +786,18 @@ class NatLog(IMathematicalFunction):
         return evaluated_subfuncs[0].units
 
 class BaseTenLog(IMathematicalFunction):
+    _gives_percentage_uncertainty = True
+    _first_operand_is_multiplier = True
+
     def __init__(self, item0: str, item1: str):
         super().__init__(item0, item1)
     
     def _evaluate_value(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return evaluated_subfuncs[0].value * math.log10(evaluated_subfuncs[1].value)
     
+    def _evaluate_column_value(self, columns, evaluated_subfuncs):
+        return evaluated_subfuncs[0].value * numpy.log10(evaluated_subfuncs[1].value)
+    
     def _evaluate_uncertainty(self, datatable: t_datatable, evaluated_subfuncs: typing.List[Value]):
         return (evaluated_subfuncs[0].percentage_uncertainty + evaluated_subfuncs[1].percentage_uncertainty, True)
     
@@ -803,6 +940,58 @@ operator_register = [
 ]
 
 
+#common subexpression elimination
+class SubexpressionCache:
+    """
+    Shares the results of branches between calls to evaluate_columns, so that branches that appear more than once (in one function or across many, e.g. {x}^2 or sin{theta})
+    are only evaluated once. Branches are identified by their structure, so every function evaluated with the same cache must be given the same column for each variable
+    (e.g. all of the functions evaluated during one Datatable load)
+    """
+    def __init__(self):
+        self._keys: typing.Dict[int, typing.Tuple[IMathematicalFunction, int]] = {} #key of each node by id. the node is kept so that its id can't be reused
+        self._numbers: typing.Dict[tuple, int] = {} #keys by structure. subfunctions are referred to by key so that structures don't have to be compared in full
+        self._results: typing.Dict[int, ValueColumn] = {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+    
+    def key(self, function: IMathematicalFunction) -> int:
+        """
+        Get the key of a branch. Branches with the same key have the same structure
+        """
+        entry = self._keys.get(id(function))
+        if entry is None:
+            structure = function._structure([self.key(subfunc) for subfunc in function._subfuncs])
+            if structure not in self._numbers:
+                self._numbers[structure] = len(self._numbers)
+
+            entry = (function, self._numbers[structure])
+            self._keys[id(function)] = entry
+
+        return entry[1]
+    
+    def get(self, key: int) -> ValueColumn:
+        """
+        Get the result of a branch by key
+
+        Returns:
+            (ValueColumn): the result
+            (None): the branch hasn't been evaluated yet
+        """
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+    
+    def store(self, key: int, result: ValueColumn):
+        """
+        Store the result of a branch by key
+        """
+        self._results[key] = result
+
+
 #tree operations
 def check_circular_dependencies(function_name: str, functions: typing.Dict[str, Function]) -> bool:
     """
@@ -950,38 +1139,165 @@ def evaluate_tree(function_name: str, functions: typing.Dict[str, Function], dat
     Returns:
         (Value): the result of the function specified by function_name
     """
-    data_table = data_table.copy()
+    return _eval_tree(function_name, functions, data_table.copy(), None)
+
+def evaluate_tree_columns(function_name: str, functions: typing.Dict[str, Function], data_table = {}) -> ValueColumn:
+    """
+    Column equivalent of evaluate_tree. Recursively evaluates a function and its tree of dependencies (depth first) for every row at once. Doesn't check for cycles or existing dependencies.
+
+    Args:
+        function_name (str): name of the function, must exist in functions
+        functions (dict of str: Function): all of the existing functions
+    
+    Kwargs:
+        data_table (dict of str: Value or list of Value): values or columns of values to be substituted into variables when evaluating the functions
+    
+    Returns:
+        (ValueColumn): the result of the function specified by function_name for each row
+    """
+    return _eval_tree(function_name, functions, data_table.copy(), SubexpressionCache())
 
+def _eval_tree(function_name: str, functions: typing.Dict[str, Function], data_table: t_columntable, cache: SubexpressionCache) -> typing.Union[Value, ValueColumn]:
+    """
+    Recursive part of evaluate_tree and evaluate_tree_columns. The results of dependencies are added to data_table so that each is only evaluated once, so data_table must be a copy.
+    Evaluates every row at once (sharing identical branches between functions) if a cache is given, otherwise a single row
+    """
     dependencies = functions[function_name].evaluate_dependencies()
 
     local_data_table = {} #populate this with the values that are the dependencies of this function
     for dependency in dependencies: #evaluate direct dependencies
-        if dependency in data_table: #dependency doesn't need evaluating
-            local_data_table[dependency] = data_table[dependency]
+        if dependency not in data_table: #dependency needs evaluating
+            data_table[dependency] = _eval_tree(dependency, functions, data_table, cache) #evaluate function as its result is a dependency
         
+        local_data_table[dependency] = data_table[dependency]
+    
+    if cache is not None:
+        return functions[function_name].evaluate_columns(local_data_table, cache)
+    else:
+        return functions[function_name].evaluate(local_data_table) #evaluate this function with the generated data table and return
+
+
+#simplification
+def _is_number(function: IMathematicalFunction, number: float) -> bool:
+    """
+    Check whether a branch is a constant of exactly number without any uncertainty or units (so that using it as an operand can't change the uncertainty or units of a result)
+    """
+    return isinstance(function, Float) and function._value.value == number and function._value.absolute_uncertainty == 0 and function._value.units == []
+
+def _fold_chain(function: IMathematicalFunction, identity: float) -> IMathematicalFunction:
+    """
+    Fold the constant operands of a chain of an associative operator (e.g. 2*{x}*3 or 1+{x}+2) into one constant that is the first operand of the chain.
+    If the constant is the identity of the operator and the rest of the chain already has the type of uncertainty that the operator gives, it is removed
+
+    Args:
+        function (Add or Multiply): root of the chain. Every subfunction of the same type is part of the chain
+        identity (float): the number that doesn't change the result of the operator (0 for addition, 1 for multiplication)
+    
+    Returns:
+        (IMathematicalFunction): the simplified chain (function if it couldn't be simplified)
+    """
+    #flatten the chain
+    operands = []
+    to_visit = [function]
+    while len(to_visit) > 0:
+        current = to_visit.pop()
+        if type(current) is type(function):
+            to_visit += reversed(current._subfuncs)
         else:
-            result = evaluate_tree(dependency, functions, data_table) #evaluate function as its result is a dependency
-            local_data_table[dependency] = result
-            data_table[dependency] = result
+            operands.append(current)
+    
+    constants = [operand for operand in operands if isinstance(operand, Float)]
+    dynamic = [operand for operand in operands if not isinstance(operand, Float)]
+    if len(dynamic) == 0: #entirely static branches are evaluated by pre_evaluate
+        return function
+
+    #the units of additions are only kept if they match, so constants with units can only be moved if they don't have units
+    if type(function) is Add and False in [constant._value.units == [] for constant in constants]:
+        return function
+
+    if len(constants) == 0:
+        return function
     
-    return functions[function_name].evaluate(local_data_table) #evaluate this function with the generated data table and return
+    folded = constants[0]
+    if len(constants) > 1:
+        folded = Float(_build_chain(function, constants).evaluate({}))
+    
+    if _is_number(folded, identity):
+        rest = _build_chain(function, dynamic)
+        if rest._gives_percentage_uncertainty == function._gives_percentage_uncertainty: #the constant had no effect on the result
+            return rest
+    
+    if len(constants) == 1: #nothing to fold
+        return function
+
+    return _build_chain(function, [folded] + dynamic)
+
+def _build_chain(function: IMathematicalFunction, operands: typing.List[IMathematicalFunction]) -> IMathematicalFunction:
+    """
+    Build a chain of operands joined by copies of a binary operator. Chains are right associative (like the parser): a, b, c becomes a (b c)
+    """
+    result = operands[-1]
+    for operand in reversed(operands[:-1]):
+        node = copy.copy(function)
+        node._subfuncs = [operand, result]
+        result = node
+    
+    return result
 
 
 #utility functions
-def _strip_brackets(string: str) -> str:
+def _remove_zero_powers(units: typing.List[typing.Tuple[int, float]]) -> typing.List[typing.Tuple[int, float]]:
+    """
+    Removes units with a power of 0 from a unit table
+
+    Args:
+        units (list of (int, float)): unit table to filter
+    
+    Returns:
+        (list of (int, float)): the unit table without any units that have a power of 0 (the same list if there aren't any)
     """
-    Strips leading and trailing bracket pairs from a string
+    for unit in units:
+        if unit[1] == 0:
+            return [unit for unit in units if unit[1] != 0]
+    
+    return units
+
+def _combine_units(units_a: typing.List[typing.Tuple[int, float]], units_b: typing.List[typing.Tuple[int, float]], multiplier: float) -> typing.List[typing.Tuple[int, float]]:
+    """
+    Multiplies two unit tables together (adds the powers of the second, multiplied by multiplier, to the first). Units with a power of 0 are removed.
+    The result is shared between every call with the same unit tables, so it must not be modified
 
     Args:
-        string (str): string to strip
+        units_a (list of (int, float)): first unit table
+        units_b (list of (int, float)): second unit table
+        multiplier (float): 1 to multiply the units, -1 to divide
     
     Returns:
-        (str): the stripped string
+        (list of (int, float)): the resultant unit table
+    """
+    return _combine_unit_tuples(tuple(units_a), tuple(units_b), multiplier)
+
+@functools.lru_cache(maxsize = 1024)
+def _combine_unit_tuples(units_a: typing.Tuple[typing.Tuple[int, float], ...], units_b: typing.Tuple[typing.Tuple[int, float], ...], multiplier: float) -> typing.List[typing.Tuple[int, float]]:
+    """
+    Cached implementation of _combine_units. Unit tables are passed as tuples so that they can be hashed
     """
-    while string.startswith('(') and string.endswith(')'):
-        string = string[1:-1]
+    result = list(units_a)
+    for unit_id, power in units_b:
+        to_add = None
+        to_remove = -1
+        for i in range(len(result)):
+            if result[i][0] == unit_id:
+                to_add = (unit_id, result[i][1] + (power * multiplier))
+                to_remove = i
+
+        if to_add is None:
+            result.append((unit_id, power * multiplier))
+        else:
+            result.pop(to_remove)
+            result.append(to_add)
     
-    return string
+    return _remove_zero_powers(result)
 
 def _remove_all_spaces(string: str) -> str:
     """
@@ -993,7 +1309,7 @@ def _remove_all_spaces(string: str) -> str:
     Returns:
         (str): the string with spaces removed
     """
-    output = ''
+    output = []
     in_var = False
     for char in string:
         if char == '{' and not in_var:
@@ -1002,6 +1318,210 @@ def _remove_all_spaces(string: str) -> str:
             in_var = False
         
         if not (char == ' ' and not in_var):
-            output += char
+            output.append(char)
+    
+    return ''.join(output)
+
+
+#parsing
+#expressions are split into tokens, which are then turned into a tree by precedence climbing. Every operator is treated as binary and right associative, and
+#operators are ordered by their priority in operator_register (operators with the same priority are ordered by their position in operator_register).
+#This builds the same trees as splitting the expression around the first occurrence of the lowest priority operator and recursing on both sides
+#Parsed trees are cached by expression, as the same formulae are parsed every time a datatable is loaded. Trees in the cache are shared, so
+#they must not be modified (pre_evaluate makes copies instead)
+@functools.lru_cache(maxsize = 512)
+def _parse(string: str) -> IMathematicalFunction:
+    """
+    Parse an expression into a function tree. Results are cached
+
+    Args:
+        string (str): the expression to parse
+    
+    Returns:
+        (instance of IMathematicalFunction): the root of the tree
+    """
+    tokens = _tokenise(string)
+
+    #operators that bind the least tightly are split on first, so they get the lowest binding powers
+    operator_order = sorted(range(len(operator_register)), key = lambda index: (0 - operator_register[index]['priority'], index))
+    binding_powers = {operator_order[rank]: rank + 1 for rank in range(len(operator_order))}
+
+    tree, position = _parse_expression(string, tokens, 0, 0, binding_powers)
+
+    if position != len(tokens): #only a closing bracket can stop the top level expression early, but these have already been checked by _tokenise
+        raise ValueError('In expression "{}" at {}: can\'t close an unopened bracket pair'.format(string, tokens[position][2]))
+
+    if tree is None:
+        raise ValueError('Expression "{}" is empty'.format(string))
+
+    return tree
+
+def parse_cache_info() -> typing.NamedTuple:
+    """
+    Get statistics for the cache of parsed expressions
+
+    Returns:
+        (named tuple of hits, misses, maxsize, currsize): the number of parses that were and weren't found in the cache, the maximum size of the cache and the number of trees in it
+    """
+    return _parse.cache_info()
+
+def clear_parse_cache():
+    """
+    Empty the cache of parsed expressions and reset its statistics
+    """
+    _parse.cache_clear()
+
+def _tokenise(string: str) -> typing.List[typing.Tuple[str, typing.Union[str, int], int]]:
+    """
+    Split an expression into tokens. Where more than one operator could start at the same character, the longest takes precedence (e.g. asin over sin)
+
+    Args:
+        string (str): the expression to split
+    
+    Returns:
+        (list of (str, str or int, int)): the kind of each token (number, variable, operator, open or close), its contents (the index in operator_register for operators) and its position in the string
+    """
+    string = _remove_all_spaces(string)
+
+    tokens = []
+    bracket_level = 0
+    i = 0
+    while i < len(string):
+        char = string[i]
+
+        if char == '{': #variable - find the end of the name
+            end = string.find('}', i + 1)
+            if end == -1:
+                raise ValueError('In expression "{}": a variable was opened with "{{" but not closed with "}}" before the end of the expression'.format(string))
+            
+            if '{' in string[i + 1:end]:
+                raise ValueError('In expression "{}" at {}: can\'t use {{ when not opening a variable name'.format(string, string.find('{', i + 1)))
+
+            tokens.append(('variable', string[i + 1:end], i))
+            i = end + 1
+        
+        elif char == '}':
+            raise ValueError('In expression "{}" at {}: can\'t use }} when not closing a variable name'.format(string, i))
+        
+        elif char == '(':
+            bracket_level += 1
+            tokens.append(('open', char, i))
+            i += 1
+        
+        elif char == ')':
+            if bracket_level == 0:
+                raise ValueError('In expression "{}" at {}: can\'t close an unopened bracket pair'.format(string, i))
+            
+            bracket_level -= 1
+            tokens.append(('close', char, i))
+            i += 1
+        
+        elif char in '1234567890.': #number - take all of the following digits
+            end = i
+            while end < len(string) and string[end] in '1234567890.':
+                end += 1
+            
+            tokens.append(('number', string[i:end], i))
+            i = end
+        
+        else: #operator - find the longest one that matches here
+            best_index = None
+            best_length = 0
+            for index in range(len(operator_register)):
+                match = operator_register[index]['expression'].match(string, i)
+
+                if match is not None and match.end() - i > 0:
+                    if match.end() - i > best_length:
+                        best_index = index
+                        best_length = match.end() - i
+
+                    elif match.end() - i == best_length and operator_register[index]['class'] != operator_register[best_index]['class']: #this is not a condition that should occur with the default operators, but this system is very flexible so operators that trigger this could be added
+                        raise ValueError('Two operators of equal length {} are competing for the same match in expression "{}" - "{}" and "{}" at {}. This conflict can\'t be resolved without changing the expression or modifying the capture expressions at the bottom of the functions module to avoid triggering both conditions.'.format(best_length, string, operator_register[best_index]['name'], operator_register[index]['name'], i))
+            
+            if best_index is None:
+                raise ValueError('No valid operators found in "{}" (at {})'.format(string, i)) #not a float, variable or operator
+            
+            tokens.append(('operator', best_index, i))
+            i += best_length
+    
+    if bracket_level != 0:
+        raise ValueError('In expression "{}": {} bracket(s) were not closed'.format(string, bracket_level))
+    
+    return tokens
+
+def _parse_expression(string: str, tokens: typing.List[typing.Tuple[str, typing.Union[str, int], int]], position: int, min_binding_power: int, binding_powers: typing.Dict[int, int]) -> typing.Tuple[IMathematicalFunction, int]:
+    """
+    Recursive part of _parse. Parses tokens from position onwards until an operator that binds less tightly than min_binding_power, a closing bracket or the end of the tokens is reached
+
+    Returns:
+        (instance of IMathematicalFunction or None, int): the tree that was parsed (None if there was no operand) and the position of the next token to parse
+    """
+    left, position = _parse_operand(string, tokens, position, binding_powers)
+
+    while position < len(tokens):
+        kind, contents, string_position = tokens[position]
+
+        if kind == 'close':
+            break
+
+        elif kind != 'operator': #two operands without an operator between them
+            raise ValueError('No valid operators found in "{}" (at {})'.format(string, string_position))
+        
+        binding_power = binding_powers[contents]
+        if binding_power < min_binding_power: #this operator belongs higher up the tree
+            break
+
+        right, position = _parse_expression(string, tokens, position + 1, binding_power, binding_powers) #operators of the same binding power are taken by the right hand side, so all operators are right associative
+
+        if right is None and operator_register[contents]['class']._first_operand_is_multiplier and position < len(tokens) and tokens[position][0] == 'operator':
+            #a function followed directly by an operator with a default left operand takes that operator as the start of its operand (e.g. sin-{x} -> sin(0-{x})), as operators that touch a longer operator were ignored by the old parser
+            inner_operator = operator_register[tokens[position][1]]
+            if 'default values' in inner_operator and len(inner_operator['default values']) > 0 and inner_operator['default values'][0] is not None:
+                inner_right, position = _parse_expression(string, tokens, position + 1, binding_power, binding_powers)
+                right = _build_operator(string, inner_operator, [None, inner_right])
+
+        left = _build_operator(string, operator_register[contents], [left, right])
+    
+    return left, position
+
+def _parse_operand(string: str, tokens: typing.List[typing.Tuple[str, typing.Union[str, int], int]], position: int, binding_powers: typing.Dict[int, int]) -> typing.Tuple[IMathematicalFunction, int]:
+    """
+    Parse the float, variable or bracketed expression at position
+
+    Returns:
+        (instance of IMathematicalFunction or None, int): the operand (None if the operand is missing) and the position of the next token to parse
+    """
+    if position == len(tokens):
+        return None, position
+
+    kind, contents, string_position = tokens[position]
+
+    if kind == 'number':
+        return Float(contents), position + 1
+    
+    elif kind == 'variable':
+        return Variable(contents), position + 1
+    
+    elif kind == 'open':
+        tree, position = _parse_expression(string, tokens, position + 1, 0, binding_powers)
+        return tree, position + 1 #skip the closing bracket (_tokenise has made sure that it exists)
+    
+    else: #operator or closing bracket, so there is no operand here
+        return None, position
+
+def _build_operator(string: str, operator: typing.Dict[str, typing.Any], operands: typing.List[IMathematicalFunction]) -> IMathematicalFunction:
+    """
+    Construct an operator node, inserting default values for missing operands (e.g. sin2 -> 1sin(2))
+
+    Returns:
+        (instance of IMathematicalFunction): the new node
+    """
+    for i in range(len(operands)):
+        if operands[i] is None:
+            if 'default values' in operator and len(operator['default values']) > i and operator['default values'][i] is not None:
+                operands[i] = _parse(operator['default values'][i])
+            
+            else:
+                raise ValueError('In expression "{}": operand {} was not supplied for operator "{}" and a default value couldn\'t be found'.format(string, i, operator['name']))
     
-    return output
\ No newline at end of file
+    return operator['class'](*operands) #construct the next section of the tree
\ No newline at end of file
@@ -1,6 +1,8 @@
 import math
 import typing
 
+import numpy
+
 import sciplot
 import sciplot.datatable
 
@@ -11,13 +13,20 @@ class FitLines:
 
     Args:
         datatable (Datatable): a datatable with exactly two columns that has already had .load called on it
+    
+    Kwargs:
+        use_numpy (bool: True): calculate using numpy arrays of the values and uncertainties. When false, the original pure python implementation is used (kept as a reference to test against)
     """
-    def __init__(self, datatable):
+    def __init__(self, datatable, use_numpy: bool = True):
         self._datatable: sciplot.datatable.Datatable = datatable
+        self._use_numpy = use_numpy
 
         if len(self._datatable.as_columns()) != 2:
             raise ValueError("Datatable must have exactly 2 columns, not {}".format(len(self._datatable.as_columns())))
         
+        #x values, x uncertainties, y values and y uncertainties (absolute) as numpy arrays. Only extracted from the datatable once (see _get_arrays)
+        self._arrays: typing.Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray] = None
+        
         #line with best gradient
         self.fit_best_gradient: float = None
         self.fit_best_intercept: float = None
@@ -41,9 +50,7 @@ class FitLines:
         """
         Calculate equation of the best fit line
         """
-        #get raw values
-        x_values = [value.value for value in self._datatable.as_columns()[0]]
-        y_values = [value.value for value in self._datatable.as_columns()[1]]
+        x_values, y_values = self._datatable.as_columns()
 
         if len(x_values) != len(y_values):
             raise ValueError("The data to calculate a fit line for has uneven length: x = {}, y = {}".format(len(x_values), len(y_values)))
@@ -51,6 +58,51 @@ class FitLines:
         if len(x_values) < 2:
             raise ValueError("At least two value pairs are needed to calculate a fit line (only {} pair(s) exist)".format(len(x_values)))
 
+        if self._use_numpy:
+            self.fit_best_gradient, self.fit_best_intercept = self._best_fit_numpy()
+        else:
+            self.fit_best_gradient, self.fit_best_intercept = self._best_fit_python()
+
+    def _best_fit_numpy(self) -> typing.Tuple[float, float]:
+        """
+        Calculate the gradient and intercept of the best fit line using numpy arrays of the values
+        """
+        x_values, x_uncertainties, y_values, y_uncertainties = self._get_arrays()
+
+        #calculate means of x and y
+        x_mean = float(numpy.mean(x_values))
+        y_mean = float(numpy.mean(y_values))
+
+        #calculate diffsquares and diffs
+        x_diffs = x_values - x_mean
+        y_diffs = y_values - y_mean
+        diffsquare_x = float(numpy.dot(x_diffs, x_diffs))
+        diffsquare_y = float(numpy.dot(y_diffs, y_diffs))
+
+        if diffsquare_x == 0:
+            raise ValueError("Can\'t calculate a fit line for data where all x values are the same")
+
+        if diffsquare_y == 0:
+            raise ValueError("Can\'t calculate a fit line for data where all y values are the same")
+
+        #calculate standard deviations
+        stdev_x = math.sqrt(diffsquare_x / (len(x_values) - 1))
+        stdev_y = math.sqrt(diffsquare_y / (len(y_values) - 1))
+
+        #calculate sample pearson correlation coefficient
+        correl = float(numpy.dot(x_diffs, y_diffs)) / (math.sqrt(diffsquare_x) * math.sqrt(diffsquare_y))
+
+        gradient = correl * (stdev_y / stdev_x)
+        return gradient, y_mean - (x_mean * gradient)
+
+    def _best_fit_python(self) -> typing.Tuple[float, float]:
+        """
+        Calculate the gradient and intercept of the best fit line using lists of the values
+        """
+        #get raw values
+        x_values = [value.value for value in self._datatable.as_columns()[0]]
+        y_values = [value.value for value in self._datatable.as_columns()[1]]
+
         #calculate means of x and y
         x_mean = sum(x_values) / len(x_values)
         y_mean = sum(y_values) / len(y_values)
@@ -72,21 +124,91 @@ class FitLines:
         #calculate sample pearson correlation coefficient
         correl = sum([(x_values[i] - x_mean) * (y_values[i] - y_mean) for i in range(len(x_values))]) / (math.sqrt(diffsquare_x) * math.sqrt(diffsquare_y))
 
-        self.fit_best_gradient = correl * (stdev_y / stdev_x)
-        self.fit_best_intercept = y_mean - (x_mean * self.fit_best_gradient)
+        gradient = correl * (stdev_y / stdev_x)
+        return gradient, y_mean - (x_mean * gradient)
 
     def calculate_worst_fits(self):
         """
-        Calculate equations of the two worst fit lines
+        Calculate equations of the two worst fit lines (the lines with the most extreme gradients that go through the uncertainty boxes of every point).
+        If there is no line that goes through every box, or there is no limit to how steep the line can be (a vertical line goes through every box), the line is None
+        """
+        if self._use_numpy:
+            max_line, min_line = self._worst_fits_hulls()
+        else:
+            max_line, min_line = self._worst_fits_python()
+        
+        if max_line is None:
+            self.fit_worst_max_gradient = None
+            self.fit_worst_max_intercept = None
+        else:
+            self.fit_worst_max_gradient, self.fit_worst_max_intercept = max_line
+        
+        if min_line is None:
+            self.fit_worst_min_gradient = None
+            self.fit_worst_min_intercept = None
+        else:
+            self.fit_worst_min_gradient, self.fit_worst_min_intercept = min_line
+    
+    def _worst_fits_hulls(self) -> typing.Tuple[typing.Tuple[float, float], typing.Tuple[float, float]]:
+        """
+        Find the worst fit lines from the convex hulls of the corners of the boxes
+
+        Returns:
+            ((float, float) or None): gradient and intercept of the line with the largest gradient
+            ((float, float) or None): gradient and intercept of the line with the smallest gradient
+        """
+        #the lines that go through every box are lines that pass above one corner of each box and below the opposite corner
+        #which corners these are depends on the sign of the gradient, so positive and negative gradients are considered separately
+        x_values, x_uncertainties, y_values, y_uncertainties = self._get_arrays()
+        left = (x_values - x_uncertainties).tolist()
+        right = (x_values + x_uncertainties).tolist()
+        bottom = (y_values - y_uncertainties).tolist()
+        top = (y_values + y_uncertainties).tolist()
+
+        bottom_left = list(zip(left, bottom))
+        bottom_right = list(zip(right, bottom))
+        top_left = list(zip(left, top))
+        top_right = list(zip(right, top))
+
+        positive_is_valid, positive_min, positive_max = _separating_gradients(bottom_right, top_left)
+        negative_is_valid, negative_min, negative_max = _separating_gradients(bottom_left, top_right)
+
+        #the ranges are only valid where the gradient has the sign that they were calculated for. if both contain 0, they overlap there
+        positive_is_valid = positive_is_valid and (positive_max is None or positive_max[0] >= 0)
+        negative_is_valid = negative_is_valid and (negative_min is None or negative_min[0] <= 0)
+
+        max_line = None
+        if positive_is_valid:
+            max_line = positive_max
+        elif negative_is_valid:
+            max_line = negative_max
+        
+        min_line = None
+        if negative_is_valid:
+            min_line = negative_min
+        elif positive_is_valid:
+            min_line = positive_min
+        
+        return max_line, min_line
+    
+    def _worst_fits_python(self) -> typing.Tuple[typing.Tuple[float, float], typing.Tuple[float, float]]:
+        """
+        Find the worst fit lines by trying the line through every pair of corners of the boxes (the original method, kept as a reference to test against)
+
+        Returns:
+            ((float, float) or None): gradient and intercept of the line with the largest gradient
+            ((float, float) or None): gradient and intercept of the line with the smallest gradient
         """
         x_values, y_values = self._datatable.as_columns()
 
+        max_is_limited, min_is_limited = self._worst_fit_limits(x_values, y_values)
+
         potential_fit_lines: typing.List[typing.Tuple[float, float]] = [] #gradient, intercept of all fit lines that go through all points
 
         for switch in [(a, b, c, d) for a in [1, -1] for b in [1, -1] for c in [1, -1] for d in [1, -1]]: #compute cartesian product of the sets (1, -1) and (1, -1) to get the four corners of the value (limited by its uncertainty)
             for i in range(len(x_values)):
                 for j in range(len(x_values)):
-                    if (i != j) and (x_values[i] != x_values[j]): #dont generate a line for two identical points
+                    if i != j:
                         first_value_x = x_values[i]
                         first_value_y = y_values[i]
                         second_value_x = x_values[j]
@@ -94,17 +216,16 @@ class FitLines:
 
                         point_first = [first_value_x.value + (switch[0] * first_value_x.absolute_uncertainty), first_value_y.value + (switch[1] * first_value_y.absolute_uncertainty)]
                         point_second = [second_value_x.value + (switch[2] * second_value_x.absolute_uncertainty), second_value_y.value + (switch[3] * second_value_y.absolute_uncertainty)]
-                        gradient = (point_second[1] - point_first[1]) / (point_second[0] - point_first[0])
-                        intercept = point_first[1] - (point_first[0] * gradient)
-                        
-                        if self._check_line(gradient, intercept, x_values, y_values):
-                            potential_fit_lines.append((gradient, intercept))
+
+                        if point_first[0] != point_second[0]: #don't generate a vertical line
+                            gradient = (point_second[1] - point_first[1]) / (point_second[0] - point_first[0])
+                            intercept = point_first[1] - (point_first[0] * gradient)
+                            
+                            if self._check_line(gradient, intercept, x_values, y_values):
+                                potential_fit_lines.append((gradient, intercept))
         
         if len(potential_fit_lines) == 0: #there are no possible fit lines
-            self.fit_worst_max_gradient = None
-            self.fit_worst_max_intercept = None
-            self.fit_worst_min_gradient = None
-            self.fit_worst_min_intercept = None
+            return None, None
 
         else: #find the worst minimum and maximum (worst = most extreme gradients)
             max_index = 0
@@ -115,8 +236,45 @@ class FitLines:
                 if potential_fit_lines[i][0] < potential_fit_lines[min_index][0]:
                     min_index = i
             
-            self.fit_worst_max_gradient, self.fit_worst_max_intercept = potential_fit_lines[max_index]
-            self.fit_worst_min_gradient, self.fit_worst_min_intercept = potential_fit_lines[min_index]
+            return potential_fit_lines[max_index] if max_is_limited else None, potential_fit_lines[min_index] if min_is_limited else None
+
+    def _worst_fit_limits(self, x_values: typing.List[sciplot.Value], y_values: typing.List[sciplot.Value]) -> typing.Tuple[bool, bool]:
+        """
+        Find out whether the gradients of the lines that go through every box are limited. They can only be unlimited if a vertical line goes through every box (the boxes all overlap in x).
+        If the boxes overlap by more than a single x coordinate, a steep enough line through the overlap goes through every box whatever its direction.
+        If they only touch at one x coordinate, a steep line through a point on it goes up through the boxes that start there and down through the boxes that end there (or the opposite for a negative gradient),
+        so the boxes that end there must reach below the boxes that start there (or above them)
+
+        Args:
+            x_values (list of Value): x-axis values
+            y_values (list of Value): y-axis values corresponding to the x-axis values of the same index
+        
+        Returns:
+            (bool): whether the gradient is limited in the positive direction
+            (bool): whether the gradient is limited in the negative direction
+        """
+        if len(x_values) == 0:
+            return True, True
+
+        lefts = [value.value - value.absolute_uncertainty for value in x_values]
+        rights = [value.value + value.absolute_uncertainty for value in x_values]
+        bottoms = [value.value - value.absolute_uncertainty for value in y_values]
+        tops = [value.value + value.absolute_uncertainty for value in y_values]
+
+        if max(lefts) > min(rights): #no vertical line goes through every box
+            return True, True
+        
+        elif max(lefts) < min(rights):
+            return False, False
+        
+        else:
+            touching_x = max(lefts)
+            starting = [i for i in range(len(x_values)) if lefts[i] == touching_x]
+            ending = [i for i in range(len(x_values)) if rights[i] == touching_x]
+
+            max_is_limited = max([bottoms[i] for i in ending]) > min([tops[i] for i in starting])
+            min_is_limited = max([bottoms[i] for i in starting]) > min([tops[i] for i in ending])
+            return max_is_limited, min_is_limited
 
     def _check_line(self, gradient: float, intercept: float, x_values: typing.List[sciplot.Value], y_values: typing.List[sciplot.Value]) -> bool:
         """
@@ -138,7 +296,8 @@ class FitLines:
 
     def _line_covers_value(self, gradient, intercept, x_value, y_value) -> bool:
         """
-        Checks whether or not a line, at some point, goes through the box produced by a value and its uncertainty
+        Checks whether or not a line, at some point, goes through the box produced by a value and its uncertainty.
+        Lines through the corners of boxes are on the edges of other boxes, so a small amount of rounding error is allowed
 
         Args:
             gradient (float): gradient of line to check
@@ -149,32 +308,29 @@ class FitLines:
         Returns:
             (bool): whether the line goes through the value
         """
-        return self._line_covers_value_axes(gradient, intercept, x_value, y_value) or self._line_covers_value_axes(gradient, intercept, y_value, x_value)
-    
-    def _line_covers_value_axes(self, gradient, intercept, x_value, y_value) -> bool:
-        """
-        Whether the line goes through the maximum or minimum x border of the value
-        For internal use only
+        tolerance = 1e-9 * (abs(y_value.value) + y_value.absolute_uncertainty + 1)
+        min_y = y_value.value - y_value.absolute_uncertainty - tolerance
+        max_y = y_value.value + y_value.absolute_uncertainty + tolerance
 
-         Args:
-            gradient (float): gradient of line to check
-            intercept (float): y-intercept of line to check
-            x_value Value): x value
-            y_value (Value): y value
-        
-        Returns:
-            (bool): whether the line goes through the x border
-        """
-        min_x = x_value.value - x_value.absolute_uncertainty
-        max_x = x_value.value + x_value.absolute_uncertainty
-        min_y = y_value.value - y_value.absolute_uncertainty
-        max_y = y_value.value + y_value.absolute_uncertainty
+        #the line goes through the box if the part of the line between the minimum and maximum x borders overlaps the box's y range
+        y_at_min_x = intercept + (gradient * (x_value.value - x_value.absolute_uncertainty))
+        y_at_max_x = intercept + (gradient * (x_value.value + x_value.absolute_uncertainty))
 
-        #check if the y value is in the range (ie inside the box) at the minimum or maximum x border
-        touches_min_x = min_y <= (intercept + (gradient * min_x)) <= max_y
-        touches_max_x = min_y <= (intercept + (gradient * max_x)) <= max_y
+        return min(y_at_min_x, y_at_max_x) <= max_y and max(y_at_min_x, y_at_max_x) >= min_y
 
-        return touches_min_x or touches_max_x
+    def _get_arrays(self) -> typing.Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """
+        Get the x values, x uncertainties, y values and y uncertainties (absolute) of the data as numpy arrays. They are only extracted from the datatable the first time this is called
+        """
+        if self._arrays is None:
+            arrays = []
+            for column in self._datatable.as_columns():
+                column = sciplot.ValueColumn.from_values(column) #loaded columns are already ValueColumns, so their arrays are used without making any Values
+                arrays += numpy.broadcast_arrays(numpy.asarray(column.value, dtype = float), numpy.asarray(column.absolute_uncertainty, dtype = float))
+
+            self._arrays = tuple(arrays)
+        
+        return self._arrays
 
     #worst fit properties
     def _get_fit_worst_gradient(self) -> float:
@@ -196,4 +352,272 @@ class FitLines:
                 return self.fit_worst_min_intercept
 
     fit_worst_gradient: float = property(_get_fit_worst_gradient)
-    fit_worst_intercept: float = property(_get_fit_worst_gradient)
\ No newline at end of file
+    fit_worst_intercept: float = property(_get_fit_worst_gradient)
+
+
+class BestFitAccumulator:
+    """
+    Calculates the same best fit line as FitLines in a single pass, without keeping any of the values (Welford's method).
+    Rows can be added from any iterable (e.g. a database cursor or a generator), and accumulators that were fed separate parts of the data can be merged
+    """
+    def __init__(self):
+        self.count: int = 0
+
+        self._x_mean: float = 0
+        self._y_mean: float = 0
+
+        #sums of the squared differences from the means (and of the products of the differences)
+        self._diffsquare_x: float = 0
+        self._diffsquare_y: float = 0
+        self._diffproduct: float = 0
+    
+    def add(self, x_value: float, y_value: float):
+        """
+        Add a single value pair
+
+        Args:
+            x_value (float): x-axis value
+            y_value (float): y-axis value
+        """
+        self.count += 1
+
+        x_diff = x_value - self._x_mean
+        y_diff = y_value - self._y_mean
+
+        self._x_mean += x_diff / self.count
+        self._y_mean += y_diff / self.count
+
+        #the product of the difference from the old mean and the difference from the new mean is the change in the sum
+        self._diffsquare_x += x_diff * (x_value - self._x_mean)
+        self._diffsquare_y += y_diff * (y_value - self._y_mean)
+        self._diffproduct += x_diff * (y_value - self._y_mean)
+    
+    def add_rows(self, rows: typing.Iterable[typing.Tuple[float, float]]):
+        """
+        Add every value pair from an iterable. Rows are consumed one at a time, so the iterable is never held in memory
+
+        Args:
+            rows (iterable of (float, float)): x-axis and y-axis values
+        """
+        for x_value, y_value in rows:
+            self.add(x_value, y_value)
+    
+    def merge(self, other: "BestFitAccumulator") -> "BestFitAccumulator":
+        """
+        Combine the value pairs of two accumulators. Neither accumulator is changed
+
+        Args:
+            other (BestFitAccumulator): accumulator to combine with this one
+        
+        Returns:
+            (BestFitAccumulator): an accumulator that has had every value pair of both accumulators added to it
+        """
+        result = BestFitAccumulator()
+        result.count = self.count + other.count
+
+        if result.count == 0:
+            return result
+
+        x_diff = other._x_mean - self._x_mean
+        y_diff = other._y_mean - self._y_mean
+        weight = (self.count * other.count) / result.count
+
+        result._x_mean = self._x_mean + (x_diff * other.count / result.count)
+        result._y_mean = self._y_mean + (y_diff * other.count / result.count)
+
+        result._diffsquare_x = self._diffsquare_x + other._diffsquare_x + (x_diff * x_diff * weight)
+        result._diffsquare_y = self._diffsquare_y + other._diffsquare_y + (y_diff * y_diff * weight)
+        result._diffproduct = self._diffproduct + other._diffproduct + (x_diff * y_diff * weight)
+
+        return result
+    
+    def calculate(self) -> typing.Tuple[float, float]:
+        """
+        Calculate the equation of the best fit line through every value pair that has been added
+
+        Returns:
+            (float): gradient
+            (float): y-intercept
+        """
+        if self.count < 2:
+            raise ValueError("At least two value pairs are needed to calculate a fit line (only {} pair(s) exist)".format(self.count))
+
+        if self._diffsquare_x == 0:
+            raise ValueError("Can\'t calculate a fit line for data where all x values are the same")
+
+        if self._diffsquare_y == 0:
+            raise ValueError("Can\'t calculate a fit line for data where all y values are the same")
+        
+        #pearson correlation coefficient multiplied by stdev_y / stdev_x
+        gradient = self._diffproduct / self._diffsquare_x
+        return gradient, self._y_mean - (self._x_mean * gradient)
+
+
+#plot level of detail
+def decimate_points(x_values: numpy.ndarray, y_values: numpy.ndarray, x_uncertainties: numpy.ndarray, y_uncertainties: numpy.ndarray, resolution: typing.Tuple[int, int], x_range: typing.Tuple[float, float] = None, y_range: typing.Tuple[float, float] = None) -> typing.Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Reduce the points of a plot to (at most) one per cell of a grid the size of the screen, so that plots with many points can be drawn quickly.
+    Points in the visible range are put into cells the size of a pixel of the visible range, and points outside it are put into cells the size of a pixel of the whole plot
+    (so that they are roughly in place if the plot is moved). The error bars of the points in each cell are merged into one bar per axis that covers all of them
+
+    Args:
+        x_values (numpy.ndarray of float): x values of the points
+        y_values (numpy.ndarray of float): y values of the points
+        x_uncertainties (numpy.ndarray of float): absolute x uncertainties of the points
+        y_uncertainties (numpy.ndarray of float): absolute y uncertainties of the points
+        resolution ((int, int)): number of cells along the x and y axes (normally the size of the plot in pixels)
+    
+    Kwargs:
+        x_range ((float, float)): lowest and highest visible x values. If this or y_range is None, the whole plot is visible
+        y_range ((float, float)): lowest and highest visible y values
+    
+    Returns:
+        (numpy.ndarray of float, shape (n, 2)): the point kept for each cell
+        (numpy.ndarray of float, shape (n, 2, 2)): the ends of the x error bar for each cell
+        (numpy.ndarray of float, shape (n, 2, 2)): the ends of the y error bar for each cell
+    """
+    x_values, y_values, x_uncertainties, y_uncertainties = numpy.broadcast_arrays(*[numpy.asarray(array, dtype = float) for array in [x_values, y_values, x_uncertainties, y_uncertainties]])
+
+    if x_range is None or y_range is None:
+        groups = [(numpy.ones(len(x_values), dtype = bool), None, None)]
+    else:
+        visible = (x_values >= x_range[0]) & (x_values <= x_range[1]) & (y_values >= y_range[0]) & (y_values <= y_range[1])
+        groups = [(visible, x_range, y_range), (~visible, None, None)]
+
+    points = []
+    x_bars = []
+    y_bars = []
+    for mask, group_x_range, group_y_range in groups:
+        x, y, x_unc, y_unc = x_values[mask], y_values[mask], x_uncertainties[mask], y_uncertainties[mask]
+        if len(x) == 0:
+            continue
+
+        #find the cell of each point
+        cells = numpy.zeros(len(x), dtype = numpy.int64)
+        for values, value_range, num_cells in [(x, group_x_range, resolution[0]), (y, group_y_range, resolution[1])]:
+            if value_range is None:
+                value_range = (numpy.min(values), numpy.max(values))
+            
+            span = value_range[1] - value_range[0]
+            if span <= 0:
+                span = 1
+
+            cell = numpy.clip(numpy.floor((values - value_range[0]) * (num_cells / span)), 0, num_cells - 1).astype(numpy.int64)
+            cells = (cells * num_cells) + cell
+        
+        #group the points by cell. the first point in each cell is kept and the error bars in each cell are merged
+        order = numpy.argsort(cells, kind = 'stable')
+        cells = cells[order]
+        starts = numpy.flatnonzero(numpy.concatenate([[True], cells[1:] != cells[:-1]]))
+        kept = order[starts]
+
+        kept_x = x[kept]
+        kept_y = y[kept]
+        points.append(numpy.column_stack([kept_x, kept_y]))
+
+        x_low = numpy.minimum.reduceat((x - x_unc)[order], starts)
+        x_high = numpy.maximum.reduceat((x + x_unc)[order], starts)
+        x_bars.append(numpy.stack([numpy.column_stack([x_low, kept_y]), numpy.column_stack([x_high, kept_y])], axis = 1))
+
+        y_low = numpy.minimum.reduceat((y - y_unc)[order], starts)
+        y_high = numpy.maximum.reduceat((y + y_unc)[order], starts)
+        y_bars.append(numpy.stack([numpy.column_stack([kept_x, y_low]), numpy.column_stack([kept_x, y_high])], axis = 1))
+    
+    if len(points) == 0:
+        return numpy.zeros((0, 2)), numpy.zeros((0, 2, 2)), numpy.zeros((0, 2, 2))
+    
+    return numpy.concatenate(points), numpy.concatenate(x_bars), numpy.concatenate(y_bars)
+
+
+#worst fit line calculation
+def _separating_gradients(below: typing.List[typing.Tuple[float, float]], above: typing.List[typing.Tuple[float, float]]) -> typing.Tuple[bool, typing.Tuple[float, float], typing.Tuple[float, float]]:
+    """
+    Find the range of gradients of the lines that pass above (or through) all of the points in below and below (or through) all of the points in above.
+    A line can only separate the points if every pair of points (one from each list) can be separated, so the steepest line is the one through the pair
+    (point in below to the left of point in above) with the smallest gradient, and the shallowest is the one through the pair (point in above to the left of point in below)
+    with the largest gradient
+
+    Args:
+        below (list of (float, float)): the x and y coordinates of the points that must be on or below the line
+        above (list of (float, float)): the x and y coordinates of the points that must be on or above the line
+    
+    Returns:
+        (bool): whether any line separates the points
+        (float, float) or None: the gradient and intercept of the line with the smallest gradient, None if there is no limit
+        (float, float) or None: the gradient and intercept of the line with the largest gradient, None if there is no limit
+    """
+    #points with the same x coordinate can only be separated if the point in below isn't higher
+    highest_below = {}
+    for x, y in below:
+        if x not in highest_below or y > highest_below[x]:
+            highest_below[x] = y
+    
+    for x, y in above:
+        if x in highest_below and highest_below[x] > y:
+            return False, None, None
+
+    max_line = _min_slope_pair(below, above)
+
+    #the pair with the largest gradient is found by flipping the points vertically and finding the pair with the smallest gradient
+    min_line = _min_slope_pair([(x, 0 - y) for x, y in above], [(x, 0 - y) for x, y in below])
+    if min_line is not None:
+        min_line = (0 - min_line[0], 0 - min_line[1])
+
+    if min_line is not None and max_line is not None and min_line[0] > max_line[0]:
+        return False, None, None
+    
+    return True, min_line, max_line
+
+def _min_slope_pair(left: typing.List[typing.Tuple[float, float]], right: typing.List[typing.Tuple[float, float]]) -> typing.Tuple[float, float]:
+    """
+    Find the line with the smallest gradient that goes through a point in left and a point in right that is further to the right. Sweeps from left to right,
+    keeping the upper convex hull of the points in left that have been passed - the smallest gradient from any of these points to a point in right is from a point on this hull
+
+    Args:
+        left (list of (float, float)): the x and y coordinates of the points that the lines start from
+        right (list of (float, float)): the x and y coordinates of the points that the lines go to
+    
+    Returns:
+        (float, float): the gradient and intercept of the line
+        (None): there are no pairs where the point from right is further right
+    """
+    #sort all points by x coordinate. at the same x coordinate, points from right come first so that they aren't paired with points from left at the same x coordinate
+    events = [(x, 0, y) for x, y in right] + [(x, 1, y) for x, y in left]
+    events.sort()
+
+    hull: typing.List[typing.Tuple[float, float]] = [] #upper convex hull of the points from left that have been passed, from left to right
+    result = None
+    for x, is_left, y in events:
+        if is_left:
+            if len(hull) > 0 and hull[-1][0] == x: #only the highest point at an x coordinate can be on the upper hull (points are sorted by y, so this point is higher)
+                hull.pop()
+
+            while len(hull) > 1 and _cross_product(hull[-2], hull[-1], (x, y)) >= 0: #remove points that are no longer on the hull
+                hull.pop()
+
+            hull.append((x, y))
+        
+        elif len(hull) > 0:
+            #binary search for the point on the hull that the tangent from this point touches
+            #moving to the next point on the hull reduces the gradient until the tangent point is reached
+            low = 0
+            high = len(hull) - 1
+            while low < high:
+                middle = (low + high) // 2
+                if _cross_product(hull[middle], hull[middle + 1], (x, y)) < 0:
+                    low = middle + 1
+                else:
+                    high = middle
+            
+            point_x, point_y = hull[low]
+            gradient = (y - point_y) / (x - point_x)
+            if result is None or gradient < result[0]:
+                result = (gradient, point_y - (point_x * gradient))
+    
+    return result
+
+def _cross_product(origin: typing.Tuple[float, float], point_a: typing.Tuple[float, float], point_b: typing.Tuple[float, float]) -> float:
+    """
+    z component of the cross product of the vectors from origin to point_a and from origin to point_b. Positive if point_b is anticlockwise of point_a around origin
+    """
+    return ((point_a[0] - origin[0]) * (point_b[1] - origin[1])) - ((point_a[1] - origin[1]) * (point_b[0] - origin[0]))
@@ -0,0 +1,142 @@
+import unittest
+import tempfile
+import shutil
+import json
+import csv
+import io
+import contextlib
+import sys
+import os
+import sqlite3
+
+up1 = os.path.abspath('../')
+sys.path.insert(0, up1)
+
+import sciplot.batch as batch #pylint: disable=import-error
+import sciplot.datafile as datafile #pylint: disable=import-error
+from sciplot.database import Query #pylint: disable=import-error
+
+sys.path.pop(0)
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._path = os.path.join(self._directory, 'experiment.db')
+
+        #x = 1..5 (0.1 absolute uncertainty), y = 2x + c
+        with datafile.DataFile(self._path) as df:
+            df.initialise_tables()
+            metre = df.create_unit('m', [(2, 1)])
+
+            x_data_set = df.create_data_set(0.1, False, metre)
+            df.create_data_points([1, 2, 3, 4, 5], x_data_set)
+            x_id = df.create_variable('x', 0, x_data_set)[0]
+
+            df.create_constant('c', 3, metre)
+            y_id = df.create_variable('y', 1, df.create_formula('{x} * 2 + {c}'))[0]
+
+            table_id = df.create_table('Results')
+            df.create_table_column(table_id, x_id, '0.0')
+            df.create_table_column(table_id, y_id, '0.0')
+            df.create_table('Empty')
+
+            self._plot_id = df.create_plot(x_id, 'x', y_id, 'y')
+            df.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def test_process_file(self):
+        result = batch.process_file(self._path)
+        self.assertEqual([table["title"] for table in result["tables"]], ['Results', 'Empty'])
+
+        columns = result["tables"][0]["columns"]
+        self.assertEqual([column["symbol"] for column in columns], ['x', 'y'])
+        self.assertEqual(columns[0]["units"], 'm')
+        self.assertEqual(columns[0]["values"], [1, 2, 3, 4, 5])
+        self.assertEqual(columns[0]["uncertainties"], [0.1] * 5)
+        self.assertEqual(columns[1]["values"], [5, 7, 9, 11, 13])
+
+        plot = result["plots"][0]
+        self.assertEqual(plot["points"], 5)
+        self.assertAlmostEqual(plot["best gradient"], 2)
+        self.assertAlmostEqual(plot["best intercept"], 3)
+        self.assertGreater(plot["worst max gradient"], plot["worst min gradient"])
+
+    def test_process_file_read_only(self): #the datafile isn't written to, even if it is missing indexes (as files from before they were added are)
+        with datafile.DataFile(self._path) as df:
+            for name, in df.query(Query('SELECT name FROM sqlite_master WHERE type = "index" AND name NOT LIKE "sqlite_%"', [], 1))[0]:
+                df.query(Query('DROP INDEX "{}"'.format(name), [], 0))
+            df.commit()
+        
+        #another connection holds the write lock, as writing to a read-only file would fail
+        connection = sqlite3.connect(self._path)
+        try:
+            connection.execute('BEGIN IMMEDIATE;')
+            self.assertEqual(len(batch.process_file(self._path)["tables"]), 2)
+        finally:
+            connection.close()
+
+    def test_selection(self):
+        result = batch.process_file(self._path, table_titles = ['Empty'])
+        self.assertEqual([table["title"] for table in result["tables"]], ['Empty'])
+        self.assertEqual(result["plots"], [])
+
+        result = batch.process_file(self._path, plot_ids = [self._plot_id])
+        self.assertEqual(result["tables"], [])
+        self.assertEqual(len(result["plots"]), 1)
+
+        with self.assertRaises(KeyError):
+            batch.process_file(self._path, table_titles = ['Missing'])
+
+    def test_missing_file(self):
+        path = os.path.join(self._directory, 'missing.db')
+        with self.assertRaises(FileNotFoundError):
+            batch.process_file(path)
+
+        self.assertFalse(os.path.exists(path)) #the datafile isn't created
+
+    def test_main_json(self):
+        output = os.path.join(self._directory, 'output')
+        self.assertEqual(batch.main([self._path, '-o', output]), 0)
+
+        with open(os.path.join(output, 'experiment.json')) as file:
+            self.assertEqual(json.load(file), batch.process_file(self._path))
+
+    def test_json_non_finite(self): #NaN and infinity aren't valid JSON
+        result = {"file": self._path, "tables": [{"title": "Results", "columns": [{"values": [1.0, float('nan'), float('inf')]}]}], "plots": [{"best gradient": float('-inf')}]}
+        batch.write_json(result, self._directory)
+
+        with open(os.path.join(self._directory, 'experiment.json')) as file:
+            written = json.load(file, parse_constant = lambda constant: self.fail('{} written'.format(constant)))
+        self.assertEqual(written["tables"][0]["columns"][0]["values"], [1.0, None, None])
+        self.assertIsNone(written["plots"][0]["best gradient"])
+
+    def test_main_csv(self):
+        output = os.path.join(self._directory, 'output')
+        self.assertEqual(batch.main([self._path, '-f', 'csv', '-o', output]), 0)
+
+        with open(os.path.join(output, 'experiment.Results.csv'), newline = '') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], ['x (m)', 'x uncertainty', 'y (m)', 'y uncertainty'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(float(rows[1][2]), 5)
+
+        with open(os.path.join(output, 'experiment.plots.csv'), newline = '') as file:
+            plots = list(csv.DictReader(file))
+        self.assertAlmostEqual(float(plots[0]["best gradient"]), 2)
+
+    def test_main_processes(self): #files are evaluated in a process pool, results are written in the order they were given and failed files are reported without stopping the others
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            status = batch.main([self._path, os.path.join(self._directory, 'missing.db'), self._path, '-j', '2'])
+
+        self.assertEqual(status, 1)
+        self.assertEqual([json.loads(line)["file"] for line in stdout.getvalue().splitlines()], [self._path, self._path])
+        self.assertIn('FileNotFoundError', stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import threading
+import queue
+import sys
+import os
+
+up1 = os.path.abspath('../')
+sys.path.insert(0, up1)
+
+import sciplot.compute as compute #pylint: disable=import-error
+
+sys.path.pop(0)
+
+
+class TestComputeWorker(unittest.TestCase):
+    def test_result(self):
+        results = queue.Queue()
+        with compute.ComputeWorker() as worker:
+            worker.submit('key', lambda task: 1 + 1, results.put)
+            self.assertEqual(results.get(timeout = 5), 2)
+
+    def test_error(self):
+        errors = queue.Queue()
+        with compute.ComputeWorker() as worker:
+            worker.submit('key', lambda task: 1 / 0, None, errors.put)
+            self.assertIsInstance(errors.get(timeout = 5), ZeroDivisionError)
+
+    def test_superseded(self):
+        started = threading.Event()
+        release = threading.Event()
+        results = queue.Queue()
+
+        def slow(task):
+            started.set()
+            release.wait(5)
+            task.report_progress(1, 2) #stops the computation once it has been replaced
+            return 'old'
+
+        with compute.ComputeWorker() as worker:
+            first = worker.submit('key', slow, results.put)
+            started.wait(5)
+            waiting = worker.submit('key', lambda task: 'waiting', results.put) #replaced before it starts
+            worker.submit('key', lambda task: 'new', results.put)
+            other = worker.submit('other key', lambda task: 'other', results.put) #different key, so it isn't replaced
+            release.set()
+
+            self.assertEqual(results.get(timeout = 5), 'new')
+            self.assertEqual(results.get(timeout = 5), 'other')
+            self.assertTrue(first.cancelled)
+            self.assertTrue(waiting.cancelled)
+            self.assertFalse(other.cancelled)
+
+    def test_progress(self):
+        progress = []
+        results = queue.Queue()
+
+        def counter(task):
+            for i in range(3):
+                task.report_progress(i + 1, 3)
+            return 'done'
+
+        with compute.ComputeWorker() as worker:
+            worker.submit('key', counter, results.put, on_progress = lambda done, total: progress.append((done, total)))
+            self.assertEqual(results.get(timeout = 5), 'done')
+
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+
+    def test_dispatch(self): #callbacks are passed through dispatch (e.g. wx.CallAfter) instead of being called on the worker thread
+        callbacks = queue.Queue()
+        with compute.ComputeWorker(lambda callback, *args: callbacks.put((callback, args))) as worker:
+            worker.submit('key', lambda task: 'result', lambda result: None)
+            callback, args = callbacks.get(timeout = 5)
+            self.assertEqual(args[1:], ('result',))
+
+    def test_closed(self):
+        worker = compute.ComputeWorker()
+        worker.close()
+        with self.assertRaises(RuntimeError):
+            worker.submit('key', lambda task: None, lambda result: None)
+
+
+if __name__ == '__main__':
+    unittest.main()
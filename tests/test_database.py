@@ -1,6 +1,9 @@
 import unittest
 import sys
 import os
+import shutil
+import sqlite3
+import tempfile
 
 up1 = os.path.abspath('../')
 sys.path.insert(0, up1)
@@ -75,6 +78,172 @@ class TestDatabase(unittest.TestCase):
             
             except database.sqlite3.OperationalError:
                 pass #appropriate error raised, test passed
+            
+            #the database should still work after a bad query
+            self.assertEqual(db.query(database.Query("SELECT * FROM TestTable WHERE TestTableID = 1", [], 2)), [(1, 1, "Hello")])
+    
+    def test_bad_query_without_response(self): #the rollback after a failure undoes uncommitted changes, so the caller has to be told even if it doesn't expect a response
+        with self.create_db() as db:
+            db.query(database.Query('INSERT INTO TestTable ("Value", "String") VALUES (55, "Hello World!");', [], 0))
+
+            with self.assertRaises(database.sqlite3.OperationalError):
+                db.query(database.Query('INSERT INTO InvalidTableName VALUES (1);', [], 0))
+    
+    def test_iter_query(self):
+        with self.create_db() as db:
+            rows = db.iter_query(database.Query("SELECT * FROM TestTable WHERE Value = 1", [], 0), 1)
+            self.assertEqual(next(rows), (1, 1, "Hello"))
+            self.assertEqual(db.query(database.Query("SELECT * FROM TestTable WHERE TestTableID = 2", [], 2)), [(2, 1, "World")]) #other queries can run while streaming
+            self.assertEqual(list(rows), [(2, 1, "World")])
+
+            for batch_size in [1, 2, 3, 1000]:
+                self.assertEqual(list(db.iter_query(database.Query("SELECT * FROM TestTable WHERE Value = 1", [], 0), batch_size)), [(1, 1, "Hello"), (2, 1, "World")])
+    
+    def test_iter_query_abandoned(self):
+        with self.create_db() as db:
+            rows = db.iter_query(database.Query("SELECT * FROM TestTable", [], 0), 1)
+            next(rows)
+            rows.close() #closes the cursor on the database thread
+
+            self.assertEqual(db.query(database.Query("SELECT * FROM TestTable WHERE TestTableID = 1", [], 2)), [(1, 1, "Hello")])
+    
+    def test_query_async(self):
+        with self.create_db() as db:
+            future_many = db.query_async(database.Query("SELECT * FROM TestTable WHERE Value = 1", [], 1))
+            future_one = db.query_async(database.Query("SELECT * FROM TestTable WHERE TestTableID = 1", [], 2))
+            future_none = db.query_async(database.Query("SELECT * FROM TestTable", [], 0))
+
+            self.assertEqual(future_one.result(), [(1, 1, "Hello")])
+            self.assertEqual(future_many.result(), [[(1, 1, "Hello"), (2, 1, "World")]])
+            self.assertEqual(future_none.result(), [])
+    
+    def test_concurrent_queries(self):
+        with self.create_db() as db:
+            results = {}
+            def query_from_thread(thread_id):
+                results[thread_id] = [db.query(database.Query("SELECT String FROM TestTable WHERE TestTableID = (?)", [(i % 2) + 1], 2)) for i in range(20)]
+
+            threads = [database.threading.Thread(target = query_from_thread, args = [i]) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            
+            for i in range(8):
+                self.assertEqual(results[i], [[("Hello",)], [("World",)]] * 10)
+    
+    def test_closed(self):
+        db = self.create_db()
+        db.close()
+        with self.assertRaises(RuntimeError):
+            db.query(database.Query("SELECT * FROM TestTable", [], 1))
+
+
+class TestReadConnections(unittest.TestCase):
+    def setUp(self): #WAL mode is stored in the file, so use a copy of the test database
+        path = ''
+        for path_to_test in [
+            os.path.join(sys.path[0], 'datasets', 'database.db'),
+            os.path.join(sys.path[0], 'tests', 'datasets', 'database.db')
+        ]:
+            if os.path.isfile(path_to_test):
+                path = path_to_test
+        
+        if path == '':
+            raise IOError("No valid path")
+        
+        self._directory = tempfile.mkdtemp()
+        self._path = os.path.join(self._directory, 'database.db')
+        shutil.copyfile(path, self._path)
+    
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+    
+    def test_read(self):
+        with database.Database(self._path, 2) as db:
+            self.assertEqual(db.query(database.Query("SELECT * FROM TestTable WHERE Value = 1", [], 1)), [[(1, 1, "Hello"), (2, 1, "World")]])
+            self.assertEqual(db.query(database.Query("PRAGMA journal_mode;", [], 2)), [("wal",)])
+    
+    def test_uncommitted_writes_visible(self):
+        with database.Database(self._path, 2) as db:
+            db.query(database.Query('INSERT INTO TestTable ("Value", "String") VALUES (55, "Hello World!");', [], 0))
+            self.assertEqual(db.query(database.Query('SELECT "Value", "String" FROM TestTable WHERE "Value" = 55;', [], 1)), [[(55, "Hello World!")]])
+
+            db.commit()
+            self.assertEqual(db.query(database.Query('SELECT "Value", "String" FROM TestTable WHERE "Value" = 55;', [], 1)), [[(55, "Hello World!")]])
+
+            db.query(database.Query('DELETE FROM TestTable WHERE "Value" = 55;', [], 0))
+            self.assertEqual(db.query(database.Query('SELECT "Value", "String" FROM TestTable WHERE "Value" = 55;', [], 1)), [[]])
+
+            db.query([database.Query('ROLLBACK;', [], 0), database.Query('BEGIN;', [], 0)])
+            self.assertEqual(db.query(database.Query('SELECT "Value", "String" FROM TestTable WHERE "Value" = 55;', [], 1)), [[(55, "Hello World!")]])
+    
+    def test_rollback_to_savepoint(self): #rolling back to a savepoint keeps the transaction open, so earlier writes are still uncommitted
+        with database.Database(self._path, 2) as db:
+            db.query([database.Query('INSERT INTO TestTable ("Value", "String") VALUES (55, "Hello World!");', [], 0),
+                      database.Query('SAVEPOINT sp;', [], 0),
+                      database.Query('ROLLBACK TO sp;', [], 0)])
+            self.assertEqual(db.query(database.Query('SELECT "Value", "String" FROM TestTable WHERE "Value" = 55;', [], 1)), [[(55, "Hello World!")]])
+    
+    def test_path_needs_quoting(self): #read connections open the file through a URI
+        path = os.path.join(self._directory, 'data base #1.db')
+        shutil.copyfile(self._path, path)
+        with database.Database(path, 2) as db:
+            self.assertEqual(db.query(database.Query("SELECT * FROM TestTable WHERE TestTableID = 1", [], 2)), [(1, 1, "Hello")])
+    
+    def test_memory_read_connections(self): #in-memory databases can't be opened by the read connections
+        with self.assertRaises(sqlite3.OperationalError):
+            database.Database(':memory:', 1)
+
+    def test_read_only(self):
+        with database.Database(self._path, read_only = True) as db:
+            self.assertEqual(db.query(database.Query('SELECT 1', [], 2)), [(1,)])
+            with self.assertRaises(sqlite3.OperationalError):
+                db.query(database.Query('CREATE TABLE ReadOnly (Value INTEGER)', [], 0))
+        
+        path = os.path.join(os.path.dirname(self._path), 'missing.db')
+        with self.assertRaises(sqlite3.OperationalError):
+            database.Database(path, read_only = True)
+        self.assertFalse(os.path.exists(path))
+
+    def test_concurrent_reads(self):
+        with database.Database(self._path, 4) as db:
+            futures = [db.query_async(database.Query("SELECT String FROM TestTable WHERE TestTableID = (?)", [(i % 2) + 1], 2)) for i in range(100)]
+            self.assertEqual([future.result() for future in futures], [[("Hello",)], [("World",)]] * 50)
+    
+    def test_bad_read(self):
+        with database.Database(self._path, 2) as db:
+            with self.assertRaises(database.sqlite3.OperationalError):
+                db.query(database.Query('SELECT BadColumn FROM InvalidTableName', [], 1))
+
+
+class TestDataFileStructure(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._path = os.path.join(self._directory, 'datafile.db')
+    
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+    
+    def list_indexes(self, df):
+        return set([tup[0] for tup in df.query(database.Query('SELECT name FROM sqlite_master WHERE type = "index" AND name NOT LIKE "sqlite_%"', [], 1))[0]])
+    
+    def test_initialise(self):
+        with datafile.DataFile(self._path) as df:
+            df.initialise_tables()
+            self.assertTrue(df.tables_are_valid())
+            self.assertIn('DataPointDataSetID', self.list_indexes(df))
+    
+    def test_add_indexes_to_old_file(self):
+        with datafile.DataFile(self._path) as df:
+            df.initialise_tables()
+            for name in self.list_indexes(df): #make the file look like one from before indexes were added
+                df.query(database.Query('DROP INDEX "{}"'.format(name), [], 0))
+            df.commit()
+        
+        with datafile.DataFile(self._path) as df:
+            self.assertTrue(df.tables_are_valid())
+            self.assertEqual(self.list_indexes(df), set(['DataPointDataSetID', 'VariableSymbol', 'VariableTypeID', 'UnitCompositeDetailsUnitCompositeID', 'TableColumnTableID']))
 
 
 class TestDataFile(unittest.TestCase):
@@ -122,11 +291,33 @@ class TestDataFile(unittest.TestCase):
         with self.connect_datafile() as df:
             self.assertEqual(df.get_unit_by_id(1), ('N', [(1, -2.0), (2, 1.0), (3, 1.0)]))
     
+    def test_unit_registry_changed_while_loading(self): #e.g. a unit changed by the UI thread while a load on the compute worker is looking up units
+        with self.connect_datafile() as df:
+            query = df.query
+            def query_and_change_units(q):
+                result = query(q)
+                df.query = query
+                df._invalidate_unit_registry()
+                return result
+
+            df.query = query_and_change_units
+            self.assertEqual(df.get_base_unit(1), 's') #the registry that was being loaded is still used for this lookup
+            self.assertIsNone(df._unit_registry) #but it isn't kept, as the units might have changed
+    
     def test_create_unit(self):
         with self.connect_datafile() as df:
             self.assertEqual(df.get_unit_by_id(df.create_unit('test unit', [(1, -1), (2, 1)])), ('test unit', [(1, -1.0), (2, 1.0)]))
             df.goto_rollback()
     
+    def test_update_units(self): #reports whether anything changed, so that results using the units are only recalculated if they did
+        with self.connect_datafile() as df:
+            unit_id = df.create_unit('test unit', [(1, -1)])
+            data_set_id = df.create_data_set(0, False, unit_id)
+            self.assertFalse(df.update_units('DataSet', data_set_id, 'test unit', [(1, -1)]))
+            self.assertTrue(df.update_units('DataSet', data_set_id, 'test unit', [(1, -1), (2, 1)]))
+            self.assertTrue(df.update_units('DataSet', data_set_id, 'renamed unit', [(1, -1), (2, 1)]))
+            df.goto_rollback()
+    
     def test_list_units(self):
         with self.connect_datafile() as df:
             self.assertEqual(df.list_units(), [1, 2, 3, 4, 5, 6])
@@ -177,6 +368,14 @@ class TestDataFile(unittest.TestCase):
             self.assertEqual(df.get_data_points(1), [(i, 1.217) for i in range(1, 26, 1)] + [(primary_key, 12.345)])
             df.goto_rollback()
     
+    def test_create_data_points(self):
+        with self.connect_datafile() as df:
+            primary_keys = df.create_data_points((i / 10 for i in range(1000)), 1)
+            self.assertEqual(len(primary_keys), 1000)
+            self.assertEqual(df.get_data_points(1), [(i, 1.217) for i in range(1, 26, 1)] + [(primary_keys[i], i / 10) for i in range(1000)])
+            self.assertEqual(df.create_data_points([], 1), range(primary_keys[-1] + 1, primary_keys[-1] + 1))
+            df.goto_rollback()
+    
     def test_get_data_point(self):
         with self.connect_datafile() as df:
             self.assertEqual(df.get_data_point(1), (1, 1.217))
@@ -261,6 +460,22 @@ class TestDataFile(unittest.TestCase):
         with self.connect_datafile() as db:
             self.assertEqual(db.get_unit_id_by_table([(1, -2), (2, 1), (3, 1)]), [1])
     
+    def test_unit_cache(self):
+        with self.connect_datafile() as db:
+            self.assertEqual(db.get_unit_id_by_table([(1, 2)]), [])
+
+            primary_key = db.create_unit('test unit', [(1, 2)])
+            self.assertEqual(db.get_unit_id_by_table([(1, 2)]), [primary_key])
+            self.assertEqual(db.get_unit_by_id(primary_key), ('test unit', [(1, 2.0)]))
+
+            db.update_unit(primary_key, [(2, 1)])
+            self.assertEqual(db.get_unit_id_by_table([(1, 2)]), [])
+            self.assertEqual(db.get_unit_by_id(primary_key), ('test unit', [(2, 1.0)]))
+
+            db.goto_rollback()
+            self.assertEqual(db.get_unit_id_by_table([(2, 1)]), [4])
+            self.assertNotIn(primary_key, db.list_units())
+    
     def test_renameunit(self):
         with self.connect_datafile() as db:
             db.create_rollback()
@@ -1,4 +1,6 @@
 import unittest
+import tempfile
+import shutil
 import sys
 import os
 
@@ -8,6 +10,7 @@ sys.path.insert(0, up1)
 import sciplot.datatable
 import sciplot.datafile
 import sciplot.functions
+import sciplot.database
 
 sys.path.pop(0)
 
@@ -36,5 +39,114 @@ class TestDatatable(unittest.TestCase):
             datatable.set_variables([2, 4])
             datatable.load(self.generic_datatable)
     
+    def test_load_formula_chain(self):
+        with self.create_datafile() as datafile:
+            datatable = self.create_datatable(datafile)
+            datatable.set_variables([3, 1, 4]) #strain depends on deltaL, which depends on l0 (also a column)
+            datatable.load(self.generic_datatable)
+
+            for strain, delta_l, l0 in datatable.as_rows():
+                self.assertAlmostEqual(strain.value, delta_l.value / l0.value)
+    
+    def test_load_data_set_units(self):
+        with self.create_datafile() as datafile:
+            datatable = self.create_datatable(datafile)
+            datatable.set_variables([5]) #l1
+            datatable.load(self.generic_datatable)
+
+            column = datatable.as_columns()[0]
+            self.assertIsInstance(column, sciplot.ValueColumn)
+            self.assertEqual(len(column), 25)
+            self.assertEqual(len(column.uncertainty), 1) #the data set's uncertainty is only stored once
+            self.assertEqual(column[0].units, datafile.get_unit_by_id(4)[1])
+            for value in column: #the units are only looked up once for the data set
+                self.assertIs(value.units, column[0].units)
+    
+    def test_change_tracker(self):
+        with self.create_datafile() as datafile:
+            change_tracker = sciplot.datatable.ChangeTracker()
+            datatable = sciplot.datatable.Datatable(datafile, change_tracker)
+            datatable.set_variables([1, 7]) #deltaL depends on l0 and l1, F depends on m
+            datatable.load(self.generic_datatable)
+            delta_l_before, force_before = datatable.as_columns()
+
+            datafile.query(sciplot.database.Query("UPDATE DataPoint SET Value = Value + 1 WHERE DataSetID = 2;", [], 0)) #change l1 (not committed)
+            change_tracker.data_set_changed('l1')
+
+            datatable = sciplot.datatable.Datatable(datafile, change_tracker)
+            datatable.set_variables([1, 7])
+            datatable.load(self.generic_datatable)
+            delta_l_after, force_after = datatable.as_columns()
+
+            self.assertIs(force_before, force_after) #not downstream of the change, so it wasn't evaluated again
+            for before, after in zip(delta_l_before, delta_l_after):
+                self.assertAlmostEqual(after.value, before.value + 1)
+            
+            #constants are compared automatically
+            constants = self.generic_datatable.copy()
+            constants['g'] = sciplot.functions.Value(10, 0.01, False, [(1, 1), (2, 1), (3, -2)])
+            datatable.load(constants)
+            self.assertIsNot(datatable.as_columns()[1], force_after)
+            self.assertIs(datatable.as_columns()[0], delta_l_after)
+    
+    def test_load_progress(self):
+        with self.create_datafile() as datafile:
+            change_tracker = sciplot.datatable.ChangeTracker()
+            datatable = sciplot.datatable.Datatable(datafile, change_tracker)
+            datatable.set_variables([1, 7])
+
+            progress = []
+            datatable.load(self.generic_datatable, lambda done, total: progress.append((done, total)))
+            self.assertEqual(progress, [(i + 1, len(progress)) for i in range(len(progress))])
+            self.assertGreater(len(progress), 2)
+            self.assertIsNotNone(change_tracker.get_value('deltaL'))
+
+            #results that were thrown away during a load (e.g. by the UI thread while the load ran in the background) aren't stored by it
+            def interrupt(done, total):
+                if done == 1:
+                    change_tracker.invalidate_all()
+
+            datatable.load(self.generic_datatable, interrupt)
+            self.assertIsNone(change_tracker.get_value('deltaL'))
+
+            #a load can be stopped by its progress callback
+            def stop(done, total):
+                raise InterruptedError()
+
+            with self.assertRaises(InterruptedError):
+                datatable.load(self.generic_datatable, stop)
+    
+    def test_load_graph_attributes(self): #the x error bars all overlap, so the worst fit lines have no limit
+        directory = tempfile.mkdtemp()
+        try:
+            with sciplot.datafile.DataFile(os.path.join(directory, 'worst.db')) as datafile:
+                datafile.initialise_tables()
+                x_data_set = datafile.create_data_set(2, False, datafile.create_unit('m', [(2, 1)]))
+                datafile.create_data_points([1, 2, 3], x_data_set)
+                datafile.create_variable('x', 0, x_data_set)
+                datafile.create_variable('y', 1, datafile.create_formula('{x} * 2'))
+
+                for fit_line in ['WORST', 'WORSTMAX', 'WORSTMIN']:
+                    variable_id = datafile.create_variable(fit_line.lower(), 1, datafile.create_formula('{' + fit_line + '.GRADIENT.y-x}'))[0]
+                    datatable = self.create_datatable(datafile)
+                    datatable.set_variables([variable_id])
+                    with self.assertRaisesRegex(ValueError, 'No {} fit line exists'.format(fit_line.lower())):
+                        datatable.load(self.generic_datatable)
+                
+                datatable = self.create_datatable(datafile)
+                datatable.set_variables([datafile.create_variable('best', 1, datafile.create_formula('{BEST.GRADIENT.y-x}'))[0]])
+                datatable.load(self.generic_datatable)
+                self.assertAlmostEqual(datatable.as_rows()[0][0].value, 2)
+                self.assertEqual(datatable.as_rows()[0][0].units, [(2, 0)]) #m / m
+
+                datatable = self.create_datatable(datafile)
+                datatable.set_variables([datafile.create_variable('intercept', 1, datafile.create_formula('{BEST.INTERCEPT.y-x}'))[0]])
+                datatable.load(self.generic_datatable)
+                self.assertAlmostEqual(datatable.as_rows()[0][0].value, 0)
+                self.assertEqual(datatable.as_rows()[0][0].units, [(2, 1)]) #m
+        
+        finally:
+            shutil.rmtree(directory)
+    
     generic_datatable = {'pi': sciplot.functions.Value(3.14159265359, 0.00, False, []),
                          'g': sciplot.functions.Value(9.81, 0.01, False, [(1, 1), (2, 1), (3, -2)])}
\ No newline at end of file
@@ -3,11 +3,13 @@ import math
 import sys
 import os
 
+import numpy
+
 up1 = os.path.abspath('../')
 sys.path.insert(0, up1)
 
 import sciplot.functions as functions #pylint: disable=import-error
-from sciplot import Value
+from sciplot import Value, ValueColumn, get_formatter
 
 sys.path.pop(0)
 
@@ -42,7 +44,27 @@ class TestFunction(unittest.TestCase):
     def test_bidmas(self):
         self.asserter('3-5*3', 3 - (5 * 3))
         self.asserter('(3-5)*3', (3 - 5) * 3)
-    
+
+    def test_associativity(self):
+        self.asserter('10-4+3', 10 - (4 + 3))
+        self.asserter('2^3^2', 2 ** (3 ** 2))
+
+    def test_adjacent_operands(self):
+        self.asserter('2*sin0', 0)
+        self.asserter('(1)+(2)', 1 + 2)
+        self.asserter('-3', -3)
+
+    def test_function_signed_operand(self): #an operator straight after a function starts the function's operand
+        self.asserter('sin-{x}', math.sin(0 - 0.5), args = {'x': Value(0.5)})
+        self.asserter('cos-{theta}*2', math.cos(0 - 0.5) * 2, args = {'theta': Value(0.5)})
+        self.asserter('3ln-{x}', 3 * math.log(0 - -2), args = {'x': Value(-2)})
+        self.asserter('2sin-1', 2 * math.sin(-1))
+        self.asserter('2arcsin+0', 0)
+        self.asserter('sin-2sin{x}', math.sin(0 - 2 * math.sin(0.5)), args = {'x': Value(0.5)})
+
+        with self.assertRaises(ValueError): #operators without a default left operand still need one
+            functions.Function('sin*2')
+
     def test_indices(self):
         self.asserter('4^2', 4 * 4)
         self.asserter('4^0.5', 2)
@@ -68,13 +90,12 @@ class TestFunction(unittest.TestCase):
         datatable = self.convert_datatable({'k': 50})
         datatable.update(constants)
         default = functions.Function(expr)
-        optimised = functions.Function(expr)
-        optimised.pre_evaluate(constants)
+        optimised = functions.Function(expr).pre_evaluate(constants)
         self.assertEqual(default.evaluate(datatable).value, optimised.evaluate(datatable).value)
     
     def test_pre_eval_reduces_complexity(self):
         exprs = [('1 + (3 * 2 * {g}) + {k}', True),
-                 ('1+1', False),
+                 ('1+1', True),
                  ('{g}', False)]
         
         for expr, notequal in exprs:
@@ -86,13 +107,118 @@ class TestFunction(unittest.TestCase):
                 self.assertEqual(before, after)
 
     
+    def test_pre_eval_leaves_cached_tree(self):
+        constants = self.convert_datatable({'g': 9.81})
+        before = functions.Function('2 * {g} + {k}').num_nodes()
+        functions.Function('2 * {g} + {k}').pre_evaluate(constants)
+        self.assertEqual(functions.Function('2 * {g} + {k}').num_nodes(), before)
+    
+    def test_simplify_keeps_result(self):
+        datatable = {'x': Value(3, 0.1, False, [(1, 1)]), 'y': Value(0.5, 0.02, True, [(2, 1)])}
+        for expr in ['2*{x}*3', '2*{x}*{y}*0.5', '1 + {x} + 2', '({x}*{y})*1', '({x}*{y})^1', '({x}/{y})/1', '({x}+{y})-0', '{x}*1', '{x}^1', 'sin{y} + ln{x}', 'abs({x} - 4)', '3sin{y}']:
+            default = functions.Function(expr)
+            simplified = functions.Function(expr).simplify()
+
+            expected = default.evaluate(datatable)
+            result = simplified.evaluate(datatable)
+            self.assertAlmostEqual(result.value, expected.value)
+            self.assertAlmostEqual(result.absolute_uncertainty, expected.absolute_uncertainty)
+            self.assertEqual(sorted(result.units), sorted(expected.units))
+
+            column_result = simplified.evaluate_columns({'x': [datatable['x']], 'y': [datatable['y']]})[0]
+            self.assertAlmostEqual(column_result.value, expected.value)
+            self.assertAlmostEqual(column_result.absolute_uncertainty, expected.absolute_uncertainty)
+
+    def test_simplify_reduces_complexity(self):
+        for expr, after in [('2*{x}*3', 4), ('1 + {x} + 2', 4), ('sin{x}', 3), ('ln({x}*{y}) * 1', 5), ('({x}*{y})^1', 4),
+                            ('{x}*1', 4), ('{x}^1', 4), ('{x} + {g} + {g}', 6)]: #variables might not have percentage uncertainties, and constants with units can't be moved in additions
+            self.assertEqual(functions.Function(expr).simplify().num_nodes(), after)
+
+        constants = {'g': Value(9.81, 0.01, False, [(1, 1)])}
+        self.assertEqual(functions.Function('{g} + {x} + {g}').pre_evaluate(constants).num_nodes(), 6)
+        self.assertEqual(functions.Function('2 * {g} * {x} * 3').pre_evaluate(constants).num_nodes(), 4)
+
+    def test_parse_cache(self):
+        functions.clear_parse_cache()
+        functions.Function('{a} + 2')
+        functions.Function('{a} + 2')
+        info = functions.parse_cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 1)
+    
+    def test_compile_matches_evaluate(self):
+        for expr in ['{g} + {mass}', '({g} * {mass}) / {volume}', '{g}^2 - 3', '2sin{g}', 'abs({mass} - 30)', 'ln{volume}']:
+            tree = functions.Function(expr)._subfuncs[0]
+            expected = tree.evaluate(self.generic_datatable)
+            result = tree.compile()(self.generic_datatable)
+
+            self.assertEqual(result.value, expected.value)
+            self.assertEqual(result.absolute_uncertainty, expected.absolute_uncertainty)
+            self.assertEqual(sorted(result.units), sorted(expected.units))
+
+    def test_compile_units_follow_inputs(self):
+        compiled = functions.Function('{a} * {b}').compile()
+        self.assertEqual(sorted(compiled({'a': Value(1, units = [(1, 1)]), 'b': Value(2, units = [(2, 1)])}).units), [(1, 1), (2, 1)])
+        self.assertEqual(compiled({'a': Value(1, units = [(1, 1)]), 'b': Value(2, units = [(1, -1)])}).units, [])
+
+    def test_units_shared(self):
+        function = functions.Function('{a} * {b} / {c}')
+        first = function.evaluate({'a': Value(1, units = [(1, 1)]), 'b': Value(2, units = [(2, 2)]), 'c': Value(3, units = [(1, 1), (3, 1)])})
+        second = function.evaluate({'a': Value(4, units = [(1, 1)]), 'b': Value(5, units = [(2, 2)]), 'c': Value(6, units = [(1, 1), (3, 1)])})
+
+        self.assertEqual(sorted(first.units), [(2, 2), (3, -1)])
+        self.assertIs(first.units, second.units) #equal unit tables only have their product worked out once
+
+    def test_evaluate_columns_matches_evaluate(self):
+        columns = {'x': [Value(i / 4, 0.1, False, [(1, 1)]) for i in range(1, 9)],
+                   'y': [Value(i, 0.05, True, [(2, 1)]) for i in range(8, 0, -1)],
+                   'g': self.generic_datatable['g']}
+
+        for expr in ['{x} + {y}', '({x} * {g}) / {y}', '{x}^2 - {y}', '2sin{x}', 'abs({y} - 4)', 'ln{y}', 'arcsin({x} / 2)', '3']:
+            func = functions.Function(expr)
+            results = func.evaluate_columns(columns)
+            self.assertEqual(len(results), 1 if expr == '3' else 8)
+
+            for i in range(len(results)):
+                expected = func.evaluate({key: value[i] if type(value) == list else value for key, value in columns.items()})
+                self.assertAlmostEqual(results[i].value, expected.value)
+                self.assertAlmostEqual(results[i].absolute_uncertainty, expected.absolute_uncertainty)
+                self.assertEqual(sorted(results[i].units), sorted(expected.units))
+
+    def test_evaluate_columns_domain_error(self):
+        try:
+            functions.Function('ln{x}').evaluate_columns({'x': [Value(1), Value(0)]})
+            raise Exception('An exception wasn\'t thrown when it should\'ve been')
+        except ValueError: #appropriate exception was thrown
+            pass
+
+    def test_subexpression_cache(self):
+        columns = {'x': [Value(i, 0.1, False, [(1, 1)]) for i in range(1, 9)],
+                   'theta': [Value(i / 10, 0.01, False) for i in range(8)]}
+        cache = functions.SubexpressionCache()
+
+        first = functions.Function('{x}^2 + sin{theta}')
+        second = functions.Function('(sin{theta}) * {x}^2')
+        first_results = first.evaluate_columns(columns, cache)
+        second_results = second.evaluate_columns(columns, cache)
+        self.assertEqual(cache.hits, 2) #{x}^2 and sin{theta} are only evaluated once
+
+        for function, results in [(first, first_results), (second, second_results)]:
+            expected = function.evaluate_columns(columns)
+            self.assertEqual(results.value.tolist(), expected.value.tolist())
+            self.assertEqual(results.absolute_uncertainty.tolist(), expected.absolute_uncertainty.tolist())
+            self.assertEqual(results.units, expected.units)
+        
+        #different constants and variables are different branches
+        self.assertNotEqual(cache.key(functions.Function('{x}^2')._subfuncs[0]), cache.key(functions.Function('{x}^3')._subfuncs[0]))
+        self.assertNotEqual(cache.key(functions.Function('{x}^2')._subfuncs[0]), cache.key(functions.Function('{theta}^2')._subfuncs[0]))
+
     def compare_complexities(self, expr):
         constants = self.convert_datatable({'g': 9.81})
         datatable = self.convert_datatable({'k': 50})
         datatable.update(constants)
         default = functions.Function(expr)
-        optimised = functions.Function(expr)
-        optimised.pre_evaluate(constants)
+        optimised = functions.Function(expr).pre_evaluate(constants)
 
         return default.num_nodes(), optimised.num_nodes()
     
@@ -313,6 +439,48 @@ class TestVariable(unittest.TestCase):
         self.assertEqual(self.format_scientific(1.217, 0.01), ('1.22', '0', '0.01'))
         self.assertEqual(self.format_scientific(1.217, 0.001), ('1.217', '0', '0.001'))
 
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Value(1).unknown_attribute = 1
+    
+    def test_formatter(self):
+        values = [0.0002579, 1234.0, 0.05, 25.0, 17.52, 0.0009999999999998899, 0.980665, 253.0, 1.217, 2.5]
+        for formatstring in ['00#', '0#', '*.*', '*.0', '000.0', '*0.0*', '0.*', '0.0e', '00.0e', '0e']:
+            formatter = get_formatter(formatstring)
+            self.assertIs(formatter, get_formatter(formatstring)) #formatters are cached
+            self.assertEqual(formatter.format_column(numpy.array(values)), [self.format_value(formatstring, value) for value in values])
+            self.assertEqual(formatter.format_column(values, True), [Value(value, round_use_internal = True).format(formatstring) for value in values])
+
+
+class TestValueColumn(unittest.TestCase):
+    def test_sequence(self):
+        column = ValueColumn.from_values([Value(1, 0.1, False), Value(2, 0.2, False), Value(3, 0.3, False)])
+        self.assertEqual(len(column), 3)
+        self.assertEqual(column[1].value, 2)
+        self.assertEqual(column[-1].absolute_uncertainty, 0.3)
+        self.assertEqual([value.value for value in column], [1, 2, 3])
+        self.assertEqual([value.value for value in column[1:]], [2, 3])
+        self.assertIsInstance(column[1:], ValueColumn)
+
+    def test_shared_uncertainty(self):
+        column = ValueColumn(numpy.array([10.0, 20.0]), numpy.array([0.1]), True, [(1, 1.0)])
+        self.assertEqual(len(column), 2)
+        self.assertEqual([value.absolute_uncertainty for value in column], [1.0, 2.0])
+        self.assertEqual(column.absolute_uncertainty.tolist(), [1.0, 2.0])
+        for value in column.to_values():
+            self.assertIs(value.units, column.units)
+    
+    def test_from_values(self):
+        column = ValueColumn.from_values(Value(4, 0.5, True))
+        self.assertEqual(len(column), 1)
+        self.assertIs(ValueColumn.from_values(column), column)
+        self.assertEqual(len(ValueColumn.from_values([])), 0)
+
+        #mixed uncertainty types are stored as absolute
+        column = ValueColumn.from_values([Value(4, 0.5, True), Value(2, 1, False)])
+        self.assertFalse(column.uncertainty_is_percentage)
+        self.assertEqual(column.uncertainty.tolist(), [2, 1])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
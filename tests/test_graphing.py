@@ -0,0 +1,236 @@
+import unittest
+import random
+import sys
+import os
+
+up1 = os.path.abspath('../')
+sys.path.insert(0, up1)
+
+import sciplot.graphing as graphing #pylint: disable=import-error
+from sciplot import Value
+
+sys.path.pop(0)
+
+
+class ColumnTable:
+    """
+    Stands in for a loaded Datatable so that fit lines can be calculated without a datafile
+    """
+    def __init__(self, x_values, y_values):
+        self._columns = [x_values, y_values]
+
+    def as_columns(self):
+        return self._columns
+
+    def as_rows(self):
+        return [[self._columns[0][i], self._columns[1][i]] for i in range(len(self._columns[0]))]
+
+
+class TestFitLines(unittest.TestCase):
+    def create_fit_lines(self, points, use_numpy = True):
+        x_values = [Value(x, x_unc, False) for x, x_unc, y, y_unc in points]
+        y_values = [Value(y, y_unc, False) for x, x_unc, y, y_unc in points]
+        return graphing.FitLines(ColumnTable(x_values, y_values), use_numpy)
+
+    def test_best_fit(self):
+        fit_lines = self.create_fit_lines([(0, 0, 1, 0), (1, 0, 3, 0), (2, 0, 5, 0)])
+        fit_lines.calculate_best_fit()
+        self.assertAlmostEqual(fit_lines.fit_best_gradient, 2)
+        self.assertAlmostEqual(fit_lines.fit_best_intercept, 1)
+
+    def test_worst_fits(self):
+        fit_lines = self.create_fit_lines([(0, 0, 0, 1), (1, 0, 1, 1), (2, 0, 2, 1)])
+        fit_lines.calculate_worst_fits()
+        self.assertAlmostEqual(fit_lines.fit_worst_max_gradient, 2) #(0, -1) to (2, 3)
+        self.assertAlmostEqual(fit_lines.fit_worst_max_intercept, -1)
+        self.assertAlmostEqual(fit_lines.fit_worst_min_gradient, 0) #(0, 1) to (2, 1)
+        self.assertAlmostEqual(fit_lines.fit_worst_min_intercept, 1)
+
+    def test_worst_fits_match_exhaustive_search(self):
+        rng = random.Random(0)
+        for i in range(50):
+            points = [(j + rng.uniform(-0.3, 0.3), rng.uniform(0, 0.3), (2 * j) + rng.uniform(-0.5, 0.5), rng.uniform(0.3, 1)) for j in range(rng.randint(3, 8))]
+            fit_lines = self.create_fit_lines(points)
+            fit_lines.calculate_worst_fits()
+
+            expected_max, expected_min = self.exhaustive_worst_fits(points)
+            if expected_max is None: #no line goes through every box
+                self.assertIsNone(fit_lines.fit_worst_max_gradient)
+                self.assertIsNone(fit_lines.fit_worst_min_gradient)
+                continue
+
+            self.assertAlmostEqual(fit_lines.fit_worst_max_gradient, expected_max[0])
+            self.assertAlmostEqual(fit_lines.fit_worst_max_intercept, expected_max[1])
+            self.assertAlmostEqual(fit_lines.fit_worst_min_gradient, expected_min[0])
+            self.assertAlmostEqual(fit_lines.fit_worst_min_intercept, expected_min[1])
+
+    def test_worst_fits_impossible(self):
+        for use_numpy in [True, False]:
+            fit_lines = self.create_fit_lines([(0, 0, 0, 0.1), (1, 0, 5, 0.1), (2, 0, 0, 0.1)], use_numpy)
+            fit_lines.calculate_worst_fits()
+            self.assertIsNone(fit_lines.fit_worst_max_gradient)
+            self.assertIsNone(fit_lines.fit_worst_min_gradient)
+
+    def test_worst_fits_unlimited(self): #every box contains x = 1, so a vertical line goes through all of them
+        for use_numpy in [True, False]:
+            fit_lines = self.create_fit_lines([(0.5, 0.5, 0, 1), (1.5, 0.5, 2, 1)], use_numpy)
+            fit_lines.calculate_worst_fits()
+            self.assertIsNone(fit_lines.fit_worst_max_gradient)
+            self.assertIsNone(fit_lines.fit_worst_min_gradient)
+
+    def test_worst_fits_limited_one_way(self): #the boxes touch at x = 0.5, where a steep line with a positive gradient goes through both of them but one with a negative gradient doesn't
+        for use_numpy in [True, False]:
+            fit_lines = self.create_fit_lines([(0, 0.5, 0, 0), (1, 0.5, 2, 1)], use_numpy)
+            fit_lines.calculate_worst_fits()
+            self.assertIsNone(fit_lines.fit_worst_max_gradient)
+            self.assertIsNone(fit_lines.fit_worst_max_intercept)
+            self.assertAlmostEqual(fit_lines.fit_worst_min_gradient, 0.5) #(-0.5, 0) to (1.5, 1)
+            self.assertAlmostEqual(fit_lines.fit_worst_min_intercept, 0.25)
+
+    def test_numpy_matches_python_overlapping(self): #x values and uncertainties are on a grid, so the boxes often touch or overlap in x
+        rng = random.Random(2)
+        for i in range(200):
+            points = [(rng.choice([0, 0.5, 1, 1.5, 2]), rng.choice([0, 0.25, 0.5, 1]), rng.choice([-1, 0, 1, 2, 3]), rng.choice([0, 0.5, 1])) for j in range(rng.randint(2, 6))]
+            fit_lines_numpy = self.create_fit_lines(points, True)
+            fit_lines_python = self.create_fit_lines(points, False)
+            fit_lines_numpy.calculate_worst_fits()
+            fit_lines_python.calculate_worst_fits()
+
+            for name in ['fit_worst_max_gradient', 'fit_worst_max_intercept', 'fit_worst_min_gradient', 'fit_worst_min_intercept']:
+                if getattr(fit_lines_python, name) is None:
+                    self.assertIsNone(getattr(fit_lines_numpy, name))
+                else:
+                    self.assertAlmostEqual(getattr(fit_lines_numpy, name), getattr(fit_lines_python, name))
+
+    def test_numpy_matches_python(self):
+        rng = random.Random(1)
+        for i in range(50):
+            points = [(j + rng.uniform(-0.3, 0.3), rng.uniform(0, 0.3), (rng.uniform(-3, 3) * j) + rng.uniform(-0.5, 0.5), rng.uniform(0.3, 1)) for j in range(rng.randint(2, 20))]
+            fit_lines_numpy = self.create_fit_lines(points, True)
+            fit_lines_python = self.create_fit_lines(points, False)
+            fit_lines_numpy.calculate_all()
+            fit_lines_python.calculate_all()
+
+            self.assertAlmostEqual(fit_lines_numpy.fit_best_gradient, fit_lines_python.fit_best_gradient)
+            self.assertAlmostEqual(fit_lines_numpy.fit_best_intercept, fit_lines_python.fit_best_intercept)
+
+            for name in ['fit_worst_max_gradient', 'fit_worst_max_intercept', 'fit_worst_min_gradient', 'fit_worst_min_intercept']:
+                if getattr(fit_lines_python, name) is None:
+                    self.assertIsNone(getattr(fit_lines_numpy, name))
+                else:
+                    self.assertAlmostEqual(getattr(fit_lines_numpy, name), getattr(fit_lines_python, name))
+
+    def test_best_fit_errors(self):
+        for use_numpy in [True, False]:
+            with self.assertRaises(ValueError):
+                self.create_fit_lines([(0, 0, 1, 0)], use_numpy).calculate_best_fit()
+            
+            with self.assertRaises(ValueError):
+                self.create_fit_lines([(1, 0, 1, 0), (1, 0, 2, 0)], use_numpy).calculate_best_fit()
+
+    def exhaustive_worst_fits(self, points): #try the line through every pair of corners (the old method)
+        lines = []
+        for switch in [(a, b, c, d) for a in [1, -1] for b in [1, -1] for c in [1, -1] for d in [1, -1]]:
+            for first_x, first_x_unc, first_y, first_y_unc in points:
+                for second_x, second_x_unc, second_y, second_y_unc in points:
+                    point_first = (first_x + (switch[0] * first_x_unc), first_y + (switch[1] * first_y_unc))
+                    point_second = (second_x + (switch[2] * second_x_unc), second_y + (switch[3] * second_y_unc))
+
+                    if point_first[0] != point_second[0]:
+                        gradient = (point_second[1] - point_first[1]) / (point_second[0] - point_first[0])
+                        intercept = point_first[1] - (point_first[0] * gradient)
+
+                        if False not in [self.line_covers_box(gradient, intercept, point) for point in points]:
+                            lines.append((gradient, intercept))
+
+        if len(lines) == 0:
+            return None, None
+        return max(lines), min(lines)
+
+    def line_covers_box(self, gradient, intercept, point, tolerance = 1e-9): #lines through corners are on the edge of the box, so allow for rounding
+        x, x_unc, y, y_unc = point
+        y_at_min_x = intercept + (gradient * (x - x_unc))
+        y_at_max_x = intercept + (gradient * (x + x_unc))
+        return min(y_at_min_x, y_at_max_x) <= y + y_unc + tolerance and max(y_at_min_x, y_at_max_x) >= y - y_unc - tolerance
+
+
+class TestBestFitAccumulator(unittest.TestCase):
+    def test_matches_fit_lines(self):
+        rng = random.Random(3)
+        for i in range(20):
+            points = [(rng.uniform(-100, 100), rng.uniform(-100, 100)) for j in range(rng.randint(2, 50))]
+
+            fit_lines = graphing.FitLines(ColumnTable([Value(x, 0) for x, y in points], [Value(y, 0) for x, y in points]), False)
+            fit_lines.calculate_best_fit()
+
+            accumulator = graphing.BestFitAccumulator()
+            accumulator.add_rows(point for point in points) #generator, so the rows can only be read once
+            gradient, intercept = accumulator.calculate()
+
+            self.assertAlmostEqual(gradient, fit_lines.fit_best_gradient)
+            self.assertAlmostEqual(intercept, fit_lines.fit_best_intercept)
+
+    def test_merge(self):
+        rng = random.Random(4)
+        points = [(j, (3 * j) + rng.uniform(-1, 1)) for j in range(100)]
+
+        whole = graphing.BestFitAccumulator()
+        whole.add_rows(points)
+
+        merged = graphing.BestFitAccumulator()
+        for start in range(0, 100, 30): #uneven parts
+            part = graphing.BestFitAccumulator()
+            part.add_rows(points[start:start + 30])
+            merged = merged.merge(part)
+
+        self.assertEqual(merged.count, 100)
+        for value_whole, value_merged in zip(whole.calculate(), merged.calculate()):
+            self.assertAlmostEqual(value_whole, value_merged)
+
+    def test_errors(self):
+        accumulator = graphing.BestFitAccumulator()
+        accumulator.add(1, 1)
+        with self.assertRaises(ValueError):
+            accumulator.calculate()
+
+        accumulator.add(1, 2)
+        with self.assertRaises(ValueError):
+            accumulator.calculate()
+
+
+class TestDecimatePoints(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(4)
+        self.x_values = [rng.uniform(0, 100) for i in range(20000)]
+        self.y_values = [rng.uniform(0, 100) for i in range(20000)]
+        self.x_uncertainties = [rng.uniform(0, 1) for i in range(20000)]
+        self.y_uncertainties = [rng.uniform(0, 1) for i in range(20000)]
+
+    def test_reduces_points(self):
+        points, x_bars, y_bars = graphing.decimate_points(self.x_values, self.y_values, self.x_uncertainties, self.y_uncertainties, (40, 30))
+        self.assertLessEqual(len(points), 40 * 30)
+        self.assertEqual(x_bars.shape, (len(points), 2, 2))
+        self.assertEqual(y_bars.shape, (len(points), 2, 2))
+
+        #every original point is one of the kept points
+        kept = set(map(tuple, points.tolist()))
+        self.assertTrue(kept.issubset(set(zip(self.x_values, self.y_values))))
+
+    def test_bars_cover_points(self):
+        points, x_bars, y_bars = graphing.decimate_points(self.x_values, self.y_values, self.x_uncertainties, self.y_uncertainties, (40, 30))
+        self.assertAlmostEqual(x_bars[:, 0, 0].min(), min(x - u for x, u in zip(self.x_values, self.x_uncertainties)))
+        self.assertAlmostEqual(x_bars[:, 1, 0].max(), max(x + u for x, u in zip(self.x_values, self.x_uncertainties)))
+        self.assertAlmostEqual(y_bars[:, 0, 1].min(), min(y - u for y, u in zip(self.y_values, self.y_uncertainties)))
+        self.assertAlmostEqual(y_bars[:, 1, 1].max(), max(y + u for y, u in zip(self.y_values, self.y_uncertainties)))
+
+    def test_visible_range(self):
+        points, x_bars, y_bars = graphing.decimate_points(self.x_values, self.y_values, self.x_uncertainties, self.y_uncertainties, (400, 300), (10, 12), (10, 12))
+        visible = [(x, y) for x, y in zip(self.x_values, self.y_values) if 10 <= x <= 12 and 10 <= y <= 12]
+        kept = set(map(tuple, points.tolist()))
+        self.assertTrue(set(visible).issubset(kept)) #these points are sparse enough at this zoom that none are merged
+
+    def test_no_points(self):
+        points, x_bars, y_bars = graphing.decimate_points([], [], [], [], (40, 30))
+        self.assertEqual(points.shape, (0, 2))
+        self.assertEqual(x_bars.shape, (0, 2, 2))
+        self.assertEqual(y_bars.shape, (0, 2, 2))